@@ -1,3 +1,20 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+
+class UnauthorizedViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='somchai'))
+
+    def test_denied_post_renders_403_page(self):
+        # handler403 ถูกเรียกด้วย method เดิมของ request: POST ต้องได้หน้า 403 ไม่ใช่ 405
+        response = self.client.post(reverse('staff_import'), {'kind': 'vehicles'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, '403.html')
+
+    def test_get_and_post_render_403_page(self):
+        for method in (self.client.get, self.client.post):
+            response = method(reverse('unauthorized'))
+            self.assertEqual(response.status_code, 403)
+            self.assertTemplateUsed(response, '403.html')
@@ -6,6 +6,7 @@ from django.views import View
 from django.contrib.auth import login, logout
 from .forms import ProfileForm, SignUpForm, LoginForm
 from django.contrib.auth.models import Group
+from core.permissions import ROLE_CLIENT, ROLE_STAFF, ROLE_SUPERUSER, resolve
 
 class LoginView(View):
     def get(self, request):
@@ -23,10 +24,11 @@ class LoginView(View):
             if next_url:
                 return redirect(next_url)
         
-            # เช็ค group แล้วค่อยส่งไปหน้าเฉพาะ
-            if request.user.is_superuser or request.user.groups.filter(name="Staff").exists():
+            # เช็ค role (superuser / Staff / Client) แล้วค่อยส่งไปหน้าเฉพาะ
+            role = resolve(request.user).role
+            if role in (ROLE_SUPERUSER, ROLE_STAFF):
                 return redirect('dashboard')   # เปลี่ยนเป็นชื่อ url name ของคุณ
-            elif request.user.groups.filter(name="Client").exists():
+            elif role == ROLE_CLIENT:
                 return redirect('home')  # ถ้ามี dashboard ของลูกค้า
             else:
                 return redirect('home')
@@ -77,4 +79,8 @@ class SignupView(View):
 
 class UnauthorizedView(View):
     def get(self, request, exception=None):
-        return render(request, '403.html', status=403)
\ No newline at end of file
+        return render(request, '403.html', status=403)
+
+    # handler403 ใช้ method ของ request เดิม POST ที่ไม่มีสิทธิ์จึงต้องได้ 403 เช่นกัน (ไม่ใช่ 405)
+    def post(self, request, exception=None):
+        return self.get(request, exception)
@@ -5,7 +5,8 @@ from django.contrib.auth.forms import UserChangeForm, PasswordChangeForm
 
 import re
 
-from core.models import Appointment, Review, Vehicle, User, Profile
+from core.models import Appointment, Review, Vehicle, User, Profile, normalize_license_plate
+from core.validators import clean_vehicle_name, validate_license_plate
 
 class VehicleForm(ModelForm):
     class Meta:
@@ -25,42 +26,23 @@ class VehicleForm(ModelForm):
 
     def clean_license_plate(self):
         license_plate = self.cleaned_data.get('license_plate')
+        # กฎเดียวกับที่ใช้ตอน import จาก CSV (core.imports)
+        validate_license_plate(license_plate)
 
-        # ใช้ช่วง Unicode \u0E00-\u0E7F เพื่อครอบคลุมสระและเครื่องหมายต่าง ๆ ของภาษาไทย
-        # อนุญาตตัวอักษรไทย (รวมสระ/วรรณยุกต์), ตัวเลข และช่องว่างภายในข้อความ
-        if not re.match(r'^[\u0E00-\u0E7F0-9 ]+$', license_plate):
-            raise ValidationError("License plate must contain only Thai characters and numbers.")
-
-        # Normalize แบบไม่มีช่องว่าง เพื่อใช้ตรวจซ้ำ
-        normalized_in = re.sub(r'\s+', '', license_plate).lower()
-
-        qs = Vehicle.objects.all()
+        # ตรวจซ้ำด้วยทะเบียนที่ normalize แล้ว (ไม่สนช่องว่าง/ตัวพิมพ์) ผ่าน unique index
+        qs = Vehicle.objects.filter(license_plate_normalized=normalize_license_plate(license_plate))
         if self.instance.pk:
             qs = qs.exclude(pk=self.instance.pk)
-
-        for v in qs:
-            existing = (v.license_plate or '')
-            normalized_existing = re.sub(r'\s+', '', existing).lower()
-            if normalized_existing == normalized_in:
-                raise ValidationError("This license plate already exists.")
+        if qs.exists():
+            raise ValidationError("This license plate already exists.")
 
         return license_plate
 
     def clean_brand(self):
-            brand = self.cleaned_data.get('brand')
-            # อนุญาติเฉพาะ อักษรอังกฤษ ตัวเลข และช่องว่าง
-            if not re.match(r'^[a-zA-Z0-9 ]+$', brand):
-                raise ValidationError("Brand must contain only English letters, numbers.")
-
-            return brand.capitalize()
+            return clean_vehicle_name(self.cleaned_data.get('brand'), "Brand")
 
     def clean_model(self):
-            model = self.cleaned_data.get('model')
-            # อนุญาติเฉพาะ อักษรอังกฤษ ตัวเลข และช่องว่าง
-            if not re.match(r'^[a-zA-Z0-9 ]+$', model):
-                raise ValidationError("Model must contain only English letters, numbers.")
-
-            return model.capitalize()
+            return clean_vehicle_name(self.cleaned_data.get('model'), "Model")
 
 class BookingForm(ModelForm):
     class Meta:
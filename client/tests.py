@@ -1,3 +1,190 @@
-from django.test import TestCase
+import threading
+from datetime import time, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from client.forms import VehicleForm
+from core.models import Appointment, ServiceType, SlotOccupancy, Vehicle
+
+
+class BookingConcurrencyTests(TransactionTestCase):
+    clients_count = 8
+
+    def setUp(self):
+        permission = Permission.objects.get(content_type__app_label='client', codename='access_booking_page')
+        self.service = ServiceType.objects.create(name='Maintenance')
+        self.slot_date = timezone.localdate() + timedelta(days=3)
+        self.users = []
+        for number in range(self.clients_count):
+            user = User.objects.create_user(username=f'client{number}', password='password')
+            user.user_permissions.add(permission)
+            vehicle = Vehicle.objects.create(user=user, brand='Tesla', model='Model 3', license_plate=f'กข {number}')
+            self.users.append((user, vehicle))
+
+    def _hammer_slot(self):
+        barrier = threading.Barrier(len(self.users))
+        results = []
+
+        def book(user, vehicle):
+            client = Client()
+            client.force_login(user)
+            barrier.wait()
+            try:
+                response = client.post(reverse('book'), {
+                    'vehicle': vehicle.pk,
+                    'service_types': [self.service.pk],
+                    'date': self.slot_date.isoformat(),
+                    'time': '8:00',
+                })
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=pair) for pair in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _assert_capacity_respected(self, capacity):
+        # in-memory SQLite แบบ shared cache ไม่รองรับการเขียนพร้อมกันหลาย thread
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("needs a database that allows concurrent writers")
+        results = self._hammer_slot()
+
+        # booking สำเร็จ redirect (302) ส่วนที่เหลือได้ฟอร์มกลับมาพร้อม error (200)
+        self.assertEqual(results.count(302), capacity)
+        self.assertEqual(results.count(200), self.clients_count - capacity)
+        self.assertEqual(
+            Appointment.objects.filter(date=self.slot_date, time=time(8, 0)).count(),
+            capacity,
+        )
+        slot = SlotOccupancy.objects.get(date=self.slot_date, time=time(8, 0))
+        self.assertEqual(slot.booked, capacity)
+
+    @override_settings(BOOKING_SLOT_CAPACITY=1)
+    def test_single_bay_slot_accepts_one_booking(self):
+        self._assert_capacity_respected(1)
+
+    @override_settings(BOOKING_SLOT_CAPACITY=3)
+    def test_multi_bay_slot_accepts_capacity_bookings(self):
+        self._assert_capacity_respected(3)
+
+    def test_rejected_appointment_frees_the_slot(self):
+        user, vehicle = self.users[0]
+        appointment = Appointment.objects.create(user=user, vehicle=vehicle, date=self.slot_date, time=time(8, 0))
+        appointment.status = Appointment.Status.REJECT
+        appointment.save()
+
+        client = Client()
+        client.force_login(self.users[1][0])
+        response = client.post(reverse('book'), {
+            'vehicle': self.users[1][1].pk,
+            'service_types': [self.service.pk],
+            'date': self.slot_date.isoformat(),
+            'time': '8:00',
+        })
+        self.assertRedirects(response, reverse('appointment'), fetch_redirect_response=False)
+
+
+class VehicleFormTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+
+    def form(self, license_plate, instance=None):
+        return VehicleForm({'license_plate': license_plate, 'brand': 'byd', 'model': 'seal'}, instance=instance)
+
+    def test_duplicate_plate_is_rejected_regardless_of_spacing_and_digits(self):
+        for plate in ('กข 1234', 'กข1234', 'กข ๑๒๓๔'):
+            with self.subTest(plate=plate):
+                form = self.form(plate)
+                self.assertFalse(form.is_valid())
+                self.assertEqual(form.errors['license_plate'], ['This license plate already exists.'])
+
+    def test_editing_keeps_own_plate(self):
+        form = self.form('กข๑๒๓๔', instance=self.vehicle)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertTrue(self.form('ขค 5678').is_valid())
+
+
+class BookViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai', password='password')
+        self.user.user_permissions.add(
+            Permission.objects.get(content_type__app_label='client', codename='access_booking_page')
+        )
+        self.client.force_login(self.user)
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.service = ServiceType.objects.create(name='Maintenance')
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.month = f'{self.day:%Y-%m}'
+
+    def book(self, hour):
+        return Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=self.day, time=time(hour, 0))
+
+    def availability(self, month=None, **headers):
+        return self.client.get(reverse('book_availability'), {'month': month or self.month}, headers=headers)
+
+    @override_settings(BOOKING_SLOT_CAPACITY=1)
+    def test_full_slots_as_day_bitmask(self):
+        self.book(9)
+        self.book(14)
+        data = self.availability().json()
+        self.assertEqual(data['times'][1], '9:00')
+        self.assertEqual(data['times'][4], '14:00')
+        self.assertEqual(data['days'], {str(self.day.day): 0b10010})
+        self.assertEqual(data['first'], timezone.localdate().isoformat())
+
+    def test_bad_month_is_rejected(self):
+        for month in ('2026', '2026-13', 'next', ''):
+            with self.subTest(month=month):
+                response = self.client.get(reverse('book_availability'), {'month': month})
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(BOOKING_SLOT_CAPACITY=1)
+    def test_unchanged_month_is_not_modified(self):
+        self.book(8)
+        response = self.availability()
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.availability(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.book(10)
+        response = self.availability(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(BOOKING_SLOT_CAPACITY=1)
+    def test_booking_a_full_slot_shows_an_error(self):
+        self.book(8)
+        response = self.client.post(reverse('book'), {
+            'vehicle': self.vehicle.pk,
+            'service_types': [self.service.pk],
+            'date': self.day.isoformat(),
+            'time': '8:00',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This time slot has just been booked')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_book_page_does_not_read_appointment_history(self):
+        for number in range(30):
+            Appointment.objects.create(
+                user=self.user, vehicle=self.vehicle, date=timezone.localdate() - timedelta(days=number + 1),
+                time=time(8, 0), status=Appointment.Status.DONE,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if '"core_appointment"' in query['sql']])
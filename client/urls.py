@@ -6,6 +6,8 @@ urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     # ex: /client/book/
     path('book/', views.BookView.as_view(), name='book'),
+    # ex: /client/book/availability/?month=2025-10
+    path('book/availability/', views.BookAvailabilityView.as_view(), name='book_availability'),
     # ex: /client/appointment/
     path('appointment/', views.AppointmentView.as_view(), name='appointment'),
     # ex: /client/appointment/1/delete
@@ -1,7 +1,23 @@
+import hashlib
+import json
+
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views import View
 
-from core.models import Appointment, Review, Vehicle
+from core.models import Appointment, Vehicle
+from core.projections import appointment_list_queryset, review_of, service_names, service_type_list
+from core.slots import (
+    SLOT_TIMES,
+    TIMES_AFTERNOON,
+    TIMES_MORNING,
+    SlotUnavailable,
+    booking_window,
+    month_availability,
+)
 
 from client.forms import VehicleForm, BookingForm, ReviewForm, UserForm, ProfileForm, PasswordChangeForm
 
@@ -25,32 +41,20 @@ class BookView(LoginRequiredMixin, PermissionRequiredMixin, View):
         if first_vehicle:
             form.initial['vehicle'] = first_vehicle.pk
 
-        # หา service ที่ชื่อ "Maintenance" จาก queryset ของฟิลด์ service_types
-        services_qs = form.fields['service_types'].queryset
-        maintenance = services_qs.filter(name__iexact='maintenance').first()
+        # หา service ที่ชื่อ "Maintenance" จากรายการ service type (cache ไว้ใน core.projections)
+        services = service_type_list()
+        maintenance = next((service for service in services if service.name.lower() == 'maintenance'), None)
         default_services = []
         if maintenance:
             # ตั้งค่า default เป็นรายการ id (สำหรับ ModelMultipleChoiceField)
             form.initial['service_types'] = [maintenance.pk]
             default_services = [str(maintenance.pk)]  # ให้เป็น string เพื่อจะเช็คใน template ได้ง่าย
 
-        times_morning = ["8:00", "9:00", "10:00", "11:00"]
-        times_afternoon = ["14:00", "15:00", "16:00", "17:00"]
-        # ดึง slot ที่ถูกจองแล้วทั้งหมด
-        booked_slots = list(Appointment.objects.values_list('date', 'time'))
-        booked_slots_qs = Appointment.objects.exclude(status__iexact='reject').values_list('date', 'time')
-        booked_slots = list(booked_slots_qs)
-        # แปลงเป็น string เพื่อใช้ใน JS
-        booked_slots_str = [
-            f"{date.strftime('%Y-%m-%d')}_{time.strftime('%-H:%M')}" for date, time in booked_slots
-        ]
-        print("Default vehicle:", default_vehicle)
-        print("Default services:", default_services)
         return render(request, 'book.html', {
             'form': form,
-            'times_morning': times_morning,
-            'times_afternoon': times_afternoon,
-            'booked_slots': booked_slots_str if booked_slots_str else [],
+            'times_morning': TIMES_MORNING,
+            'times_afternoon': TIMES_AFTERNOON,
+            'services': services,
             'default_services': default_services,
             'default_vehicle': default_vehicle,
         })
@@ -61,34 +65,66 @@ class BookView(LoginRequiredMixin, PermissionRequiredMixin, View):
         if form.is_valid():
             appointment = form.save(commit=False)
             appointment.user = request.user
-            appointment.save()
-            form.instance = appointment  # สำคัญ! ให้ฟอร์มรู้ว่า instance ที่ save คือ appointment นี้
-            form.save_m2m()              # บันทึก ManyToMany ลง client_appointment_service_types
-            return redirect('appointment')
-        times_morning = ["8:00", "9:00", "10:00", "11:00"]
-        times_afternoon = ["14:00", "15:00", "16:00", "17:00"]
-        # ดึง slot ที่ถูกจองแล้วทั้งหมด
-        booked_slots = list(Appointment.objects.values_list('date', 'time'))
-        # แปลงเป็น string เพื่อใช้ใน JS
-        booked_slots_str = [
-            f"{date.strftime('%Y-%m-%d')}_{time.strftime('%-H:%M')}" for date, time in booked_slots
-        ]
+            try:
+                # จอง slot (ผ่าน signal) และบันทึก appointment ใน transaction เดียวกัน
+                with transaction.atomic():
+                    appointment.save()
+                    form.instance = appointment  # สำคัญ! ให้ฟอร์มรู้ว่า instance ที่ save คือ appointment นี้
+                    form.save_m2m()              # บันทึก ManyToMany ลง client_appointment_service_types
+            except SlotUnavailable:
+                form.add_error('time', "This time slot has just been booked. Please choose another time.")
+            else:
+                return redirect('appointment')
         return render(request, 'book.html', {
             'form': form,
-            'times_morning': times_morning,
-            'times_afternoon': times_afternoon,
-            'booked_slots': booked_slots_str if booked_slots_str else [],
+            'services': service_type_list(),
+            'times_morning': TIMES_MORNING,
+            'times_afternoon': TIMES_AFTERNOON,
         })
 
+class BookAvailabilityView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['client.access_booking_page']
+
+    def get(self, request):
+        # ex: ?month=2025-10
+        try:
+            year, month = (int(part) for part in request.GET.get('month', '').split('-'))
+            days, last_modified = month_availability(year, month)
+        except ValueError:
+            return JsonResponse({'error': 'month must be in YYYY-MM format'}, status=400)
+
+        first, last = booking_window()
+        payload = {
+            'month': f"{year:04d}-{month:02d}",
+            'times': SLOT_TIMES,
+            'first': first.isoformat(),
+            'last': last.isoformat(),
+            # day of month -> bitmask ของ SLOT_TIMES ที่ถูกจองแล้ว
+            'days': days,
+        }
+        body = json.dumps(payload, separators=(',', ':'))
+        etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+        last_modified_ts = last_modified.timestamp() if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        if last_modified_ts:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        # ให้ browser ถามกลับทุกครั้ง แต่ได้ 304 ถ้าไม่มีอะไรเปลี่ยน
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 class AppointmentView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['client.access_appointment_page']
 
     def get(self, request):
-        appointments = Appointment.objects.filter(user=request.user).order_by('-id')
+        appointments = appointment_list_queryset(Appointment.objects.filter(user=request.user)).order_by('-id')
         appointment_rows = []
         for ap in appointments:
-            service = " , ".join(ap.service_types.values_list('name', flat=True)) 
-            review = Review.objects.filter(appointment=ap).first()
+            service = " , ".join(service_names(ap))
+            review = review_of(ap)
             review_score = review.score if review else None
 
             appointment_rows.append({
@@ -99,7 +135,6 @@ class AppointmentView(LoginRequiredMixin, PermissionRequiredMixin, View):
                 "status": ap.status,
                 "review_score": review_score,
             })
-        print(appointment_rows)
         return render(request, 'appointment.html', {'appointments' : appointment_rows})
 
 class AppointmentDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -107,7 +142,6 @@ class AppointmentDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
 
     def post(self, request, appointment_id):
         appointment = Appointment.objects.get(pk=appointment_id)
-        print(appointment)
         appointment.delete()
         return redirect('appointment')
 
@@ -152,7 +186,6 @@ class VehicleView(LoginRequiredMixin, PermissionRequiredMixin, View):
             'brand' : vehicle.brand,
             'model' : vehicle.model
             })
-        print(vehicles)
         return render(request, 'vehicle.html', {'vehicles' : vehicles})
 
 class AddVehicleView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -193,7 +226,6 @@ class DeleteVehicleView(LoginRequiredMixin, PermissionRequiredMixin, View):
 
     def post(self, request, vehicle_id):
         vehicle = Vehicle.objects.get(pk=vehicle_id)
-        print(vehicle)
         vehicle.delete()
         return redirect('vehicle')
 
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.checks import Tags, register
+        from django.db.backends.signals import connection_created
+
+        from core.checks import check_built_stylesheet
+        from core.signals import connect_signals
+        from core.slowlog import install_recorder
+
+        connect_signals()
+        register(check_built_stylesheet, Tags.staticfiles)
+        if settings.SLOW_QUERY_MS > 0:
+            connection_created.connect(install_recorder, dispatch_uid="core_slowlog_recorder")
@@ -0,0 +1,223 @@
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_environment():
+    """Run benchmark requests against the configured database, then roll everything back.
+
+    The test environment is set up so the test client is allowed to call the
+    site and emails go to the locmem backend instead of a real server.
+    """
+    with test_environment(), transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def test_environment():
+    """``setup_test_environment()`` for the block, unless the test runner already did it."""
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        # เรียกจาก test (เช่น smoke test ของ command) ซึ่ง runner ตั้งค่าไว้แล้ว
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+def benchmark_user():
+    """Superuser for benchmark requests, logged in with ``force_login`` only.
+
+    It has no usable password, and a user left behind by an interrupted run
+    is reused instead of failing on the unique username.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark-staff", defaults={
+        "email": "benchmark@example.com",
+        "password": make_password(None),
+        "is_staff": True,
+        "is_superuser": True,
+    })
+    return user
+
+
+def measure(client, method, path, data=None, repeat=20):
+    """Average DB queries and milliseconds per request for ``repeat`` requests."""
+    queries = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            getattr(client, method)(path, data or {})
+        queries += len(captured.captured_queries)
+    elapsed = time.perf_counter() - started
+    return queries / repeat, elapsed * 1000 / repeat
+
+
+def timed_request(client, method, path, data=None):
+    """``(response, milliseconds, queries)`` of one request, streamed bodies read to the end."""
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        response = getattr(client, method)(path, data or {})
+        if response.streaming:
+            # ไฟล์ export สร้างระหว่างส่ง ต้องอ่านให้หมดถึงจะได้เวลาและจำนวน query จริง
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+    return response, elapsed * 1000, len(captured.captured_queries)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values):
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+    }
+
+
+def logged_in_client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+class ViewCase:
+    """One view to benchmark: ``paths`` holds one URL, or one URL per request for actions that delete."""
+
+    def __init__(self, name, role, method, paths, data=None):
+        self.name = name
+        self.role = role
+        self.method = method
+        self.paths = paths if isinstance(paths, list) else [paths]
+        self.data = data
+
+
+def view_cases(client_user, staff_user, others, repeat):
+    """Every client, staff and authen view, with URLs pointing at seeded rows.
+
+    ``others`` are client users that may be deleted: the delete actions use
+    their rows, a different one per request, and run after the read-only views.
+    """
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from core.models import Appointment, EmailCampaign, OutboundEmail, Review
+
+    today = timezone.localdate()
+    month = f"{today:%Y-%m}"
+    vehicle = client_user.vehicles.order_by("id").first()
+    done = client_user.appointments.filter(status=Appointment.Status.DONE).order_by("-id").first()
+    appointment = Appointment.objects.order_by("-date", "-time", "id").first()
+    review = Review.objects.order_by("id").first()
+    campaign = EmailCampaign.objects.create(subject="Benchmark", body="Hello", created_by=staff_user)
+    dead = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            user=client_user, to_email="client@example.com", from_email="noreply@example.com",
+            subject="Benchmark", body="Hello", status=OutboundEmail.Status.DEAD,
+        )
+        for _ in range(repeat + 1)
+    ])
+
+    def url(name, **kwargs):
+        return reverse(name, kwargs=kwargs)
+
+    # แบ่ง user ที่ลบได้เป็น 4 กลุ่ม แต่ละ action ลบข้อมูลของกลุ่มตัวเอง ไม่ไปลบของ action อื่น
+    groups = [others[index::4] for index in range(4)]
+    cases = [
+        ViewCase("home", "anonymous", "get", url("home")),
+        ViewCase("login", "anonymous", "get", url("login")),
+        ViewCase("signup", "anonymous", "get", url("signup")),
+        ViewCase("logout", "anonymous", "get", url("logout")),
+        ViewCase("unauthorized", "anonymous", "get", url("unauthorized")),
+        ViewCase("book", "client", "get", url("book")),
+        ViewCase("book_availability", "client", "get", url("book_availability"), {"month": month}),
+        ViewCase("appointment", "client", "get", url("appointment")),
+        ViewCase("review", "client", "get", url("review", appointment_id=(done or appointment).pk)),
+        ViewCase("vehicle", "client", "get", url("vehicle")),
+        ViewCase("add_vehicle", "client", "get", url("add_vehicle")),
+        ViewCase("edit_vehicle", "client", "get", url("edit_vehicle", vehicle_id=vehicle.pk)),
+        ViewCase("profile", "client", "get", url("profile")),
+        ViewCase("edit_profile", "client", "get", url("edit_profile")),
+        ViewCase("change_password", "client", "get", url("change_password")),
+        ViewCase("dashboard", "staff", "get", url("dashboard")),
+        ViewCase("dashboard_calendar", "staff", "get", url("dashboard_calendar"), {"month": month}),
+        ViewCase("appointment_list", "staff", "get", url("appointment_list")),
+        ViewCase("appointment_list?status", "staff", "get", url("appointment_list"), {"status": "DONE"}),
+        ViewCase("appointment_export", "staff", "get", url("appointment_export"), {"format": "csv"}),
+        ViewCase("appointment_detail", "staff", "get", url("appointment_detail", appointment_id=appointment.pk)),
+        ViewCase("appointment_edit", "staff", "get", url("appointment_edit", appointment_id=appointment.pk)),
+        ViewCase("vehicle_list", "staff", "get", url("vehicle_list")),
+        ViewCase("vehicle_export", "staff", "get", url("vehicle_export"), {"format": "jsonl"}),
+        ViewCase("review_list", "staff", "get", url("review_list")),
+        ViewCase("review_export", "staff", "get", url("review_export"), {"format": "csv"}),
+        ViewCase("review_detail", "staff", "get", url("review_detail", review_id=review.pk)),
+        ViewCase("user_list", "staff", "get", url("user_list")),
+        ViewCase("user_export", "staff", "get", url("user_export"), {"format": "csv"}),
+        ViewCase("detail_user_list", "staff", "get", url("detail_user_list", user_id=client_user.pk)),
+        ViewCase("send_user_email", "staff", "get", url("send_user_email", user_id=client_user.pk)),
+        ViewCase("bulk_user_email", "staff", "get", url("bulk_user_email")),
+        ViewCase("campaign_detail", "staff", "get", url("campaign_detail", campaign_id=campaign.pk)),
+        ViewCase("outbox_list", "staff", "get", url("outbox_list")),
+        ViewCase("staff_search", "staff", "get", url("staff_search"), {"q": vehicle.license_plate[:2]}),
+        ViewCase("staff_import", "staff", "get", url("staff_import")),
+        ViewCase(
+            "outbox_retry", "staff", "post", [url("outbox_retry", email_id=email.pk) for email in dead]
+        ),
+        ViewCase("appointment_delete", "client", "post", [
+            url("appointment_delete", appointment_id=pk)
+            for pk in Appointment.objects.filter(user__in=groups[0]).order_by("id").values_list("id", flat=True)
+        ][:repeat + 1]),
+        ViewCase("delete_vehicle", "client", "post", [
+            url("delete_vehicle", vehicle_id=other_vehicle.pk)
+            for user in groups[1] for other_vehicle in user.vehicles.order_by("id")
+        ][:repeat + 1]),
+        ViewCase("delete_vehicle_list", "staff", "post", [
+            url("delete_vehicle_list", vehicle_id=other_vehicle.pk)
+            for user in groups[2] for other_vehicle in user.vehicles.order_by("id")
+        ][:repeat + 1]),
+        ViewCase("delete_user_list", "staff", "post", [
+            url("delete_user_list", user_id=user.pk) for user in groups[3]
+        ][:repeat + 1]),
+    ]
+    return [case for case in cases if case.paths]
+
+
+def run_case(client, case, repeat):
+    """Time one ``ViewCase``: the first (cold cache) request apart from the rest."""
+    paths = case.paths if len(case.paths) > 1 else case.paths * (repeat + 1)
+    response, first_ms, first_queries = timed_request(client, case.method, paths[0], case.data)
+    timings, queries = [], []
+    for path in paths[1:repeat + 1]:
+        response, ms, count = timed_request(client, case.method, path, case.data)
+        timings.append(ms)
+        queries.append(count)
+    return {
+        "name": case.name,
+        "role": case.role,
+        "method": case.method.upper(),
+        "path": case.paths[0],
+        "status": response.status_code,
+        "first_ms": first_ms,
+        "first_queries": first_queries,
+        "samples": len(timings),
+        "ms": summarize(timings) if timings else None,
+        "queries": summarize(queries) if queries else None,
+    }
@@ -0,0 +1,124 @@
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# ค่าเผื่อหลังหมดอายุ: ระหว่างนี้ยังคืนค่าเดิมได้ขณะที่ worker หนึ่งคำนวณใหม่
+STALE_GRACE = 60
+# เวลาสูงสุดที่ worker หนึ่งถือสิทธิ์คำนวณค่าใหม่
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 5
+LOCK_POLL = 0.05
+
+
+def _scope(model_or_name):
+    # generation ผูกกับ model (ใช้ concrete model เพื่อให้ proxy ใช้ค่าเดียวกัน) หรือกับชื่อใดก็ได้ เช่น "perms:user:1"
+    if isinstance(model_or_name, str):
+        return model_or_name
+    return model_or_name._meta.concrete_model._meta.label_lower
+
+
+def _generation_key(model_or_name):
+    return f"core:gen:{_scope(model_or_name)}"
+
+
+def _new_generation():
+    # ถ้า key หายไปจาก cache (ถูก evict) จะเริ่มจากค่าที่ไม่ซ้ำกับรุ่นก่อน ๆ
+    return time.time_ns()
+
+
+def generations(models):
+    """Current generation of each model (or scope name), in the same order as ``models``."""
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_generation(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def fragment_version(*models):
+    """Part of a ``{% cache %}`` fragment key that changes whenever one of ``models`` changes."""
+    return ".".join(str(value) for value in generations(models))
+
+
+def bump_generation(model):
+    """Invalidate every cached value that depends on ``model`` (or a scope name)."""
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), timeout=None)
+
+
+def bump_generation_on_commit(model):
+    # ล้างทันที (request นี้จะเห็นข้อมูลใหม่ของตัวเอง) และล้างซ้ำหลัง commit
+    # เพราะระหว่างนี้ request อื่นอาจคำนวณจากข้อมูลเก่าแล้วเก็บไว้ใน generation ใหม่
+    bump_generation(model)
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+def _compute_and_store(key, compute, timeout):
+    value = compute()
+    cache.set(key, (value, time.time() + timeout), timeout=timeout + STALE_GRACE)
+    return value
+
+
+def cached_query(name, models, compute, timeout=None):
+    """Return ``compute()`` cached until ``timeout`` passes or one of ``models`` changes.
+
+    Only one worker recomputes an expired entry: the others keep serving the
+    stale value (or wait briefly when there is none) until it is replaced.
+    """
+    timeout = cache.default_timeout if timeout is None else timeout
+    generation = ".".join(str(value) for value in generations(models))
+    key = f"core:q:{name}:{generation}"
+    # lock ผูกกับ generation เดียวกับค่า: worker ที่ยังคำนวณรุ่นเก่าอยู่ไม่กันการคำนวณรุ่นใหม่
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until or not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            return value
+        try:
+            return _compute_and_store(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # worker ที่ถือ lock ช้าเกินไป คำนวณเองดีกว่าให้ request ค้าง
+        return compute()
+    try:
+        return _compute_and_store(key, compute, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def cached(*models, timeout=None):
+    """Decorator form of ``cached_query``; arguments become part of the key."""
+
+    def decorator(func):
+        base_name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            name = base_name
+            if args or kwargs:
+                digest = hashlib.md5(repr((args, sorted(kwargs.items()))).encode()).hexdigest()
+                name = f"{base_name}:{digest}"
+            return cached_query(name, models, lambda: func(*args, **kwargs), timeout=timeout)
+
+        wrapper.models = models
+        return wrapper
+
+    return decorator
@@ -0,0 +1,21 @@
+import traceback
+
+from django.conf import settings
+
+
+def app_call_site(skip_files=()):
+    """``path:line in function`` of the innermost stack frame in our own code.
+
+    Frames from Django, other libraries and ``skip_files`` are passed over, so
+    a query run by the ORM points at the view or helper that asked for it.
+    """
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if (
+            frame.filename.startswith(base_dir)
+            and "site-packages" not in frame.filename
+            and frame.filename != __file__
+            and frame.filename not in skip_files
+        ):
+            return f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+    return "unknown"
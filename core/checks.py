@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Warning
+
+# stylesheet ที่ build จาก core/static_src/app.css และไม่ได้ commit ไว้ (ดู package.json)
+BUILT_STYLESHEET = "core/css/app.css"
+
+
+def check_built_stylesheet(app_configs, **kwargs):
+    """Report a missing Tailwind build; with STATIC_MANIFEST it stops collectstatic."""
+    if finders.find(BUILT_STYLESHEET):
+        return []
+    message = f"{BUILT_STYLESHEET} has not been built, so pages are served without styles."
+    hint = "Run `npm ci && npm run build:css` (or `npm run build:static` for a deploy)."
+    # STATIC_MANIFEST = build สำหรับ production: ห้าม collectstatic ต่อทั้งที่ไม่มี CSS
+    if settings.STATIC_MANIFEST:
+        return [Error(message, hint=hint, id="core.E001")]
+    return [Warning(message, hint=hint, id="core.W001")]
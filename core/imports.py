@@ -0,0 +1,321 @@
+import csv
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core import search
+from core.cache import bump_generation_on_commit
+from core.models import Appointment, ServiceType, Vehicle, normalize_license_plate
+from core.stats import count_appointment
+from core.validators import clean_vehicle_name, validate_license_plate
+
+
+class InvalidImport(Exception):
+    """The file cannot be imported at all, e.g. a required column is missing."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        # (เลขบรรทัดในไฟล์, ข้อความ) ของแถวที่ไม่ผ่าน
+        self.errors = []
+
+    @property
+    def failed(self):
+        return len({line for line, _ in self.errors})
+
+
+def _clean_field(errors, model, name, value):
+    # ใช้กฎของ field ใน model (blank, max_length, choices, รูปแบบวันที่/เวลา) แบบเดียวกับ ModelForm
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as exc:
+        errors.extend(f"{name}: {message}" for message in exc.messages)
+        return None
+
+
+def _check(errors, name, validate, *args):
+    try:
+        return validate(*args)
+    except ValidationError as exc:
+        errors.extend(f"{name}: {message}" for message in exc.messages)
+        return None
+
+
+class Importer(ABC):
+    """Validates and writes one kind of CSV row; subclasses define the rules."""
+
+    columns = ()
+    required = ()
+
+    def check_columns(self, fieldnames):
+        missing = [name for name in self.required if name not in fieldnames]
+        if missing:
+            raise InvalidImport(f"Missing column(s): {', '.join(missing)}. Expected: {', '.join(self.columns)}.")
+
+    def prepare(self, rows):
+        """Load whatever the batch needs from the database in as few queries as possible."""
+
+    def saved(self, items):
+        """Called once a batch is committed (or would be, in a dry run) with its ``clean`` results."""
+
+    @abstractmethod
+    def clean(self, row, errors):
+        """Return what ``save`` needs for ``row``; problems go into ``errors`` instead."""
+
+    @abstractmethod
+    def save(self, items):
+        """Write the ``clean`` results of one batch of valid rows."""
+
+
+class VehicleImporter(Importer):
+    columns = ("license_plate", "brand", "model", "username")
+    required = ("license_plate", "brand", "model")
+
+    def __init__(self, owner=None):
+        # เจ้าของรถของทุกแถวที่ไม่มีคอลัมน์ username เช่นลูกค้า fleet รายเดียว
+        self.owner = owner
+        self.user_ids = {}
+        # ทะเบียนของ batch ก่อน ๆ ที่บันทึกแล้ว และของ batch ปัจจุบันที่ยังไม่ได้บันทึก
+        self.seen = set()
+        self.pending = set()
+        self.existing = set()
+
+    def check_columns(self, fieldnames):
+        super().check_columns(fieldnames)
+        if self.owner is None and "username" not in fieldnames:
+            raise InvalidImport("Add a username column or choose an owner for every vehicle.")
+
+    def prepare(self, rows):
+        # batch ก่อนหน้าที่ rollback ไปไม่นับเป็นทะเบียนซ้ำ
+        self.pending = set()
+        plates = {normalize_license_plate(row.get("license_plate")) for row in rows}
+        self.existing = set(
+            Vehicle.objects.filter(license_plate_normalized__in=plates).values_list(
+                "license_plate_normalized", flat=True
+            )
+        )
+        usernames = {row["username"] for row in rows if row.get("username")} - self.user_ids.keys()
+        if usernames:
+            self.user_ids.update(User.objects.filter(username__in=usernames).values_list("username", "id"))
+
+    def clean(self, row, errors):
+        license_plate = _clean_field(errors, Vehicle, "license_plate", row.get("license_plate"))
+        normalized = None
+        if license_plate:
+            _check(errors, "license_plate", validate_license_plate, license_plate)
+            normalized = normalize_license_plate(license_plate)
+            # ซ้ำกับในฐานข้อมูล หรือซ้ำกับแถวก่อนหน้าในไฟล์เดียวกัน
+            if normalized in self.existing or normalized in self.seen or normalized in self.pending:
+                errors.append("license_plate: This license plate already exists.")
+        brand = _clean_field(errors, Vehicle, "brand", row.get("brand"))
+        if brand:
+            brand = _check(errors, "brand", clean_vehicle_name, brand, "Brand")
+        model = _clean_field(errors, Vehicle, "model", row.get("model"))
+        if model:
+            model = _check(errors, "model", clean_vehicle_name, model, "Model")
+
+        username = row.get("username")
+        user_id = self.user_ids.get(username) if username else getattr(self.owner, "pk", None)
+        if user_id is None and username:
+            errors.append(f"username: No user named '{username}'.")
+        elif user_id is None:
+            errors.append("username: This field is required.")
+        if errors:
+            return None
+        self.pending.add(normalized)
+        # bulk_create ไม่เรียก Vehicle.save() จึงต้องใส่ค่าที่ normalize แล้วเอง
+        return Vehicle(
+            user_id=user_id,
+            license_plate=license_plate,
+            license_plate_normalized=normalized,
+            brand=brand,
+            model=model,
+        )
+
+    def save(self, vehicles):
+        Vehicle.objects.bulk_create(vehicles)
+        # bulk_create ไม่ส่ง signal: index และล้าง cache เอง
+        search.save_entries([search.vehicle_entry(vehicle) for vehicle in vehicles])
+        bump_generation_on_commit(Vehicle)
+
+    def saved(self, vehicles):
+        self.seen.update(vehicle.license_plate_normalized for vehicle in vehicles)
+
+
+class ServiceTypeImporter(Importer):
+    columns = ("name", "description")
+    required = ("name",)
+
+    def __init__(self):
+        # service type มีไม่มาก โหลดชื่อทั้งหมดครั้งเดียว แล้วเพิ่มชื่อของแต่ละ batch หลังบันทึกสำเร็จ
+        self.names = {name.casefold() for name in ServiceType.objects.values_list("name", flat=True)}
+        self.pending = set()
+
+    def prepare(self, rows):
+        self.pending = set()
+
+    def clean(self, row, errors):
+        name = _clean_field(errors, ServiceType, "name", row.get("name"))
+        if name and (name.casefold() in self.names or name.casefold() in self.pending):
+            errors.append("name: This service type already exists.")
+        description = _clean_field(errors, ServiceType, "description", row.get("description") or None)
+        if errors:
+            return None
+        self.pending.add(name.casefold())
+        return ServiceType(name=name, description=description)
+
+    def save(self, service_types):
+        ServiceType.objects.bulk_create(service_types)
+        bump_generation_on_commit(ServiceType)
+
+    def saved(self, service_types):
+        self.names.update(service_type.name.casefold() for service_type in service_types)
+
+
+class AppointmentImporter(Importer):
+    """Past appointments of vehicles that are already in the system.
+
+    Only dates before today are accepted: historical appointments never hold
+    a bookable slot, so ``SlotOccupancy`` is left alone.
+    """
+
+    columns = ("license_plate", "date", "time", "status", "services", "description")
+    required = ("license_plate", "date", "time")
+
+    def __init__(self):
+        self.today = timezone.localdate()
+        self.service_ids = {}
+        # ชื่อซ้ำกันให้ใช้ service type ที่สร้างก่อน
+        for service_id, name in ServiceType.objects.order_by("-id").values_list("id", "name"):
+            self.service_ids[name.casefold()] = service_id
+        self.vehicles = {}
+
+    def prepare(self, rows):
+        plates = {normalize_license_plate(row.get("license_plate")) for row in rows}
+        self.vehicles = {
+            normalized: (vehicle_id, user_id, license_plate)
+            for normalized, vehicle_id, user_id, license_plate in Vehicle.objects.filter(
+                license_plate_normalized__in=plates
+            ).values_list("license_plate_normalized", "id", "user_id", "license_plate")
+        }
+
+    def clean(self, row, errors):
+        vehicle = self.vehicles.get(normalize_license_plate(row.get("license_plate")))
+        if vehicle is None:
+            errors.append("license_plate: No vehicle with this license plate.")
+        date = _clean_field(errors, Appointment, "date", row.get("date"))
+        if date and date >= self.today:
+            errors.append("date: Only past appointments can be imported.")
+        time = _clean_field(errors, Appointment, "time", row.get("time"))
+        status = _clean_field(
+            errors, Appointment, "status", (row.get("status") or Appointment.Status.DONE).upper()
+        )
+        description = _clean_field(errors, Appointment, "description", row.get("description") or None)
+
+        service_ids = []
+        for name in filter(None, (name.strip() for name in (row.get("services") or "").split(";"))):
+            service_id = self.service_ids.get(name.casefold())
+            if service_id is None:
+                errors.append(f"services: Unknown service type '{name}'.")
+            elif service_id not in service_ids:
+                service_ids.append(service_id)
+        if errors:
+            return None
+        vehicle_id, user_id, license_plate = vehicle
+        appointment = Appointment(
+            user_id=user_id, vehicle_id=vehicle_id, date=date, time=time, status=status, description=description
+        )
+        return appointment, service_ids, license_plate
+
+    def save(self, items):
+        appointments = Appointment.objects.bulk_create([appointment for appointment, _, _ in items])
+        Through = Appointment.service_types.through
+        Through.objects.bulk_create([
+            Through(appointment_id=appointment.pk, servicetype_id=service_id)
+            for appointment, service_ids, _ in items
+            for service_id in service_ids
+        ])
+
+        # bulk_create ไม่ส่ง signal: อัปเดตยอดรายวัน, index และ cache เองทีละ batch
+        per_day = {}
+        for appointment in appointments:
+            key = (appointment.date, appointment.status)
+            per_day[key] = per_day.get(key, 0) + 1
+        for (date, status), count in per_day.items():
+            count_appointment(date, status, delta=count)
+        search.save_entries([
+            search.appointment_entry(appointment, license_plate) for appointment, _, license_plate in items
+        ])
+        bump_generation_on_commit(Appointment)
+
+
+IMPORTERS = {
+    "vehicles": VehicleImporter,
+    "service-types": ServiceTypeImporter,
+    "appointments": AppointmentImporter,
+}
+
+
+def make_importer(kind, owner=None):
+    """The importer for ``kind``; ``owner`` is the default owner of imported vehicles."""
+    if kind == "vehicles":
+        return VehicleImporter(owner)
+    return IMPORTERS[kind]()
+
+
+def run_import(importer, file, batch_size=None, dry_run=False):
+    """Validate and insert the CSV rows of ``file`` with ``importer``.
+
+    Rows are read, validated and written ``batch_size`` at a time, each batch
+    in its own transaction, so one bad row only rejects itself. Returns an
+    ``ImportReport``; raises ``InvalidImport`` when the header is unusable.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    reader = csv.DictReader(file)
+    importer.check_columns([name.strip() for name in reader.fieldnames or []])
+    # เลขบรรทัดจริงในไฟล์ (ข้อความอาจมีหลายบรรทัดในช่องเดียว)
+    rows = (
+        (reader.line_num, {(key or "").strip(): (value or "").strip() for key, value in row.items()})
+        for row in reader
+    )
+
+    report = ImportReport()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return report
+        report.rows += len(batch)
+        importer.prepare([row for _, row in batch])
+
+        valid = []
+        for line, row in batch:
+            errors = []
+            item = importer.clean(row, errors)
+            if errors:
+                report.errors.extend((line, message) for message in errors)
+            else:
+                valid.append((line, item))
+        if not valid:
+            continue
+        items = [item for _, item in valid]
+        if dry_run:
+            importer.saved(items)
+            report.created += len(valid)
+            continue
+        try:
+            with transaction.atomic():
+                importer.save(items)
+        except IntegrityError as exc:
+            # มีการเพิ่มข้อมูลซ้ำพร้อมกันระหว่าง import ทั้ง batch นี้จึงไม่ถูกบันทึก
+            message = f"Not saved, the batch conflicts with existing data: {exc}"
+            report.errors.extend((line, message) for line, _ in valid)
+        else:
+            importer.saved(items)
+            report.created += len(valid)
@@ -0,0 +1,62 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.utils import load_backend
+from django.urls import reverse
+
+from core.benchmark import benchmark_user, logged_in_client, test_environment
+
+
+class Command(BaseCommand):
+    help = "Compare request latency with a new DB connection per request, persistent connections and a pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def _modes(self, base):
+        no_reuse = {**base, "CONN_MAX_AGE": 0, "OPTIONS": {k: v for k, v in base["OPTIONS"].items() if k != "pool"}}
+        persistent = {**no_reuse, "CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}
+        modes = [("new connection per request", no_reuse), ("persistent + health checks", persistent)]
+        if base["ENGINE"] == "django.db.backends.postgresql":
+            pool = base["OPTIONS"].get("pool") or {"min_size": 2, "max_size": 4}
+            modes.append(("psycopg pool", {**no_reuse, "OPTIONS": {**no_reuse["OPTIONS"], "pool": pool}}))
+        return modes
+
+    def _run(self, settings_dict, user, path, repeat):
+        backend = load_backend(settings_dict["ENGINE"])
+        original = connections["default"]
+        wrapper = backend.DatabaseWrapper(copy.deepcopy(settings_dict), "default")
+        connections["default"] = wrapper
+        try:
+            client = logged_in_client(user)
+            close_old_connections()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                # test client ไม่ปิด connection เอง ทำแบบเดียวกับ request handler จริง
+                close_old_connections()
+                client.get(path)
+                close_old_connections()
+            return (time.perf_counter() - started) * 1000 / repeat
+        finally:
+            wrapper.close()
+            if getattr(wrapper, "pool", None) is not None:
+                wrapper.close_pool()
+            connections["default"] = original
+
+    def handle(self, *args, **options):
+        base = connections["default"].settings_dict
+        with test_environment():
+            # ต้อง commit user จริง เพราะการปิด/เปิด connection ใหม่ทำให้ rollback ทั้ง transaction ไม่ได้
+            user = benchmark_user()
+            try:
+                path = reverse("dashboard")
+                self.stdout.write(f"{'mode':<32}{'ms/request':>12}")
+                for name, settings_dict in self._modes(base):
+                    ms = self._run(settings_dict, user, path, options["repeat"])
+                    self.stdout.write(f"{name:<32}{ms:>12.2f}")
+                if base["ENGINE"] != "django.db.backends.postgresql":
+                    self.stdout.write("(the psycopg pool is only available with PostgreSQL)")
+            finally:
+                user.delete()
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from core.benchmark import benchmark_environment, benchmark_user, logged_in_client, measure
+
+# (session mode, message mode) ที่ใช้เทียบ: แถวแรกคือค่าเดิมของ Django
+DEFAULT_MODES = ["db:fallback", "cached_db:fallback", "cache:cookie", "signed_cookies:cookie"]
+
+
+class Command(BaseCommand):
+    help = "Compare DB queries and time per request for each session/message storage mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modes", nargs="+", default=DEFAULT_MODES, help="session:message pairs, e.g. db:session cache:cookie"
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def _parse(self, mode):
+        session_mode, _, message_mode = mode.partition(":")
+        message_mode = message_mode or "fallback"
+        if session_mode not in settings.SESSION_ENGINES or message_mode not in settings.MESSAGE_STORAGES:
+            raise CommandError(f"Unknown mode {mode!r}.")
+        return settings.SESSION_ENGINES[session_mode], settings.MESSAGE_STORAGES[message_mode]
+
+    def handle(self, *args, **options):
+        modes = [(mode, *self._parse(mode)) for mode in options["modes"]]
+        repeat = options["repeat"]
+
+        with benchmark_environment():
+            user = benchmark_user()
+            send_email = reverse("send_user_email", kwargs={"user_id": user.id})
+            requests = [
+                ("dashboard", "get", reverse("dashboard"), None),
+                ("appointment list", "get", reverse("appointment_list"), None),
+                # subject ว่าง: view จะตั้ง messages.error แล้ว redirect
+                ("action + message", "post", send_email, {"subject": "", "message": ""}),
+                ("page showing message", "get", send_email, None),
+            ]
+
+            self.stdout.write(f"{'mode':<24}{'request':<24}{'queries':>10}{'ms':>10}")
+            for mode, engine, storage in modes:
+                with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=storage):
+                    # สร้าง client ใหม่ต่อ mode เพราะ SessionMiddleware อ่าน engine ตอนสร้าง
+                    client = logged_in_client(user)
+                    for name, method, path, data in requests:
+                        getattr(client, method)(path, data or {})  # warm cache
+                        queries, ms = measure(client, method, path, data, repeat)
+                        self.stdout.write(f"{mode:<24}{name:<24}{queries:>10.1f}{ms:>10.2f}")
@@ -0,0 +1,76 @@
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from core.benchmark import benchmark_environment, logged_in_client, run_case, view_cases
+from core.seed import SCALES, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the database at each scale and time every client, staff and authen view; "
+        "prints JSON with latency percentiles and query counts per view. All changes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per view after one warm-up request.")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed of the synthetic data.")
+        parser.add_argument("--output", help="Write the JSON to this file instead of stdout.")
+
+    def _run_scale(self, scale, repeat, rng):
+        started = time.perf_counter()
+        result = seed(scale, rng)
+        seed_seconds = time.perf_counter() - started
+
+        # client ที่มี appointment มากที่สุดคือกรณีที่หน้า client ทำงานหนักที่สุด
+        client_user = (
+            User.objects.filter(pk__in=result.client_ids)
+            .annotate(total=Count("appointments"))
+            .order_by("-total", "id")
+            .first()
+        )
+        staff_user = User.objects.get(pk=result.staff_ids[0])
+        others = list(User.objects.filter(pk__in=result.client_ids).exclude(pk=client_user.pk).order_by("id"))
+        clients = {
+            "anonymous": Client(),
+            "client": logged_in_client(client_user),
+            "staff": logged_in_client(staff_user),
+        }
+        views = []
+        for case in view_cases(client_user, staff_user, others, repeat):
+            self.stderr.write(f"{scale}: {case.name}")
+            views.append(run_case(clients[case.role], case, repeat))
+        return {"scale": scale, "counts": result.counts(), "seed_seconds": seed_seconds, "views": views}
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1.")
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "repeat": repeat,
+            "seed": options["seed"],
+            "scales": [],
+        }
+        for scale in options["scales"]:
+            # cache แยกต่อ scale: เริ่มจาก cache ว่าง และไม่ทิ้งค่าของข้อมูลที่ rollback ไว้ใน cache จริง
+            caches = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"bench-{scale}"}}
+            with override_settings(CACHES=caches), benchmark_environment():
+                report["scales"].append(self._run_scale(scale, repeat, random.Random(options["seed"])))
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            self.stdout.write(output)
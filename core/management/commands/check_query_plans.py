@@ -0,0 +1,149 @@
+import re
+from datetime import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Appointment, DailyAppointmentCount, Review, SlotOccupancy, Vehicle
+from core.pagination import encode_cursor, keyset_paginate, page_query
+from core.projections import appointment_list_queryset
+from core.slots import booking_window
+
+
+class Total:
+    """The ``COUNT(*)`` a list page shows as its total (``QuerySet.count()`` has no ``explain()``)."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def explain(self):
+        # ดัก SQL ที่ count() ส่งจริง แล้ว EXPLAIN ด้วย prefix ของ backend นั้น
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            self.queryset.count()
+        sql, params = statements[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+
+
+# query ที่อ่านทั้งตารางจริงและยอมรับได้: ชื่อ query -> เหตุผล (ตารางที่ scan ยังแสดงในผลลัพธ์)
+ALLOWED_SCANS = {
+    # ไม่มี filter และเรียงตาม primary key: SQLite เดินตาม rowid แล้วหยุดเมื่อครบ LIMIT หนึ่งหน้า (PostgreSQL ใช้ pkey index)
+    "staff vehicles": "first page in primary key order",
+    "staff reviews": "first page in primary key order",
+    # LIKE '%...%' ใช้ B-tree index ไม่ได้ PostgreSQL มี trigram index (migration 0009) ส่วน SQLite ต้อง scan
+    # ยอดรวมของหน้านี้ cache อยู่ใน template fragment ตาม filter จึงไม่ได้นับซ้ำทุกหน้า
+    "staff vehicles by plate": "substring match on the normalized plate",
+    "staff vehicles by plate total": "substring match on the normalized plate",
+}
+
+
+def _list_queries(name, queryset, ordering, sample_key):
+    # หน้าแรก, หน้าถัดไปและยอดรวม แบบเดียวกับที่ view รัน
+    # cursor มาจากหน้าขนาด 1 แถว; ถ้ามีข้อมูลไม่ถึง 2 แถวใช้ค่าตัวอย่างของ key แทน
+    next_cursor = keyset_paginate(queryset, ordering, page_size=1).next_cursor
+    next_cursor = next_cursor or encode_cursor("next", sample_key, 1)
+    return [
+        (name, page_query(queryset, ordering)),
+        (f"{name} next page", page_query(queryset, ordering, next_cursor)),
+        (f"{name} total", Total(queryset)),
+    ]
+
+
+def hot_queries():
+    """The queries behind the client and staff list pages, as ``(name, query)`` pairs.
+
+    Staff lists are built with the same helpers as their views, so the plans
+    checked are the plans of the SQL the pages send.
+    """
+    from staff.views import APPOINTMENT_LIST_ORDERING, appointment_list, review_list, user_list, vehicle_list
+
+    user = User.objects.order_by("id").first()
+    user_id = user.pk if user else 0
+    today = timezone.localdate()
+    first, last = booking_window(today)
+    vehicle = Vehicle.objects.order_by("id").first()
+    plate = vehicle.license_plate if vehicle else "กข 1234"
+    appointment_key = [today, time(8, 0), 1]
+
+    queries = [
+        ("client appointments", appointment_list_queryset(Appointment.objects.filter(user_id=user_id)).order_by("-id")),
+        ("client vehicles", Vehicle.objects.filter(user_id=user_id).order_by("id")),
+        ("booking window slots", SlotOccupancy.objects.filter(date__gte=first, date__lte=last)),
+        (
+            "dashboard calendar month",
+            DailyAppointmentCount.objects.filter(date__gte=today.replace(day=1), date__lte=last, count__gt=0),
+        ),
+    ]
+    queries += _list_queries("staff appointments", appointment_list({}), APPOINTMENT_LIST_ORDERING, appointment_key)
+    queries += _list_queries(
+        "staff appointments by date", appointment_list({"date": today}), APPOINTMENT_LIST_ORDERING, appointment_key
+    )
+    queries += _list_queries(
+        "staff appointments by date and status",
+        appointment_list({"date": today, "status": Appointment.Status.PENDING}),
+        APPOINTMENT_LIST_ORDERING,
+        appointment_key,
+    )
+    queries += _list_queries("staff vehicles", vehicle_list({}), ("id",), [1])
+    queries += _list_queries("staff vehicles by plate", vehicle_list({"license_plate": plate[:3]}), ("id",), [1])
+    queries += _list_queries("staff reviews", review_list({}), ("id",), [1])
+    queries += _list_queries("staff reviews by score", review_list({"score": "5"}), ("id",), [1])
+    queries += _list_queries("staff client users", user_list({}), ("id",), [1])
+    queries += _list_queries("staff client users by username", user_list({"username": "som"}), ("id",), [1])
+    return queries
+
+
+def full_scans(plan, vendor):
+    """Return the tables that ``plan`` reads with a full table scan."""
+    if vendor == "postgresql":
+        return re.findall(r"Seq Scan on (\w+)", plan)
+    if vendor == "sqlite":
+        # "SCAN core_appointment" (ไม่มี USING INDEX ต่อท้าย) คือการอ่านทั้งตาราง
+        return re.findall(r"\bSCAN (\w+)\s*$", plan, flags=re.MULTILINE)
+    if vendor == "mysql":
+        return re.findall(r"\btable: (\w+).*\btype: ALL\b", plan)
+    return []
+
+
+def explain(query):
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # ปิด seq scan เพื่อไม่ให้ตารางเล็กใน dev/test ทำให้ผลลัพธ์เพี้ยน
+            # ถ้ายังได้ Seq Scan แปลว่าไม่มี index ที่ใช้ได้จริง ๆ
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return query.explain()
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot client/staff queries and fail if any of them does a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every query plan.")
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, query in hot_queries():
+            plan = explain(query)
+            scans = full_scans(plan, connection.vendor)
+            if options["verbose_plans"]:
+                self.stdout.write(f"-- {name}\n{plan}\n")
+            if scans and name in ALLOWED_SCANS:
+                self.stdout.write(f"scan {name}: {', '.join(sorted(set(scans)))} ({ALLOWED_SCANS[name]})")
+            elif scans:
+                failures.append(f"{name}: full scan on {', '.join(sorted(set(scans)))}")
+                self.stdout.write(self.style.ERROR(f"FAIL {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok   {name}"))
+
+        if failures:
+            raise CommandError("Queries without a usable index:\n" + "\n".join(failures))
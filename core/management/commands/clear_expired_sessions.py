@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# engine ที่เก็บ session ในตาราง django_session
+DB_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = "Delete expired rows from django_session in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="Seconds to sleep between batches to leave room for other writes."
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            # cache / signed cookie หมดอายุเองอยู่แล้ว
+            self.stdout.write(f"{settings.SESSION_ENGINE} does not store sessions in the database; nothing to do.")
+            return
+
+        now = timezone.now()
+        total = 0
+        while True:
+            # ลบทีละชุดตาม primary key แทน DELETE ก้อนเดียว เพื่อไม่ให้ lock ตารางนาน
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list("session_key", flat=True)[: options["batch_size"]]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired sessions."))
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import IMPORTERS, InvalidImport, make_importer, run_import
+
+
+class Command(BaseCommand):
+    help = "Import vehicles, service types or past appointments from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(IMPORTERS))
+        parser.add_argument("path", help="UTF-8 CSV file with a header row.")
+        parser.add_argument("--owner", help="Username that owns vehicles whose row has no username.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Rows per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate every row without saving.")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["owner"]:
+            owner = User.objects.filter(username=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"No user named '{options['owner']}'.")
+
+        importer = make_importer(options["kind"], owner=owner)
+        try:
+            # utf-8-sig: ไฟล์ที่ export จาก Excel มักมี BOM นำหน้า
+            with open(options["path"], newline="", encoding="utf-8-sig") as file:
+                report = run_import(importer, file, options["batch_size"], options["dry_run"])
+        except (OSError, UnicodeDecodeError, InvalidImport) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stderr.write(f"line {line}: {message}")
+        verb = "Would import" if options["dry_run"] else "Imported"
+        summary = f"{verb} {report.created} of {report.rows} rows, {report.failed} rejected."
+        self.stdout.write(self.style.WARNING(summary) if report.failed else self.style.SUCCESS(summary))
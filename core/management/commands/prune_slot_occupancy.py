@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import SlotOccupancy
+
+
+class Command(BaseCommand):
+    help = "Delete slot occupancy rows for dates that can no longer be booked."
+
+    def handle(self, *args, **options):
+        deleted, _ = SlotOccupancy.objects.filter(date__lt=timezone.localdate()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} past slot rows."))
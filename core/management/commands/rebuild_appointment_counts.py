@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import DailyAppointmentCount
+from core.stats import daily_counts_from_appointments
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-day appointment counts used by the staff dashboard."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # กันไม่ให้มี appointment ใหม่ระหว่างนับ ไม่งั้นยอดที่ได้จะไม่ตรง
+                with connection.cursor() as cursor:
+                    cursor.execute("LOCK TABLE core_appointment IN SHARE MODE")
+            rows = daily_counts_from_appointments()
+            DailyAppointmentCount.objects.all().delete()
+            DailyAppointmentCount.objects.bulk_create(rows, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} daily appointment count rows."))
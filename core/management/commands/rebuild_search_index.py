@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import search
+from core.models import Appointment, SearchEntry, Vehicle
+
+
+class Command(BaseCommand):
+    help = "Rebuild the staff search index from users, vehicles and appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def _index(self, kind, queryset, to_entries, batch_size):
+        total = 0
+        batch = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                search.save_entries(to_entries(batch))
+                total += len(batch)
+                batch = []
+        if batch:
+            search.save_entries(to_entries(batch))
+            total += len(batch)
+        self.stdout.write(f"{kind}: {total} entries")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            SearchEntry.objects.all().delete()
+            self._index(
+                SearchEntry.Kind.USER,
+                User.objects.select_related("profile").order_by("id"),
+                lambda users: [search.user_entry(user) for user in users],
+                batch_size,
+            )
+            self._index(
+                SearchEntry.Kind.VEHICLE,
+                Vehicle.objects.order_by("id"),
+                lambda vehicles: [search.vehicle_entry(vehicle) for vehicle in vehicles],
+                batch_size,
+            )
+            self._index(
+                SearchEntry.Kind.APPOINTMENT,
+                Appointment.objects.select_related("vehicle")
+                .only("id", "date", "time", "status", "vehicle__license_plate")
+                .order_by("id"),
+                lambda appointments: [search.appointment_entry(ap, ap.vehicle.license_plate) for ap in appointments],
+                batch_size,
+            )
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import RatingSummary
+from core.stats import rating_summary_from_reviews
+
+FIELDS = [f"score_{score}" for score in RatingSummary.SCORES] + ["review_count", "score_sum"]
+
+
+class Command(BaseCommand):
+    help = "Compare the rating summary with the review table and optionally fix it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Overwrite the summary with the recomputed values.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # กันไม่ให้มี review เปลี่ยนระหว่างนับ
+                with connection.cursor() as cursor:
+                    cursor.execute("LOCK TABLE core_review IN SHARE MODE")
+            expected = rating_summary_from_reviews()
+            current = RatingSummary.objects.select_for_update().filter(pk=expected.pk).first()
+
+            mismatches = [
+                (name, getattr(current, name) if current else None, getattr(expected, name))
+                for name in FIELDS
+                if current is None or getattr(current, name) != getattr(expected, name)
+            ]
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS("Rating summary matches the review table."))
+                return
+            for name, stored, actual in mismatches:
+                self.stdout.write(f"{name}: stored {stored}, actual {actual}")
+            if not options["fix"]:
+                raise CommandError("Rating summary is out of date. Run again with --fix to repair it.")
+            expected.save()
+        self.stdout.write(self.style.SUCCESS("Rating summary fixed."))
@@ -0,0 +1,31 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.seed import SCALES, seed
+
+COUNT_OPTIONS = ("clients", "staff", "service_types", "appointments", "years")
+
+
+class Command(BaseCommand):
+    help = "Insert synthetic users, vehicles, service types, appointments and reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALES), default="small")
+        for name in COUNT_OPTIONS:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f"Override the {name} of the scale.")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for the same data on every run.")
+        parser.add_argument("--password", default="password", help="Password of every created user.")
+
+    def handle(self, *args, **options):
+        counts = dict(SCALES[options["scale"]])
+        counts.update({name: options[name] for name in COUNT_OPTIONS if options[name] is not None})
+
+        started = time.perf_counter()
+        result = seed(counts, random.Random(options["seed"]), options["password"])
+        elapsed = time.perf_counter() - started
+
+        summary = ", ".join(f"{count} {name}" for name, count in result.counts().items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s."))
+        self.stdout.write(f"Usernames start with '{result.tag}-', e.g. {result.tag}-client1 and {result.tag}-staff1.")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import expand_campaigns, send_pending
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Emails per SMTP connection.")
+        parser.add_argument(
+            "--rate-limit", type=float, default=None, help="Maximum emails per second (0 = no limit)."
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            queued = expand_campaigns()
+            if queued:
+                self.stdout.write(f"Queued {queued} campaign emails.")
+            sent, failed = send_pending(options["batch_size"], options["rate_limit"])
+            if sent or failed or not options["loop"]:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import SlowQuery
+from core.slowlog import read_db_records, read_file_records, worst_offenders
+
+
+class Command(BaseCommand):
+    help = "Summarize recorded slow queries by normalized SQL, worst total time first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=24, help="Only queries recorded in the last N hours.")
+        parser.add_argument("--limit", type=int, default=20, help="Number of query shapes to show.")
+        parser.add_argument(
+            "--source",
+            choices=["file", "db"],
+            default=None,
+            help="Where to read records from (default: SLOW_QUERY_SINK).",
+        )
+        parser.add_argument(
+            "--prune", action="store_true", help="Delete database records older than the time window."
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        source = options["source"] or settings.SLOW_QUERY_SINK
+        records = read_db_records(since) if source == "db" else read_file_records(since)
+        offenders = worst_offenders(records, options["limit"])
+
+        if not offenders:
+            self.stdout.write(f"No slow queries in the last {options['hours']:g} hours.")
+        for rank, offender in enumerate(offenders, 1):
+            self.stdout.write(
+                f"{rank}. {offender.count}x total {offender.total_ms:.1f} ms, "
+                f"avg {offender.total_ms / offender.count:.1f} ms, max {offender.max_ms:.1f} ms"
+            )
+            self.stdout.write(f"   view: {offender.top_view}   at: {offender.call_site}")
+            self.stdout.write(f"   {offender.shape}")
+
+        if options["prune"]:
+            deleted, _ = SlowQuery.objects.filter(recorded_at__lt=since).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} older record(s)."))
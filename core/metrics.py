@@ -0,0 +1,192 @@
+import contextvars
+import threading
+import time
+
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+
+# ขอบบนของแต่ละ bucket (ค่าเดียวกับ default ของ client library ของ Prometheus)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+# สถิติของ request ที่กำลังทำงานอยู่ (None เมื่อไม่ได้อยู่ใน MetricsMiddleware)
+_current = contextvars.ContextVar("core_metrics_request", default=None)
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "template_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # ใช้เป็น connection.execute_wrapper: นับทุก query และเวลาที่ใช้ใน database
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class ViewMetrics:
+    def __init__(self):
+        # (method, status) -> จำนวน request
+        self.responses = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_size = Histogram(SIZE_BUCKETS)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Per-process metrics of every view, keyed by resolved URL name.
+
+    Each worker process keeps its own numbers in memory. Under a server with
+    several workers (gunicorn ``--workers``, uWSGI ``processes``) a request to
+    ``/metrics`` is answered by whichever worker gets it, so counters appear
+    to jump back and forth between scrapes. Give every worker its own scrape
+    target (e.g. one port per worker) and let Prometheus sum them, or run a
+    single worker when these metrics are needed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def observe(self, view, method, status, duration, stats, size):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            key = (method, status)
+            metrics.responses[key] = metrics.responses.get(key, 0) + 1
+            metrics.duration.observe(duration)
+            metrics.queries.observe(stats.queries)
+            metrics.query_seconds += stats.query_seconds
+            metrics.template_seconds += stats.template_seconds
+            if size is not None:
+                metrics.response_size.observe(size)
+
+    def expose(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                "# HELP ev_http_requests_total Responses by view, method and status code.",
+                "# TYPE ev_http_requests_total counter",
+            ]
+            for view, metrics in views:
+                for (method, status), count in sorted(metrics.responses.items()):
+                    lines.append(
+                        f'ev_http_requests_total{{view="{_label(view)}",method="{_label(method)}",'
+                        f'status="{status}"}} {count}'
+                    )
+            histograms = (
+                ("ev_http_request_duration_seconds", "Time to build the response.", "duration"),
+                ("ev_db_queries_per_request", "SQL queries run by one request.", "queries"),
+                ("ev_http_response_size_bytes", "Size of non-streaming response bodies.", "response_size"),
+            )
+            for name, help_text, attr in histograms:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for view, metrics in views:
+                    lines.extend(getattr(metrics, attr).lines(name, f'view="{_label(view)}"'))
+            totals = (
+                ("ev_db_query_seconds_total", "Time spent in SQL queries.", "query_seconds"),
+                ("ev_template_render_seconds_total", "Time spent rendering templates.", "template_seconds"),
+            )
+            for name, help_text, attr in totals:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for view, metrics in views:
+                    lines.append(f'{name}{{view="{_label(view)}"}} {getattr(metrics, attr)}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Record latency, SQL and template time and response size of every request.
+
+    Only installed when ``METRICS_ENABLED`` is on, so it costs nothing
+    otherwise. Put it first in ``MIDDLEWARE`` to time the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "unmatched"
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, stats, size)
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class MetricsDjangoTemplates(DjangoTemplates):
+    """Django template backend that adds render time to the current request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:02
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def backfill_slot_occupancy(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    SlotOccupancy = apps.get_model("core", "SlotOccupancy")
+
+    # สร้างเฉพาะ slot ตั้งแต่วันนี้เป็นต้นไป เพราะวันที่ผ่านมาแล้วจองไม่ได้อยู่แล้ว
+    rows = (
+        Appointment.objects.filter(date__gte=timezone.localdate())
+        .exclude(status__iexact="REJECT")
+        .values("date", "time")
+        .annotate(booked=Count("id"))
+    )
+    SlotOccupancy.objects.bulk_create(
+        [SlotOccupancy(date=row["date"], time=row["time"], booked=row["booked"]) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_profile_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'core_slot_occupancy',
+                'constraints': [models.UniqueConstraint(fields=('date', 'time'), name='core_slot_occupancy_date_time_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_slot_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_slotoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotoccupancy',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
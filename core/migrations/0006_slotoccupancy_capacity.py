@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_initial_capacity(apps, schema_editor):
+    SlotOccupancy = apps.get_model("core", "SlotOccupancy")
+    SlotOccupancy.objects.update(capacity=settings.BOOKING_SLOT_CAPACITY)
+    # slot เก่าที่เคยถูกจองซ้อนไว้ก่อนมี constraint ให้ capacity เท่ากับที่จองไปแล้ว
+    SlotOccupancy.objects.filter(booked__gt=F("capacity")).update(capacity=F("booked"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_slotoccupancy_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotoccupancy',
+            name='capacity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(set_initial_capacity, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='core_slot_occupancy_booked_lte_capacity'),
+        ),
+    ]
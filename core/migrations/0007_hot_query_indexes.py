@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_slotoccupancy_capacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', '-id'], name='core_appt_user_id_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['-date', '-time', 'id'], name='core_appt_date_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'status'], name='core_appt_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'REJECT'), _negated=True), fields=['date', 'time'], name='core_appt_active_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['score', 'id'], name='core_review_score_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['user', 'id'], name='core_vehicle_user_id_idx'),
+        ),
+    ]
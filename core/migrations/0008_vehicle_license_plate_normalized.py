@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+_PLATE_SPACES = re.compile(r"[\s\u200b\u200c\u200d\ufeff]+")
+
+
+def normalize_license_plate(value):
+    # สำเนาของ core.models.normalize_license_plate ณ ตอนที่สร้าง migration นี้
+    value = unicodedata.normalize("NFC", value or "").translate(_THAI_DIGITS)
+    return _PLATE_SPACES.sub("", value).casefold()
+
+
+def backfill_normalized_plates(apps, schema_editor):
+    Vehicle = apps.get_model("core", "Vehicle")
+
+    seen = {}
+    duplicates = []
+    batch = []
+    for vehicle in Vehicle.objects.only("id", "license_plate").order_by("id").iterator(chunk_size=2000):
+        vehicle.license_plate_normalized = normalize_license_plate(vehicle.license_plate)
+        if vehicle.license_plate_normalized in seen:
+            duplicates.append((seen[vehicle.license_plate_normalized], vehicle.pk))
+        seen[vehicle.license_plate_normalized] = vehicle.pk
+        batch.append(vehicle)
+        if len(batch) >= 2000:
+            Vehicle.objects.bulk_update(batch, ["license_plate_normalized"])
+            batch = []
+    if batch:
+        Vehicle.objects.bulk_update(batch, ["license_plate_normalized"])
+
+    if duplicates:
+        pairs = ", ".join(f"#{first} / #{second}" for first, second in duplicates[:20])
+        raise RuntimeError(
+            f"Vehicles with duplicate license plates must be merged before this migration: {pairs}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='license_plate_normalized',
+            field=models.CharField(editable=False, max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_plates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='license_plate_normalized',
+            field=models.CharField(editable=False, max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,151 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:15
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_search_entry_document_trgm ON core_search_entry USING gin (document gin_trgm_ops)",
+    # ให้ตัวกรองทะเบียนในหน้า staff vehicle list (contains) ใช้ index ได้
+    "CREATE INDEX IF NOT EXISTS core_vehicle_plate_norm_trgm ON core_vehicle USING gin (license_plate_normalized gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_vehicle_plate_norm_trgm",
+    "DROP INDEX IF EXISTS core_search_entry_document_trgm",
+]
+
+# FTS5 แบบ external content + trigram tokenizer (ค้นหา substring ได้ รวมถึงข้อความภาษาไทยที่ไม่มีการเว้นวรรค)
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_entry_fts USING fts5("
+    "document, content='core_search_entry', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS core_search_entry_ai AFTER INSERT ON core_search_entry BEGIN "
+    "INSERT INTO core_search_entry_fts(rowid, document) VALUES (new.id, new.document); END",
+    "CREATE TRIGGER IF NOT EXISTS core_search_entry_ad AFTER DELETE ON core_search_entry BEGIN "
+    "INSERT INTO core_search_entry_fts(core_search_entry_fts, rowid, document) VALUES ('delete', old.id, old.document); END",
+    "CREATE TRIGGER IF NOT EXISTS core_search_entry_au AFTER UPDATE ON core_search_entry BEGIN "
+    "INSERT INTO core_search_entry_fts(core_search_entry_fts, rowid, document) VALUES ('delete', old.id, old.document); "
+    "INSERT INTO core_search_entry_fts(rowid, document) VALUES (new.id, new.document); END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_search_entry_au",
+    "DROP TRIGGER IF EXISTS core_search_entry_ad",
+    "DROP TRIGGER IF EXISTS core_search_entry_ai",
+    "DROP TABLE IF EXISTS core_search_entry_fts",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_indexes(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD})
+
+
+def drop_search_indexes(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD})
+
+
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+_PLATE_SPACES = re.compile(r"[\s\u200b\u200c\u200d\ufeff]+")
+BATCH_SIZE = 2000
+
+
+# สำเนาของ core.search / core.models ณ ตอนที่สร้าง migration นี้
+def normalize_license_plate(value):
+    value = unicodedata.normalize("NFC", value or "").translate(_THAI_DIGITS)
+    return _PLATE_SPACES.sub("", value).casefold()
+
+
+def normalize_text(value):
+    value = unicodedata.normalize("NFC", str(value or "")).translate(_THAI_DIGITS)
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+def _document(*parts):
+    return normalize_text(" ".join(str(part) for part in parts if part))
+
+
+def _user_entry(SearchEntry, user):
+    profile = getattr(user, "profile", None)
+    phone_number = getattr(profile, "phone_number", "") or ""
+    full_name = f"{user.first_name} {user.last_name}".strip()
+    return SearchEntry(
+        kind="USER",
+        object_id=user.pk,
+        title=user.username,
+        subtitle=" · ".join(part for part in (full_name, user.email, phone_number) if part),
+        document=_document(user.username, full_name, user.email, phone_number),
+    )
+
+
+def _vehicle_entry(SearchEntry, vehicle):
+    return SearchEntry(
+        kind="VEHICLE",
+        object_id=vehicle.pk,
+        title=vehicle.license_plate,
+        subtitle=f"{vehicle.brand} {vehicle.model}",
+        document=_document(
+            vehicle.license_plate, normalize_license_plate(vehicle.license_plate), vehicle.brand, vehicle.model
+        ),
+    )
+
+
+def _appointment_entry(SearchEntry, appointment):
+    license_plate = appointment.vehicle.license_plate
+    date_time = f"{appointment.date:%d/%m/%Y} - {appointment.time:%H:%M}"
+    return SearchEntry(
+        kind="APPOINTMENT",
+        object_id=appointment.pk,
+        title=f"Appointment #{appointment.pk}",
+        subtitle=f"{license_plate} · {date_time} · {appointment.status}",
+        document=_document(f"#{appointment.pk}", license_plate, normalize_license_plate(license_plate)),
+    )
+
+
+def backfill_search_entries(apps, schema_editor):
+    # ทำหลังสร้าง trigger ของ FTS5 เพื่อให้ index ของ SQLite ถูกเติมไปพร้อมกัน
+    SearchEntry = apps.get_model("core", "SearchEntry")
+    sources = [
+        (apps.get_model("auth", "User").objects.select_related("profile"), _user_entry),
+        (apps.get_model("core", "Vehicle").objects.all(), _vehicle_entry),
+        (apps.get_model("core", "Appointment").objects.select_related("vehicle"), _appointment_entry),
+    ]
+    for queryset, to_entry in sources:
+        batch = []
+        for obj in queryset.order_by("id").iterator(chunk_size=BATCH_SIZE):
+            batch.append(to_entry(SearchEntry, obj))
+            if len(batch) >= BATCH_SIZE:
+                SearchEntry.objects.bulk_create(batch)
+                batch = []
+        SearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_vehicle_license_plate_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('USER', 'User'), ('VEHICLE', 'Vehicle'), ('APPOINTMENT', 'Appointment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('document', models.TextField()),
+            ],
+            options={
+                'db_table': 'core_search_entry',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='core_search_entry_kind_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(backfill_search_entries, migrations.RunPython.noop),
+    ]
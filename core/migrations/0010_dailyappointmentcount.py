@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_counts(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    DailyAppointmentCount = apps.get_model("core", "DailyAppointmentCount")
+
+    totals = {}
+    rows = Appointment.objects.values_list("date", "status").annotate(total=Count("id")).order_by()
+    for date, status, total in rows:
+        key = (date, (status or "").upper())
+        totals[key] = totals.get(key, 0) + total
+    DailyAppointmentCount.objects.bulk_create(
+        [DailyAppointmentCount(date=date, status=status, count=count) for (date, status), count in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAppointmentCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN-PROGRESS', 'In progress'), ('DONE', 'Done'), ('REJECT', 'Reject')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'core_daily_appointment_count',
+                'constraints': [models.UniqueConstraint(fields=('date', 'status'), name='core_daily_appt_count_date_status_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_counts, migrations.RunPython.noop),
+    ]
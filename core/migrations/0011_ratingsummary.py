@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_summary(apps, schema_editor):
+    Review = apps.get_model("core", "Review")
+    RatingSummary = apps.get_model("core", "RatingSummary")
+
+    summary = RatingSummary(pk=1)
+    rows = Review.objects.filter(score__in=range(1, 6)).values_list("score").annotate(total=Count("id")).order_by()
+    for score, total in rows:
+        setattr(summary, f"score_{score}", total)
+        summary.review_count += total
+        summary.score_sum += score * total
+    summary.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_dailyappointmentcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_1', models.PositiveIntegerField(default=0)),
+                ('score_2', models.PositiveIntegerField(default=0)),
+                ('score_3', models.PositiveIntegerField(default=0)),
+                ('score_4', models.PositiveIntegerField(default=0)),
+                ('score_5', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'core_rating_summary',
+            },
+        ),
+        migrations.RunPython(backfill_rating_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_emailcampaign'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_ms', models.FloatField()),
+                ('sql', models.TextField()),
+                ('params_shape', models.JSONField(default=list)),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('call_site', models.CharField(blank=True, max_length=500)),
+            ],
+            options={
+                'db_table': 'core_slow_query',
+                'indexes': [models.Index(fields=['recorded_at'], name='core_slow_query_recorded_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,26 @@
+import re
+import unicodedata
+
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+# ตัวเลขไทย ๐-๙ -> 0-9
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+# ช่องว่างทุกชนิด รวมถึง zero-width space ที่มักติดมาจากการ copy/paste ข้อความไทย
+_PLATE_SPACES = re.compile(r"[\s\u200b\u200c\u200d\ufeff]+")
+
+
+def normalize_license_plate(value):
+    """Canonical form of a license plate used for duplicate detection and search.
+
+    Thai vowels/tone marks are NFC-normalized, Thai digits become Arabic
+    digits, whitespace is removed and the result is case-folded, so
+    "กข 1234" and "กข๑๒๓๔" map to the same value.
+    """
+    value = unicodedata.normalize("NFC", value or "").translate(_THAI_DIGITS)
+    return _PLATE_SPACES.sub("", value).casefold()
 
 
 class Profile(models.Model):
@@ -24,13 +44,25 @@ class Vehicle(models.Model):
     brand = models.CharField(max_length=50)
     model = models.CharField(max_length=50)
     license_plate = models.CharField(max_length=50, unique=True)
+    license_plate_normalized = models.CharField(max_length=50, unique=True, editable=False)
 
     class Meta:
         db_table = "core_vehicle"
+        indexes = [
+            # client VehicleView: filter(user=...).order_by("id")
+            models.Index(fields=["user", "id"], name="core_vehicle_user_id_idx"),
+        ]
 
     def __str__(self):
         return f"Vehicle : {self.brand} {self.model} ({self.license_plate})"
 
+    def save(self, *args, **kwargs):
+        self.license_plate_normalized = normalize_license_plate(self.license_plate)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "license_plate" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "license_plate_normalized"}
+        super().save(*args, **kwargs)
+
 
 class ServiceType(models.Model):
     name = models.CharField(max_length=100)
@@ -64,6 +96,20 @@ class Appointment(models.Model):
 
     class Meta:
         db_table = "core_appointment"
+        indexes = [
+            # client AppointmentView: filter(user=...).order_by("-id")
+            models.Index(fields=["user", "-id"], name="core_appt_user_id_desc_idx"),
+            # staff AppointmentListView: order_by("-date", "-time", "id") + keyset seek
+            models.Index(fields=["-date", "-time", "id"], name="core_appt_date_time_id_idx"),
+            # staff AppointmentListView: filter(date=..., status=...)
+            models.Index(fields=["date", "status"], name="core_appt_date_status_idx"),
+            # slot occupancy backfill/rebuild: active appointments per (date, time)
+            models.Index(
+                fields=["date", "time"],
+                condition=~models.Q(status="REJECT"),
+                name="core_appt_active_slot_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Appointment id : #{self.pk}"
@@ -83,6 +129,222 @@ class Review(models.Model):
 
     class Meta:
         db_table = "core_review"
+        indexes = [
+            # staff ReviewListView: filter(score=...).order_by("id")
+            models.Index(fields=["score", "id"], name="core_review_score_id_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Review id : #{self.pk} - {self.score}"
+
+
+class SlotOccupancy(models.Model):
+    """Number of active (non-rejected) appointments booked into one date/time slot.
+
+    Maintained by the Appointment signals in ``core.signals`` so the booking
+    page can read a bounded date window instead of scanning every appointment.
+    The check constraint keeps ``booked`` from ever exceeding ``capacity``.
+    """
+
+    date = models.DateField()
+    time = models.TimeField()
+    booked = models.PositiveIntegerField(default=0)
+    # จำนวนช่องบริการ (service bay) ที่รับได้ใน slot นี้: BOOKING_SLOT_CAPACITY ณ ตอนที่จองครั้งล่าสุด
+    capacity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "core_slot_occupancy"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "time"], name="core_slot_occupancy_date_time_uniq"),
+            models.CheckConstraint(
+                condition=models.Q(booked__lte=models.F("capacity")),
+                name="core_slot_occupancy_booked_lte_capacity",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Slot : {self.date} {self.time} ({self.booked})"
+
+
+class DailyAppointmentCount(models.Model):
+    """Number of appointments per date and status.
+
+    Maintained by the Appointment signals in ``core.signals`` so the staff
+    dashboard calendar reads one month of rows instead of every appointment.
+    Rebuild with ``manage.py rebuild_appointment_counts``.
+    """
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Appointment.Status.choices)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "core_daily_appointment_count"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "status"], name="core_daily_appt_count_date_status_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Daily count : {self.date} {self.status} ({self.count})"
+
+
+class RatingSummary(models.Model):
+    """Review count per score plus the running total, kept in a single row.
+
+    Maintained by the Review signals in ``core.signals`` so the staff
+    dashboard does not aggregate the whole review table on every load.
+    Check it against the raw table with ``manage.py reconcile_rating_summary``.
+    """
+
+    SCORES = range(1, 6)
+
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    # ผลรวมของคะแนนทั้งหมด ใช้คำนวณค่าเฉลี่ย
+    score_sum = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "core_rating_summary"
+
+    def __str__(self):
+        return f"Rating summary : {self.review_count} reviews"
+
+    def count_of(self, score):
+        return getattr(self, f"score_{score}")
+
+    @property
+    def average(self):
+        return self.score_sum / self.review_count if self.review_count else 0
+
+
+class EmailCampaign(models.Model):
+    """One email sent by staff to every client user in a segment.
+
+    The ``send_outbox`` command expands a QUEUED campaign into one
+    ``OutboundEmail`` per recipient (see ``core.outbox.expand_campaigns``);
+    progress is read from the status of those emails.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        SENDING = "SENDING", "Sending"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    # ตัวกรองของ core.segments.client_segment เช่น {"username": "som", "appointment_status": "DONE"}
+    filters = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="email_campaigns"
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    recipient_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "core_email_campaign"
+
+    def __str__(self):
+        return f"Campaign #{self.pk} : {self.subject}"
+
+
+class OutboundEmail(models.Model):
+    """One email waiting in (or already sent from) the outbox.
+
+    Views queue emails with ``core.outbox.queue_email`` and the
+    ``send_outbox`` command delivers them in batches, retrying failures with
+    backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS`` is reached.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENDING = "SENDING", "Sending"
+        SENT = "SENT", "Sent"
+        DEAD = "DEAD", "Dead"
+
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbound_emails"
+    )
+    campaign = models.ForeignKey(
+        EmailCampaign, on_delete=models.SET_NULL, null=True, blank=True, related_name="emails"
+    )
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # ส่งได้ตั้งแต่เวลานี้ (ใช้ทำ backoff) และเวลาที่ worker หยิบไปส่งล่าสุด
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "core_outbound_email"
+        indexes = [
+            # worker: filter(status=PENDING, next_attempt_at__lte=now).order_by("next_attempt_at", "id")
+            models.Index(fields=["status", "next_attempt_at", "id"], name="core_outbox_status_next_idx"),
+            models.Index(fields=["user", "-id"], name="core_outbox_user_id_desc_idx"),
+            models.Index(fields=["campaign", "status"], name="core_outbox_campaign_idx"),
+        ]
+
+    def __str__(self):
+        return f"Email #{self.pk} to {self.to_email} ({self.status})"
+
+
+class SearchEntry(models.Model):
+    """Denormalized, search-ready text for one user, vehicle or appointment.
+
+    Kept in sync by ``core.signals``; the database-specific index on
+    ``document`` (pg_trgm on PostgreSQL, FTS5 on SQLite) is created in the
+    migration.
+    """
+
+    class Kind(models.TextChoices):
+        USER = "USER", "User"
+        VEHICLE = "VEHICLE", "Vehicle"
+        APPOINTMENT = "APPOINTMENT", "Appointment"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    subtitle = models.CharField(max_length=255, blank=True)
+    document = models.TextField()
+
+    class Meta:
+        db_table = "core_search_entry"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="core_search_entry_kind_object_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Search entry : {self.kind} #{self.object_id}"
+
+
+class SlowQuery(models.Model):
+    """A SQL query that took longer than ``SLOW_QUERY_MS`` (``SLOW_QUERY_SINK=db``).
+
+    Written by ``core.slowlog`` and summarized by the ``slow_queries`` command.
+    """
+
+    recorded_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.FloatField()
+    sql = models.TextField()
+    # ชนิดของ parameter แต่ละตัว (ไม่เก็บค่าจริง เพราะอาจเป็นข้อมูลส่วนตัว)
+    params_shape = models.JSONField(default=list)
+    view = models.CharField(max_length=200, blank=True)
+    call_site = models.CharField(max_length=500, blank=True)
+
+    class Meta:
+        db_table = "core_slow_query"
+        indexes = [
+            # slow_queries: filter(recorded_at__gte=...)
+            models.Index(fields=["recorded_at"], name="core_slow_query_recorded_idx"),
+        ]
@@ -0,0 +1,110 @@
+import logging
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from core.callsite import app_call_site
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# IN (%s, %s, ...) มีจำนวน placeholder ไม่เท่ากันในแต่ละครั้ง แต่เป็น query รูปแบบเดียวกัน
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(Exception):
+    """Raised in ``raise`` mode when a request repeats the same query shape too often."""
+
+
+def normalize_sql(sql):
+    """The shape of ``sql``: literals and parameter lists replaced by ``?``."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class RepeatedQuery:
+    def __init__(self, sql, call_site):
+        self.sql = sql
+        self.call_site = call_site
+        self.count = 0
+
+    def __str__(self):
+        return f"{self.count}x {self.sql} (at {self.call_site})"
+
+
+class QueryShapeWatcher:
+    """``connection.execute_wrapper`` that counts SELECTs per normalized shape.
+
+    A shape seen more than ``threshold`` times is kept in ``repeated`` with
+    the call site of the query that crossed the threshold.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.repeated = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == "SELECT":
+            shape = normalize_sql(sql)
+            count = self.counts[shape] = self.counts.get(shape, 0) + 1
+            if count > self.threshold:
+                # เก็บ stack แค่ครั้งแรกที่เกิน threshold เพื่อไม่ให้ช้าลงทุก query
+                problem = self.repeated.get(shape)
+                if problem is None:
+                    problem = self.repeated[shape] = RepeatedQuery(shape, app_call_site(skip_files=(__file__,)))
+                problem.count = count
+        return execute(sql, params, many, context)
+
+    @property
+    def problems(self):
+        return list(self.repeated.values())
+
+
+@contextmanager
+def watch_queries(threshold=None):
+    """Collect repeated query shapes run inside the block, e.g. in a test."""
+    watcher = QueryShapeWatcher(settings.NPLUSONE_THRESHOLD if threshold is None else threshold)
+    with connection.execute_wrapper(watcher):
+        yield watcher
+
+
+class NPlusOneMiddleware:
+    """Report requests that run the same query shape over and over (N+1).
+
+    ``NPLUSONE_MODE`` decides what happens: ``log`` writes a warning,
+    ``header`` also adds an ``X-N-Plus-One`` response header and ``raise``
+    raises ``NPlusOneError`` (meant for tests).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.NPLUSONE_MODE
+        if mode == "off":
+            return self.get_response(request)
+        with watch_queries() as watcher:
+            response = self.get_response(request)
+        problems = watcher.problems
+        if not problems:
+            return response
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or request.path
+        report = "; ".join(str(problem) for problem in problems)
+        if mode == "raise":
+            raise NPlusOneError(f"N+1 queries in {view}: {report}")
+        logger.warning("N+1 queries in %s: %s", view, report)
+        if mode == "header":
+            # header ต้องเป็น ASCII บรรทัดเดียว จึงใส่แค่จำนวนครั้งและตำแหน่งในโค้ด
+            response["X-N-Plus-One"] = ", ".join(
+                f"{problem.count}x at {problem.call_site}".encode("ascii", "replace").decode() for problem in problems
+            )
+        return response
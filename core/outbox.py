@@ -0,0 +1,218 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import EmailCampaign, OutboundEmail
+from core.segments import client_segment
+
+
+def queue_email(to_email, subject, body, user=None, from_email=None):
+    """Store an email in the outbox; the ``send_outbox`` worker delivers it."""
+    return OutboundEmail.objects.create(
+        user=user,
+        to_email=to_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        body=body,
+    )
+
+
+def queue_campaign(subject, body, filters, created_by=None):
+    """Create a campaign; ``send_outbox`` expands it into per-recipient emails."""
+    return EmailCampaign.objects.create(subject=subject, body=body, filters=filters, created_by=created_by)
+
+
+def expand_campaign(campaign, chunk_size=1000):
+    """Queue one outbox email per recipient of ``campaign`` and return the count.
+
+    Recipients are streamed from the database and inserted in chunks so a
+    large segment never sits in memory at once.
+    """
+    from_email = settings.DEFAULT_FROM_EMAIL
+    recipients = (
+        client_segment(campaign.filters)
+        .exclude(email="")
+        .order_by("id")
+        .values_list("id", "email")
+        .iterator(chunk_size=chunk_size)
+    )
+    total = 0
+    batch = []
+    with transaction.atomic():
+        for user_id, email in recipients:
+            batch.append(OutboundEmail(
+                user_id=user_id,
+                campaign=campaign,
+                to_email=email,
+                from_email=from_email,
+                subject=campaign.subject,
+                body=campaign.body,
+            ))
+            if len(batch) >= chunk_size:
+                OutboundEmail.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            OutboundEmail.objects.bulk_create(batch)
+            total += len(batch)
+        campaign.status = EmailCampaign.Status.SENDING
+        campaign.recipient_count = total
+        campaign.save(update_fields=["status", "recipient_count"])
+    return total
+
+
+def expand_campaigns():
+    """Expand every QUEUED campaign; returns the number of emails queued."""
+    total = 0
+    for campaign in EmailCampaign.objects.filter(status=EmailCampaign.Status.QUEUED).order_by("id"):
+        # หยิบทีละ campaign และ lock ไว้ กันสอง worker expand campaign เดียวกันซ้ำ
+        with transaction.atomic():
+            locked = (
+                EmailCampaign.objects.select_for_update()
+                .filter(pk=campaign.pk, status=EmailCampaign.Status.QUEUED)
+                .first()
+            )
+            if locked:
+                total += expand_campaign(locked)
+    return total
+
+
+def campaign_progress(campaign):
+    """Number of the campaign's emails in each ``OutboundEmail.Status``."""
+    counts = dict(campaign.emails.values_list("status").annotate(total=Count("id")).order_by())
+    return {status: counts.get(status, 0) for status in OutboundEmail.Status.values}
+
+
+class RateLimiter:
+    """Spread sends so no more than ``per_second`` go out each second (0 = no limit)."""
+
+    def __init__(self, per_second=None):
+        self.interval = 1 / per_second if per_second else 0
+        self.next_at = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failure (exponential backoff)."""
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY)
+
+
+def claim_batch(batch_size=None, now=None):
+    """Mark up to ``batch_size`` due emails as SENDING and return them.
+
+    Emails left in SENDING longer than ``EMAIL_OUTBOX_CLAIM_TIMEOUT`` (a
+    worker died mid-batch) are claimed again.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = now or timezone.now()
+    abandoned = now - timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    is_due = (
+        Q(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.Status.SENDING, claimed_at__lt=abandoned)
+    )
+    due = OutboundEmail.objects.filter(is_due).order_by("next_attempt_at", "id")
+
+    with transaction.atomic():
+        if db_connection.features.has_select_for_update_skip_locked:
+            # ให้หลาย worker ทำงานพร้อมกันได้โดยไม่หยิบอีเมลซ้ำกัน
+            due = due.select_for_update(skip_locked=True)
+        candidates = list(due[:batch_size].values_list("pk", flat=True))
+        # ตรวจเงื่อนไขซ้ำตอน UPDATE: ถ้าไม่มี SKIP LOCKED อีก worker อาจอ่านแถวชุดเดียวกันไปแล้ว
+        # และ claim (หรือส่งเสร็จ) ก่อนเรา แถวนั้นจะไม่ตรงเงื่อนไขอีกและไม่ถูกอัปเดต
+        OutboundEmail.objects.filter(is_due, pk__in=candidates).update(
+            status=OutboundEmail.Status.SENDING, claimed_at=now
+        )
+        # ส่งเฉพาะแถวที่ UPDATE ของเรา claim ได้จริง
+        return list(
+            OutboundEmail.objects.filter(pk__in=candidates, status=OutboundEmail.Status.SENDING, claimed_at=now)
+            .order_by("next_attempt_at", "id")
+        )
+
+
+def _mark_sent(email, now):
+    email.status = OutboundEmail.Status.SENT
+    email.sent_at = now
+    email.last_error = ""
+    email.save(update_fields=["status", "sent_at", "last_error"])
+
+
+def _mark_failed(email, error, now):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.Status.DEAD
+    else:
+        email.status = OutboundEmail.Status.PENDING
+        email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def deliver(emails, connection=None, limiter=None):
+    """Send ``emails`` over one SMTP connection and record each result.
+
+    Returns ``(sent, failed)``.
+    """
+    if not emails:
+        return 0, 0
+    limiter = limiter or RateLimiter(settings.EMAIL_OUTBOX_RATE_LIMIT)
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # เปิด connection ไม่ได้ ทั้ง batch นับเป็นการส่งไม่สำเร็จ 1 ครั้ง
+        now = timezone.now()
+        for email in emails:
+            _mark_failed(email, exc, now)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to_email], connection=connection
+            )
+            limiter.wait()
+            try:
+                # ส่งทีละฉบับผ่าน connection เดิม เพื่อให้รู้ผลของแต่ละฉบับ
+                if not connection.send_messages([message]):
+                    raise RuntimeError("The email backend did not accept the message.")
+            except Exception as exc:
+                _mark_failed(email, exc, timezone.now())
+                failed += 1
+            else:
+                _mark_sent(email, timezone.now())
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_pending(batch_size=None, rate_limit=None):
+    """Deliver every due email, one batch (and one connection) at a time.
+
+    ``rate_limit`` (emails per second) defaults to ``EMAIL_OUTBOX_RATE_LIMIT``.
+    Returns ``(sent, failed)`` totals.
+    """
+    limiter = RateLimiter(settings.EMAIL_OUTBOX_RATE_LIMIT if rate_limit is None else rate_limit)
+    total_sent = total_failed = 0
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            return total_sent, total_failed
+        sent, failed = deliver(emails, limiter=limiter)
+        total_sent += sent
+        total_failed += failed
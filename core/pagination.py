@@ -0,0 +1,132 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, start_index, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        # ลำดับ (เริ่มที่ 1) ของแถวแรกในหน้านี้ ใช้แสดงคอลัมน์ No
+        self.start_index = start_index
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def enumerate(self):
+        return enumerate(self.object_list, start=self.start_index)
+
+    def link_params(self, params):
+        """Set ``next_query``/``previous_query`` from the request's GET params.
+
+        Filters in ``params`` are kept so every page stays on the same result set.
+        """
+        params = params.copy()
+        self.next_query = self.previous_query = None
+        for attr, cursor in (("next_query", self.next_cursor), ("previous_query", self.previous_cursor)):
+            if cursor:
+                params["cursor"] = cursor
+                setattr(self, attr, params.urlencode())
+        return self
+
+
+def encode_cursor(direction, values, position):
+    """Cursor for the page after (``"next"``) or before (``"prev"``) the row with key ``values``."""
+    raw = json.dumps({"d": direction, "k": values, "n": position}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, fields, model):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values, position = data["d"], data["k"], int(data["n"])
+        if direction not in ("next", "prev") or len(values) != len(fields):
+            return None
+        values = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+    except (ValueError, KeyError, TypeError, binascii.Error, ValidationError):
+        # cursor เสียหรือถูกแก้ไข ให้กลับไปหน้าแรก
+        return None
+    return direction, values, position
+
+
+def seek_condition(fields, values, forward):
+    """Rows strictly after (``forward``) or before the cursor row in ``fields`` order."""
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        step_down = descending if forward else not descending
+        branch = Q(**{f"{name}__{'lt' if step_down else 'gt'}": values[index]})
+        for prev_name, prev_value in zip((f for f, _ in fields[:index]), values[:index]):
+            branch &= Q(**{prev_name: prev_value})
+        condition |= branch
+    return condition
+
+
+def _fields(ordering):
+    return [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+
+
+def _page_query(queryset, ordering, fields, decoded, page_size):
+    if decoded is None:
+        return queryset.order_by(*ordering)[: page_size + 1]
+    direction, values, _ = decoded
+    if direction == "next":
+        return queryset.filter(seek_condition(fields, values, True)).order_by(*ordering)[: page_size + 1]
+    reverse = [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+    return queryset.filter(seek_condition(fields, values, False)).order_by(*reverse)[: page_size + 1]
+
+
+def page_query(queryset, ordering, cursor=None, page_size=None):
+    """The SELECT that ``keyset_paginate`` runs for ``cursor``, not yet evaluated (e.g. to EXPLAIN it)."""
+    page_size = page_size or settings.STAFF_PAGE_SIZE
+    fields = _fields(ordering)
+    decoded = _decode_cursor(cursor, fields, queryset.model) if cursor else None
+    return _page_query(queryset, ordering, fields, decoded, page_size)
+
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=None):
+    """Paginate ``queryset`` by seeking on ``ordering`` instead of using OFFSET.
+
+    ``ordering`` must be unique per row (end it with the primary key), e.g.
+    ``("-date", "-time", "id")``. The cursor is an opaque string produced by a
+    previous page's ``next_cursor``/``previous_cursor``.
+    """
+    page_size = page_size or settings.STAFF_PAGE_SIZE
+    fields = _fields(ordering)
+    decoded = _decode_cursor(cursor, fields, queryset.model) if cursor else None
+
+    rows = list(_page_query(queryset, ordering, fields, decoded, page_size))
+    has_more, rows = len(rows) > page_size, rows[:page_size]
+    if decoded is None:
+        start_index, has_next, has_previous = 1, has_more, False
+    elif decoded[0] == "next":
+        start_index, has_next, has_previous = decoded[2] + 1, has_more, True
+    else:
+        rows = rows[::-1]
+        start_index, has_next, has_previous = max(decoded[2] - len(rows), 1), True, has_more
+
+    def key_of(obj):
+        return [getattr(obj, name) for name, _ in fields]
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor("next", key_of(rows[-1]), start_index + len(rows) - 1)
+    if rows and has_previous:
+        previous_cursor = encode_cursor("prev", key_of(rows[0]), start_index)
+    return KeysetPage(rows, start_index, next_cursor, previous_cursor)
@@ -0,0 +1,116 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.db.models import Q
+
+from core.cache import bump_generation_on_commit, cached_query
+
+ROLE_SUPERUSER = "superuser"
+ROLE_STAFF = "staff"
+ROLE_CLIENT = "client"
+
+# backend ที่ session ซึ่ง login ไว้ก่อนเปลี่ยนมาใช้ CachedPermissionBackend บันทึกไว้
+LEGACY_BACKENDS = {"django.contrib.auth.backends.ModelBackend"}
+
+
+class UserAccess:
+    def __init__(self, permissions, groups, role):
+        # ในรูปแบบเดียวกับ user.get_all_permissions() เช่น "staff.access_dashboard"
+        self.permissions = permissions
+        self.groups = groups
+        self.role = role
+
+    def has_perm(self, perm):
+        return perm in self.permissions
+
+
+def _user_scope(user_id):
+    return f"perms:user:{user_id}"
+
+
+def _load_access(user_id, is_superuser):
+    groups = frozenset(Group.objects.filter(user=user_id).values_list("name", flat=True))
+    permissions = Permission.objects.all()
+    if not is_superuser:
+        # สิทธิ์ของ user เอง รวมกับสิทธิ์ของทุก group ที่ user อยู่ ใน query เดียว
+        permissions = permissions.filter(Q(user=user_id) | Q(group__user=user_id)).distinct()
+    names = frozenset(
+        f"{app_label}.{codename}"
+        for app_label, codename in permissions.values_list("content_type__app_label", "codename").order_by()
+    )
+
+    if is_superuser:
+        role = ROLE_SUPERUSER
+    elif "Staff" in groups:
+        role = ROLE_STAFF
+    elif "Client" in groups:
+        role = ROLE_CLIENT
+    else:
+        role = None
+    return UserAccess(names, groups, role)
+
+
+def resolve(user):
+    """The effective permissions, groups and role of ``user``.
+
+    Read from the shared cache and remembered on the user object for the rest
+    of the request; invalidated by ``invalidate_user``/``invalidate_all``.
+    """
+    if not user.is_authenticated:
+        return UserAccess(frozenset(), frozenset(), None)
+    access = getattr(user, "_core_access", None)
+    if access is None:
+        user_id, is_superuser = user.pk, user.is_superuser
+        access = cached_query(
+            f"perms:{user_id}:{int(is_superuser)}",
+            [Group, Permission, _user_scope(user_id)],
+            lambda: _load_access(user_id, is_superuser),
+        )
+        user._core_access = access
+    return access
+
+
+def invalidate_user(user_id):
+    bump_generation_on_commit(_user_scope(user_id))
+
+
+def invalidate_all():
+    # group หรือ permission เปลี่ยน กระทบ user ได้หลายคน จึงล้างของทุกคน
+    bump_generation_on_commit(Group)
+    bump_generation_on_commit(Permission)
+
+
+class CachedPermissionBackend(ModelBackend):
+    """``ModelBackend`` that answers permission checks from ``resolve()``.
+
+    ``PermissionRequiredMixin``, ``user.has_perm`` and the ``perms`` template
+    variable all go through here, so an authenticated page view no longer
+    joins the permission tables.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return set(resolve(user_obj).permissions)
+
+    def has_perm(self, user_obj, perm, obj=None):
+        return user_obj.is_active and obj is None and not user_obj.is_anonymous and resolve(user_obj).has_perm(perm)
+
+
+class LegacySessionBackendMiddleware:
+    """Move sessions saved by ``ModelBackend`` over to ``CachedPermissionBackend``.
+
+    Django logs out a session whose backend is no longer listed in
+    ``AUTHENTICATION_BACKENDS``; rewriting the path keeps those users signed in.
+    Must come after ``SessionMiddleware``.
+    """
+
+    backend_path = f"{CachedPermissionBackend.__module__}.{CachedPermissionBackend.__qualname__}"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.session.get(BACKEND_SESSION_KEY) in LEGACY_BACKENDS:
+            request.session[BACKEND_SESSION_KEY] = self.backend_path
+        return self.get_response(request)
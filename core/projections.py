@@ -0,0 +1,41 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Prefetch
+
+from core.cache import cached
+from core.models import Appointment, ServiceType
+
+
+def appointment_list_queryset(queryset=None):
+    """Appointments ready to be rendered as list rows with a fixed number of queries.
+
+    Vehicle and review come from the same SELECT, service type names from a
+    single prefetch query, and ``description`` is left out because no list
+    page shows it.
+    """
+    if queryset is None:
+        queryset = Appointment.objects.all()
+    return (
+        queryset.select_related("vehicle", "review")
+        .prefetch_related(
+            Prefetch("service_types", queryset=ServiceType.objects.only("id", "name").order_by("id"))
+        )
+        .defer("description")
+    )
+
+
+def service_names(appointment):
+    # ใช้ข้อมูลที่ prefetch มาแล้ว ไม่ยิง query เพิ่ม
+    return [service.name for service in appointment.service_types.all()]
+
+
+def review_of(appointment):
+    try:
+        return appointment.review
+    except ObjectDoesNotExist:
+        return None
+
+
+@cached(ServiceType)
+def service_type_list():
+    # service type แทบไม่เปลี่ยน ใช้ซ้ำได้ทุกครั้งที่แสดงหน้า book
+    return list(ServiceType.objects.order_by("id"))
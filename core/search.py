@@ -0,0 +1,151 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from core.models import Appointment, SearchEntry, normalize_license_plate
+
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+# FTS5 trigram tokenizer จับคู่ได้เฉพาะคำที่ยาวอย่างน้อย 3 ตัวอักษร
+_MIN_TRIGRAM_TERM = 3
+
+
+def normalize_text(value):
+    value = unicodedata.normalize("NFC", str(value or "")).translate(_THAI_DIGITS)
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+def _document(*parts):
+    return normalize_text(" ".join(str(part) for part in parts if part))
+
+
+def user_entry(user):
+    profile = getattr(user, "profile", None)
+    phone_number = getattr(profile, "phone_number", "") or ""
+    full_name = f"{user.first_name} {user.last_name}".strip()
+    return SearchEntry(
+        kind=SearchEntry.Kind.USER,
+        object_id=user.pk,
+        title=user.username,
+        subtitle=" · ".join(part for part in (full_name, user.email, phone_number) if part),
+        document=_document(user.username, full_name, user.email, phone_number),
+    )
+
+
+def vehicle_entry(vehicle):
+    return SearchEntry(
+        kind=SearchEntry.Kind.VEHICLE,
+        object_id=vehicle.pk,
+        title=vehicle.license_plate,
+        subtitle=f"{vehicle.brand} {vehicle.model}",
+        document=_document(
+            vehicle.license_plate, normalize_license_plate(vehicle.license_plate), vehicle.brand, vehicle.model
+        ),
+    )
+
+
+def appointment_entry(appointment, license_plate):
+    return SearchEntry(
+        kind=SearchEntry.Kind.APPOINTMENT,
+        object_id=appointment.pk,
+        title=f"Appointment #{appointment.pk}",
+        subtitle=f"{license_plate} · {appointment.display_date_time()} · {appointment.status}",
+        document=_document(f"#{appointment.pk}", license_plate, normalize_license_plate(license_plate)),
+    )
+
+
+def save_entries(entries):
+    """Insert or update entries in one statement."""
+    if not entries:
+        return
+    SearchEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["title", "subtitle", "document"],
+    )
+
+
+def remove_entries(kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def appointment_entries(appointments):
+    appointments = appointments.select_related("vehicle").only(
+        "id", "date", "time", "status", "vehicle__license_plate"
+    )
+    return [appointment_entry(ap, ap.vehicle.license_plate) for ap in appointments]
+
+
+def index_vehicle_appointments(vehicle):
+    # ทะเบียนรถอยู่ใน document ของ appointment ด้วย จึงต้อง index ใหม่เมื่อรถเปลี่ยน
+    save_entries(appointment_entries(Appointment.objects.filter(vehicle=vehicle)))
+
+
+def _terms(query):
+    return [term for term in normalize_text(query).split(" ") if term]
+
+
+def _search_postgresql(queryset, query, terms):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    for term in terms:
+        # document เก็บเป็นตัวพิมพ์เล็กแล้ว ใช้ LIKE ธรรมดาเพื่อให้ใช้ gin_trgm_ops index ได้
+        queryset = queryset.filter(document__contains=term)
+    return queryset.annotate(rank=TrigramWordSimilarity(normalize_text(query), "document")).order_by("-rank", "id")
+
+
+def _search_sqlite(queryset, terms, limit, offset):
+    if "core_search_entry_fts" not in connection.introspection.table_names():
+        return None
+    match_terms = [term for term in terms if len(term) >= _MIN_TRIGRAM_TERM]
+    if not match_terms:
+        return None
+    for term in terms:
+        if len(term) < _MIN_TRIGRAM_TERM:
+            queryset = queryset.filter(document__contains=term)
+    match = " ".join('"{}"'.format(term.replace('"', '""')) for term in match_terms)
+    # ตาราง FTS ไม่มี model: หาแถวที่ตรงด้วย MATCH แล้วคำนวณคะแนน bm25 เฉพาะแถวเหล่านั้น
+    matched = RawSQL("SELECT rowid FROM core_search_entry_fts WHERE core_search_entry_fts MATCH %s", [match])
+    rank = RawSQL(
+        "SELECT -bm25(core_search_entry_fts) FROM core_search_entry_fts "
+        "WHERE core_search_entry_fts MATCH %s AND rowid = core_search_entry.id",
+        [match],
+        output_field=FloatField(),
+    )
+    return queryset.filter(id__in=matched).annotate(rank=rank).order_by("-rank", "id")[offset:offset + limit]
+
+
+def search(query, kind=None, page=1, page_size=20):
+    """Ranked search across users, vehicles and appointments.
+
+    Returns ``(entries, has_next)``. ``entries`` are ``SearchEntry`` rows,
+    best match first, each with a ``rank`` attribute (higher is better).
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], False
+
+    queryset = SearchEntry.objects.all()
+    if kind:
+        queryset = queryset.filter(kind=kind)
+    offset = (max(page, 1) - 1) * page_size
+    limit = page_size + 1
+
+    results = None
+    if connection.vendor == "postgresql":
+        results = _search_postgresql(queryset, query, terms)[offset:offset + limit]
+    elif connection.vendor == "sqlite":
+        results = _search_sqlite(queryset, terms, limit, offset)
+    if results is None:
+        for term in terms:
+            queryset = queryset.filter(document__contains=term)
+        results = queryset.order_by("id")[offset:offset + limit]
+
+    results = list(results)
+    for entry in results:
+        if not hasattr(entry, "rank"):
+            entry.rank = None
+    return results[:page_size], len(results) > page_size
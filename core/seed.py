@@ -0,0 +1,315 @@
+import random
+from datetime import time as time_cls, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core import search
+from core.cache import bump_generation_on_commit
+from core.models import (
+    Appointment, DailyAppointmentCount, Profile, RatingSummary, Review, ServiceType, SlotOccupancy, Vehicle,
+    normalize_license_plate,
+)
+from core.slots import SLOT_TIMES, booking_window
+from core.stats import daily_counts_from_appointments, rating_summary_from_reviews
+
+# จำนวนข้อมูลของแต่ละขนาด: appointment กระจายย้อนหลัง ``years`` ปี
+SCALES = {
+    "tiny": {"clients": 20, "staff": 2, "service_types": 6, "appointments": 200, "years": 1},
+    "small": {"clients": 200, "staff": 5, "service_types": 10, "appointments": 3_000, "years": 2},
+    "medium": {"clients": 2_000, "staff": 10, "service_types": 15, "appointments": 40_000, "years": 3},
+    "large": {"clients": 20_000, "staff": 30, "service_types": 20, "appointments": 400_000, "years": 5},
+}
+
+# สัดส่วนสถานะ: ในอดีตส่วนใหญ่เสร็จแล้ว ที่ยังค้าง PENDING คือรายการที่ staff ไม่ได้ปิด
+PAST_STATUSES = {
+    Appointment.Status.DONE: 80,
+    Appointment.Status.REJECT: 14,
+    Appointment.Status.PENDING: 4,
+    Appointment.Status.IN_PROGRESS: 2,
+}
+FUTURE_STATUSES = {Appointment.Status.PENDING: 92, Appointment.Status.REJECT: 8}
+# appointment ที่จองล่วงหน้า (ภายใน booking window) ต่อทั้งหมด
+FUTURE_SHARE = 0.03
+REVIEW_SHARE = 0.6
+REVIEW_SCORES = {1: 3, 2: 4, 3: 10, 4: 30, 5: 53}
+VEHICLES_PER_CLIENT = {1: 70, 2: 22, 3: 8}
+
+SERVICE_NAMES = [
+    "Battery health check", "Charging port repair", "Tire rotation", "Brake inspection", "Software update",
+    "Cabin air filter", "Coolant service", "Wheel alignment", "Wiper replacement", "Suspension check",
+    "Air conditioning service", "High-voltage cable inspection", "Car wash", "Paint protection", "Windshield repair",
+    "Onboard charger diagnosis", "Motor inspection", "12V battery replacement", "Headlight adjustment", "Annual service",
+]
+BRANDS = {
+    "BYD": ["Atto 3", "Dolphin", "Seal", "Sealion 6"],
+    "Tesla": ["Model 3", "Model Y"],
+    "MG": ["MG4", "ZS EV", "EP"],
+    "Neta": ["V", "X"],
+    "Ora": ["Good Cat"],
+    "Volvo": ["EX30", "XC40 Recharge"],
+}
+FIRST_NAMES = ["Somchai", "Somsak", "Suda", "Malee", "Anan", "Kanya", "Nattapong", "Pim", "Wichai", "Ploy"]
+LAST_NAMES = ["Srisuk", "Chaiyaporn", "Wongsawat", "Rattanakul", "Boonmee", "Saetang", "Thongdee", "Kaewmanee"]
+THAI_LETTERS = "กขคฆงจฉชซฌญฎฏฐฑฒณดตถทธนบปผพฟภมยรลวศษสหฬอฮ"
+COMMENTS = ["Fast and friendly.", "Good service.", "Had to wait a bit.", "Very professional.", None, None]
+
+CHUNK_SIZE = 5_000
+
+
+class SeedResult:
+    def __init__(self, tag):
+        # prefix ของ username ที่สร้างในรอบนี้ เช่น "seed3f2a-client1"
+        self.tag = tag
+        self.client_ids = []
+        self.staff_ids = []
+        self.vehicles = 0
+        self.service_types = 0
+        self.appointments = 0
+        self.reviews = 0
+
+    def counts(self):
+        return {
+            "clients": len(self.client_ids),
+            "staff": len(self.staff_ids),
+            "vehicles": self.vehicles,
+            "service_types": self.service_types,
+            "appointments": self.appointments,
+            "reviews": self.reviews,
+        }
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def ensure_groups():
+    """The Client and Staff groups with the permissions their pages check."""
+    client_group, _ = Group.objects.get_or_create(name="Client")
+    client_group.permissions.add(*Permission.objects.filter(content_type__app_label="client"))
+    staff_group, _ = Group.objects.get_or_create(name="Staff")
+    staff_group.permissions.add(*Permission.objects.filter(
+        Q(content_type__app_label="staff")
+        | Q(content_type__app_label="auth", codename__in=["view_user", "delete_user"])
+        | Q(content_type__app_label="core", codename="add_servicetype")
+    ))
+    return client_group, staff_group
+
+
+def _unique(rng, count, make, taken):
+    # สุ่มจนได้ค่าที่ไม่ซ้ำกับที่มีอยู่ (ช่วงที่สุ่มกว้างกว่าจำนวนที่ต้องการมาก จึงแทบไม่ต้องสุ่มซ้ำ)
+    values = []
+    while len(values) < count:
+        value, key = make(rng)
+        if key not in taken:
+            taken.add(key)
+            values.append(value)
+    return values
+
+
+def _plate(rng):
+    plate = f"{rng.choice(THAI_LETTERS)}{rng.choice(THAI_LETTERS)} {rng.randint(1, 9999)}"
+    return plate, normalize_license_plate(plate)
+
+
+def _phone(rng):
+    phone = f"0{rng.choice('689')}{rng.randint(0, 99_999_999):08d}"
+    return phone, phone
+
+
+def _new_tag(rng):
+    while True:
+        tag = f"seed{rng.randrange(16 ** 4):04x}"
+        if not User.objects.filter(username__startswith=f"{tag}-").exists():
+            return tag
+
+
+def _create_users(rng, result, role, count, group, password, phones, years):
+    today = timezone.now()
+    users = []
+    for number in range(1, count + 1):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f"{result.tag}-{role}{number}"
+        users.append(User(
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            email=f"{username}@example.com",
+            password=password,
+            date_joined=today - timedelta(days=rng.randint(0, years * 365)),
+        ))
+    users = User.objects.bulk_create(users, batch_size=1000)
+    # pk ของ profile เท่ากับของ user แบบเดียวกับ SignupView
+    profiles = Profile.objects.bulk_create(
+        [Profile(pk=user.pk, user=user, phone_number=phone) for user, phone in zip(users, phones)], batch_size=1000
+    )
+    for user, profile in zip(users, profiles):
+        user.profile = profile
+    Membership = User.groups.through
+    Membership.objects.bulk_create([Membership(user_id=user.pk, group_id=group.pk) for user in users], batch_size=1000)
+    search.save_entries([search.user_entry(user) for user in users])
+    return [user.pk for user in users]
+
+
+def _create_service_types(count):
+    existing = {name.casefold() for name in ServiceType.objects.values_list("name", flat=True)}
+    missing = [name for name in SERVICE_NAMES[:count] if name.casefold() not in existing]
+    ServiceType.objects.bulk_create([ServiceType(name=name, description=f"{name}.") for name in missing])
+    return list(ServiceType.objects.order_by("id").values_list("id", flat=True))
+
+
+def _create_vehicles(rng, client_ids):
+    taken = set(Vehicle.objects.values_list("license_plate_normalized", flat=True))
+    owners = [user_id for user_id in client_ids for _ in range(_weighted(rng, VEHICLES_PER_CLIENT))]
+    plates = _unique(rng, len(owners), _plate, taken)
+    vehicles = []
+    for user_id, plate in zip(owners, plates):
+        brand = rng.choice(list(BRANDS))
+        vehicles.append(Vehicle(
+            user_id=user_id,
+            brand=brand,
+            model=rng.choice(BRANDS[brand]),
+            license_plate=plate,
+            license_plate_normalized=normalize_license_plate(plate),
+        ))
+    vehicles = Vehicle.objects.bulk_create(vehicles, batch_size=1000)
+    search.save_entries([search.vehicle_entry(vehicle) for vehicle in vehicles])
+    return vehicles
+
+
+def _free_future_slots(today):
+    # slot ในช่วงที่เปิดจองที่ยังว่าง: ใส่ได้ไม่เกิน capacity ที่เหลือ
+    first, last = booking_window(today)
+    capacity = settings.BOOKING_SLOT_CAPACITY
+    free = {
+        (date, time): max(capacity - booked, 0)
+        for date, time, booked in SlotOccupancy.objects.filter(date__gte=first, date__lte=last).values_list(
+            "date", "time", "booked"
+        )
+    }
+    times = [time_cls(*map(int, label.split(":"))) for label in SLOT_TIMES]
+    slots = []
+    for offset in range(1, (last - first).days + 1):
+        date = first + timedelta(days=offset)
+        for time in times:
+            slots += [(date, time)] * free.get((date, time), settings.BOOKING_SLOT_CAPACITY)
+    return slots
+
+
+def _plan_appointments(rng, count, years, vehicles, today):
+    """``(date, time, status, vehicle)`` of every appointment, oldest first like real bookings."""
+    times = [time_cls(*map(int, label.split(":"))) for label in SLOT_TIMES]
+    future_slots = _free_future_slots(today)
+    # จองล่วงหน้าได้แค่ครึ่งหนึ่งของ slot ที่ว่าง หน้า book จึงยังมีเวลาให้เลือก
+    future = min(int(count * FUTURE_SHARE), len(future_slots) // 2)
+    plan = [
+        (date, time, _weighted(rng, FUTURE_STATUSES), rng.choice(vehicles))
+        for date, time in rng.sample(future_slots, future)
+    ]
+    for _ in range(count - future):
+        date = today - timedelta(days=rng.randint(1, years * 365))
+        plan.append((date, rng.choice(times), _weighted(rng, PAST_STATUSES), rng.choice(vehicles)))
+    plan.sort(key=lambda item: (item[0], item[1]))
+    return plan
+
+
+def _create_appointments(rng, result, plan, service_ids):
+    Through = Appointment.service_types.through
+    for start in range(0, len(plan), CHUNK_SIZE):
+        chunk = plan[start:start + CHUNK_SIZE]
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                user_id=vehicle.user_id,
+                vehicle_id=vehicle.pk,
+                date=date,
+                time=time,
+                status=status,
+                description=rng.choice(["Customer waits on site.", "Noise from the front axle.", None, None]),
+            )
+            for date, time, status, vehicle in chunk
+        ], batch_size=1000)
+        Through.objects.bulk_create([
+            Through(appointment_id=appointment.pk, servicetype_id=service_id)
+            for appointment in appointments
+            for service_id in rng.sample(service_ids, min(len(service_ids), rng.randint(1, 3)))
+        ], batch_size=2000)
+        reviews = Review.objects.bulk_create([
+            Review(appointment_id=appointment.pk, score=_weighted(rng, REVIEW_SCORES), comment=rng.choice(COMMENTS))
+            for appointment in appointments
+            if appointment.status == Appointment.Status.DONE and rng.random() < REVIEW_SHARE
+        ], batch_size=1000)
+        search.save_entries([
+            search.appointment_entry(appointment, vehicle.license_plate)
+            for appointment, (_, _, _, vehicle) in zip(appointments, chunk)
+        ])
+        result.appointments += len(appointments)
+        result.reviews += len(reviews)
+
+
+def rebuild_slot_occupancy():
+    """Recompute the slot rows of the bookable dates (today onward) from the appointment table.
+
+    Uses the current ``BOOKING_SLOT_CAPACITY``; rows of past dates are dropped.
+    """
+    rows = (
+        Appointment.objects.filter(date__gte=booking_window()[0])
+        .exclude(status=Appointment.Status.REJECT)
+        .values_list("date", "time")
+        .annotate(booked=Count("id"))
+        .order_by()
+    )
+    slots = [
+        # appointment เก่าอาจจองเกิน capacity ปัจจุบัน (เช่นเคยมีช่องบริการมากกว่า) จึงขยาย capacity ให้พอดี
+        SlotOccupancy(date=date, time=time, booked=booked, capacity=max(settings.BOOKING_SLOT_CAPACITY, booked))
+        for date, time, booked in rows
+    ]
+    SlotOccupancy.objects.all().delete()
+    SlotOccupancy.objects.bulk_create(slots, batch_size=2000)
+
+
+def seed(scale, rng=None, password="password"):
+    """Insert one ``SCALES`` entry (or a dict of the same keys) of synthetic data.
+
+    Everything is written with ``bulk_create`` in one transaction, so the
+    signals that keep the slot, daily count, rating and search tables in sync
+    do not run; those tables are rebuilt at the end instead.
+    """
+    counts = SCALES[scale] if isinstance(scale, str) else scale
+    rng = rng or random.Random()
+    today = timezone.localdate()
+    # hash รหัสผ่านครั้งเดียว ทุก user ใช้รหัสเดียวกัน (hash ทีละคนใช้เวลาหลายนาที)
+    password = make_password(password)
+
+    with transaction.atomic():
+        result = SeedResult(_new_tag(rng))
+        client_group, staff_group = ensure_groups()
+        phones = _unique(
+            rng, counts["clients"] + counts["staff"], _phone, set(Profile.objects.values_list("phone_number", flat=True))
+        )
+        result.client_ids = _create_users(
+            rng, result, "client", counts["clients"], client_group, password, phones, counts["years"]
+        )
+        result.staff_ids = _create_users(
+            rng, result, "staff", counts["staff"], staff_group, password, phones[counts["clients"]:], counts["years"]
+        )
+        service_ids = _create_service_types(counts["service_types"])
+        result.service_types = len(service_ids)
+        vehicles = _create_vehicles(rng, result.client_ids)
+        result.vehicles = len(vehicles)
+        plan = _plan_appointments(rng, counts["appointments"], counts["years"], vehicles, today)
+        _create_appointments(rng, result, plan, service_ids)
+
+        rebuild_slot_occupancy()
+        DailyAppointmentCount.objects.all().delete()
+        DailyAppointmentCount.objects.bulk_create(daily_counts_from_appointments(), batch_size=2000)
+        rating_summary_from_reviews().save()
+        for model in (
+            User, Profile, Group, Vehicle, ServiceType, Appointment, Review,
+            SlotOccupancy, DailyAppointmentCount, RatingSummary,
+        ):
+            bump_generation_on_commit(model)
+    return result
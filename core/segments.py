@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+
+from core.models import Appointment
+
+# ชื่อของตัวกรองที่รับจาก query string ของหน้า staff user list
+SEGMENT_FILTERS = ("username", "appointment_status", "appointment_from", "appointment_to")
+
+
+def _valid_date(value):
+    try:
+        return parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+def segment_filters(params):
+    """Pick the non-empty, valid segment filters out of request GET/POST params."""
+    filters = {name: params[name].strip() for name in SEGMENT_FILTERS if params.get(name, "").strip()}
+    for name in ("appointment_from", "appointment_to"):
+        # วันที่ผิดรูปแบบให้ตัดทิ้ง แทนที่จะให้ query error
+        if name in filters and not _valid_date(filters[name]):
+            del filters[name]
+    return filters
+
+
+def client_segment(filters):
+    """Client users matching ``filters`` (see ``SEGMENT_FILTERS``).
+
+    Appointment filters keep users with at least one appointment matching all
+    of them; they use EXISTS so each user appears once without DISTINCT.
+    """
+    users = User.objects.filter(groups__name="Client").exclude(is_superuser=True)
+    if filters.get("username"):
+        users = users.filter(username__icontains=filters["username"])
+
+    appointments = Appointment.objects.filter(user=OuterRef("pk"))
+    appointment_filters = {}
+    if filters.get("appointment_status"):
+        appointment_filters["status"] = filters["appointment_status"].upper()
+    if filters.get("appointment_from"):
+        appointment_filters["date__gte"] = filters["appointment_from"]
+    if filters.get("appointment_to"):
+        appointment_filters["date__lte"] = filters["appointment_to"]
+    if appointment_filters:
+        users = users.filter(Exists(appointments.filter(**appointment_filters)))
+    return users
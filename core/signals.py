@@ -0,0 +1,254 @@
+from django.apps import apps
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from core import search
+from core import permissions
+from core.cache import bump_generation_on_commit
+from core.stats import count_appointment, count_review
+from core.models import Appointment, Profile, Review, SearchEntry, ServiceType, Vehicle
+from core.slots import booking_window, is_active_status, occupy_slot, release_slot
+
+
+def _slot_of(date, time, status):
+    if date is None or time is None or not is_active_status(status):
+        return None
+    # แปลงค่าให้เป็น date/time เสมอ เผื่อกรณีที่ set ค่าเป็น string ก่อน save
+    date = Appointment._meta.get_field("date").to_python(date)
+    time = Appointment._meta.get_field("time").to_python(time)
+    # ตาราง slot ครอบคลุมเฉพาะวันที่ยังจองได้ (วันนี้เป็นต้นไป): appointment ย้อนหลังไม่จองและไม่คืนที่
+    if date < booking_window()[0]:
+        return None
+    return date, time
+
+
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    previous_slot = previous_day = None
+    if instance.pk and not raw:
+        row = sender.objects.filter(pk=instance.pk).values_list("date", "time", "status").first()
+        if row:
+            previous_slot = _slot_of(*row)
+            previous_day = _day_of(row[0], row[2])
+    instance._previous_slot = previous_slot
+    instance._previous_day = previous_day
+
+
+def update_slot_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_slot", None)
+    current = _slot_of(instance.date, instance.time, instance.status)
+    if previous == current:
+        return
+    if previous:
+        release_slot(*previous)
+    if current:
+        occupy_slot(*current)
+    instance._previous_slot = current
+
+
+def release_slot_on_delete(sender, instance, **kwargs):
+    current = _slot_of(instance.date, instance.time, instance.status)
+    if current:
+        release_slot(*current)
+
+
+def _day_of(date, status):
+    if date is None:
+        return None
+    return Appointment._meta.get_field("date").to_python(date), (status or "").upper()
+
+
+def update_daily_count_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_day", None)
+    current = _day_of(instance.date, instance.status)
+    if previous == current:
+        return
+    if previous:
+        count_appointment(*previous, delta=-1)
+    if current:
+        count_appointment(*current)
+    instance._previous_day = current
+
+
+def update_daily_count_on_delete(sender, instance, **kwargs):
+    current = _day_of(instance.date, instance.status)
+    if current:
+        count_appointment(*current, delta=-1)
+
+
+def remember_previous_score(sender, instance, raw=False, **kwargs):
+    previous = None
+    if instance.pk and not raw:
+        previous = sender.objects.filter(pk=instance.pk).values_list("score", flat=True).first()
+    instance._previous_score = previous
+
+
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_score", None)
+    current = int(instance.score) if instance.score is not None else None
+    if previous == current:
+        return
+    if previous is not None:
+        count_review(previous, delta=-1)
+    if current is not None:
+        count_review(current)
+    instance._previous_score = current
+
+
+def update_rating_on_delete(sender, instance, **kwargs):
+    if instance.score is not None:
+        count_review(int(instance.score), delta=-1)
+
+
+def index_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # login อัปเดตแค่ last_login ไม่ต้อง index ใหม่
+    if raw or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    search.save_entries([search.user_entry(instance)])
+
+
+def index_user_of_profile(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user = User.objects.filter(pk=instance.user_id).first()
+    if user:
+        search.save_entries([search.user_entry(user)])
+
+
+def index_vehicle(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.save_entries([search.vehicle_entry(instance)])
+    if not created:
+        search.index_vehicle_appointments(instance)
+
+
+def index_appointment(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    license_plate = Vehicle.objects.filter(pk=instance.vehicle_id).values_list("license_plate", flat=True).first()
+    search.save_entries([search.appointment_entry(instance, license_plate or "")])
+
+
+def _remove_entry(kind):
+    def handler(sender, instance, **kwargs):
+        search.remove_entries(kind, [instance.pk])
+    return handler
+
+
+remove_user_entry = _remove_entry(SearchEntry.Kind.USER)
+remove_vehicle_entry = _remove_entry(SearchEntry.Kind.VEHICLE)
+remove_appointment_entry = _remove_entry(SearchEntry.Kind.APPOINTMENT)
+
+
+def bump_cache_generation(sender, instance=None, update_fields=None, **kwargs):
+    # login อัปเดตแค่ last_login ไม่ต้องล้าง cache
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    bump_generation_on_commit(sender)
+
+
+def bump_cache_generation_on_m2m(sender, instance, action, model, **kwargs):
+    if not action.startswith("post_"):
+        return
+    # instance อาจเป็นฝั่งใดฝั่งหนึ่งของความสัมพันธ์ (appointment.service_types หรือ service_type.appointment_set)
+    bump_generation_on_commit(type(instance))
+    bump_generation_on_commit(model)
+
+
+def bump_user_generation_on_membership(sender, action, **kwargs):
+    # รายชื่อ client ของ staff กรองตาม group "Client" จึงขึ้นกับการเข้า/ออก group ด้วย
+    if action.startswith("post_"):
+        bump_generation_on_commit(User)
+
+
+def invalidate_user_access(sender, instance, update_fields=None, **kwargs):
+    # is_superuser / is_active อาจเปลี่ยน (login อัปเดตแค่ last_login ไม่ต้องล้าง)
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    permissions.invalidate_user(instance.pk)
+
+
+def invalidate_all_access(sender, **kwargs):
+    permissions.invalidate_all()
+
+
+def invalidate_access_on_m2m(sender, instance, action, model, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, User):
+        permissions.invalidate_user(instance.pk)
+    elif model is User and pk_set:
+        # เช่น group.user_set.add(...) รู้ว่า user คนไหนเปลี่ยน
+        for user_id in pk_set:
+            permissions.invalidate_user(user_id)
+    else:
+        permissions.invalidate_all()
+
+
+# model ที่ค่าใน core.cache ขึ้นอยู่กับได้
+CACHED_MODELS = [Appointment, Review, Vehicle, ServiceType, Profile, User]
+
+
+def _with_proxies(base):
+    # proxy model ของ client/staff ส่ง signal ด้วย sender ของตัวเอง จึงต้อง connect ให้ครบ
+    return [model for model in apps.get_models() if issubclass(model, base)]
+
+
+def connect_signals():
+    """Connect the receivers to each model (and proxy) they care about.
+
+    Receivers are attached per sender rather than to every model so that
+    unrelated models keep Django's fast-delete path.
+    """
+    receivers = [
+        (Appointment, pre_save, remember_previous_state),
+        (Appointment, post_save, update_slot_on_save),
+        (Appointment, post_delete, release_slot_on_delete),
+        (Appointment, post_save, update_daily_count_on_save),
+        (Appointment, post_delete, update_daily_count_on_delete),
+        (Appointment, post_save, index_appointment),
+        (Appointment, post_delete, remove_appointment_entry),
+        (Review, pre_save, remember_previous_score),
+        (Review, post_save, update_rating_on_save),
+        (Review, post_delete, update_rating_on_delete),
+        (Vehicle, post_save, index_vehicle),
+        (Vehicle, post_delete, remove_vehicle_entry),
+        (Profile, post_save, index_user_of_profile),
+        (Profile, post_delete, index_user_of_profile),
+        (User, post_save, index_user),
+        (User, post_delete, remove_user_entry),
+        (User, post_save, invalidate_user_access),
+        (User, post_delete, invalidate_user_access),
+        (Group, post_save, invalidate_all_access),
+        (Group, post_delete, invalidate_all_access),
+        (Permission, post_save, invalidate_all_access),
+        (Permission, post_delete, invalidate_all_access),
+    ]
+    for base in CACHED_MODELS:
+        receivers += [(base, post_save, bump_cache_generation), (base, post_delete, bump_cache_generation)]
+    for base, signal, receiver in receivers:
+        for model in _with_proxies(base):
+            signal.connect(receiver, sender=model, dispatch_uid=f"{receiver.__name__}.{model._meta.label}")
+
+    m2m_changed.connect(
+        bump_cache_generation_on_m2m,
+        sender=Appointment.service_types.through,
+        dispatch_uid="bump_cache_generation_on_m2m.core.Appointment_service_types",
+    )
+    m2m_changed.connect(
+        bump_user_generation_on_membership,
+        sender=User.groups.through,
+        dispatch_uid="bump_user_generation_on_membership.auth.User_groups",
+    )
+    for through in (User.groups.through, User.user_permissions.through, Group.permissions.through):
+        m2m_changed.connect(
+            invalidate_access_on_m2m,
+            sender=through,
+            dispatch_uid=f"invalidate_access_on_m2m.{through._meta.label}",
+        )
@@ -0,0 +1,101 @@
+import calendar
+from datetime import date as date_cls, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Appointment, SlotOccupancy
+
+# ช่วงเวลาที่เปิดให้จองในแต่ละวัน (ใช้ทั้งในหน้า book และในการคำนวณ slot)
+TIMES_MORNING = ["8:00", "9:00", "10:00", "11:00"]
+TIMES_AFTERNOON = ["14:00", "15:00", "16:00", "17:00"]
+# ลำดับของ bit ใน availability mask: bit 0 = 8:00, bit 1 = 9:00, ...
+SLOT_TIMES = TIMES_MORNING + TIMES_AFTERNOON
+
+
+def is_active_status(status):
+    # appointment ที่ถูก reject ไม่นับว่าจอง slot ไว้
+    return (status or "").upper() != Appointment.Status.REJECT
+
+
+def booking_window(today=None):
+    """Return the ``(first, last)`` dates a client may book, inclusive."""
+    today = today or timezone.localdate()
+    return today, today + timedelta(days=settings.BOOKING_HORIZON_DAYS)
+
+
+def time_label(time):
+    # รูปแบบเดียวกับปุ่มเวลาใน book.html เช่น 8:00, 14:00
+    return f"{time.hour}:{time.strftime('%M')}"
+
+
+class SlotUnavailable(Exception):
+    """Raised when a date/time slot has no free capacity left."""
+
+
+def _take_free_seat(date, time, now):
+    # UPDATE แบบมีเงื่อนไข: lock แค่แถวของ slot นี้ และไม่เพิ่มเกิน capacity
+    # เทียบกับ BOOKING_SLOT_CAPACITY ปัจจุบัน (ไม่ใช่ค่าที่เก็บไว้ตอนสร้างแถว) และเขียนค่านั้นกลับลงแถว
+    # เมื่อจำนวนช่องบริการเปลี่ยน slot ที่มีแถวอยู่แล้วก็ใช้ค่าใหม่ทันที
+    capacity = settings.BOOKING_SLOT_CAPACITY
+    return SlotOccupancy.objects.filter(date=date, time=time, booked__lt=capacity).update(
+        booked=F("booked") + 1, capacity=capacity, updated_at=now
+    )
+
+
+def occupy_slot(date, time):
+    """Take one seat in the slot or raise ``SlotUnavailable`` if it is full."""
+    now = timezone.now()
+    with transaction.atomic():
+        if _take_free_seat(date, time, now):
+            return
+        if not SlotOccupancy.objects.filter(date=date, time=time).exists():
+            try:
+                with transaction.atomic():
+                    SlotOccupancy.objects.create(
+                        date=date, time=time, booked=1, capacity=settings.BOOKING_SLOT_CAPACITY
+                    )
+                return
+            except IntegrityError:
+                # มีอีก request สร้างแถวนี้ไปก่อนแล้ว ลองจองจากแถวนั้นแทน
+                if _take_free_seat(date, time, now):
+                    return
+        raise SlotUnavailable(f"{date} {time_label(time)} is fully booked.")
+
+
+def release_slot(date, time):
+    SlotOccupancy.objects.filter(date=date, time=time, booked__gt=0).update(
+        booked=F("booked") - 1, updated_at=timezone.now()
+    )
+
+
+def month_availability(year, month, today=None):
+    """Per-day occupancy bitmasks for one month, limited to the booking window.
+
+    Returns ``(days, last_modified)`` where ``days`` maps day-of-month to a
+    bitmask over ``SLOT_TIMES`` (only days with at least one full slot are
+    included) and ``last_modified`` is the newest change among the rows read.
+    """
+    first, last = booking_window(today)
+    month_first = date_cls(year, month, 1)
+    month_last = date_cls(year, month, calendar.monthrange(year, month)[1])
+    start, end = max(first, month_first), min(last, month_last)
+    if start > end:
+        return {}, None
+
+    bit_of = {label: 1 << index for index, label in enumerate(SLOT_TIMES)}
+    days = {}
+    last_modified = None
+    capacity = settings.BOOKING_SLOT_CAPACITY
+    rows = SlotOccupancy.objects.filter(date__gte=start, date__lte=end).values_list(
+        "date", "time", "booked", "updated_at"
+    )
+    for date, time, booked, updated_at in rows:
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+        bit = bit_of.get(time_label(time))
+        if booked >= capacity and bit:
+            days[date.day] = days.get(date.day, 0) | bit
+    return days, last_modified
@@ -0,0 +1,206 @@
+import contextvars
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.callsite import app_call_site
+
+logger = logging.getLogger(__name__)
+
+# ชื่อ view ของ request ปัจจุบัน (ตั้งโดย SlowQueryMiddleware) ว่างเมื่ออยู่นอก request เช่นใน management command
+_current_view = contextvars.ContextVar("core_slowlog_view", default="")
+# กันไม่ให้การบันทึกลงตาราง SlowQuery ถูกบันทึกซ้ำเป็น slow query เอง
+_writing = contextvars.ContextVar("core_slowlog_writing", default=False)
+
+_file_handler = None
+_file_lock = threading.Lock()
+
+
+def params_shape(params, many=False):
+    """Type names of the query parameters; the values themselves are never kept."""
+    if many:
+        params = next(iter(params or []), None)
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params or ()]
+
+
+def _file():
+    # RotatingFileHandler จัดการหมุนไฟล์และ lock ระหว่าง thread ให้
+    global _file_handler
+    path = Path(settings.SLOW_QUERY_FILE).resolve()
+    with _file_lock:
+        if _file_handler is None or _file_handler.baseFilename != str(path):
+            if _file_handler is not None:
+                _file_handler.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _file_handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.SLOW_QUERY_FILE_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_FILE_BACKUPS,
+                encoding="utf-8",
+            )
+            _file_handler.setFormatter(logging.Formatter("%(message)s"))
+        return _file_handler
+
+
+def _save_to_db(record, alias):
+    from core.models import SlowQuery
+
+    token = _writing.set(True)
+    try:
+        SlowQuery.objects.using(alias).create(
+            recorded_at=datetime.datetime.fromisoformat(record["recorded_at"]),
+            duration_ms=record["duration_ms"],
+            sql=record["sql"],
+            params_shape=record["params_shape"],
+            view=record["view"][:200],
+            call_site=record["call_site"][:500],
+        )
+    except Exception:
+        # บันทึกไม่ได้ก็ไม่ควรทำให้ request ที่ช้าอยู่แล้วพังไปด้วย
+        logger.exception("Could not store a slow query record.")
+    finally:
+        _writing.reset(token)
+
+
+def write_record(record, connection):
+    if settings.SLOW_QUERY_SINK == "db":
+        if connection.in_atomic_block:
+            # เขียนหลัง commit: ถ้าเขียนตอนนี้ record จะหายไปพร้อม rollback หรือพังใน transaction ที่ error แล้ว
+            transaction.on_commit(lambda: _save_to_db(record, connection.alias), using=connection.alias)
+        else:
+            _save_to_db(record, connection.alias)
+        return
+    _file().handle(logging.makeLogRecord({"msg": json.dumps(record, ensure_ascii=False)}))
+
+
+class SlowQueryRecorder:
+    """``execute_wrapper`` that records queries slower than ``SLOW_QUERY_MS``.
+
+    Only a ``SLOW_QUERY_SAMPLE_RATE`` share of slow queries is kept. The stack
+    is walked only for those, so fast queries cost one timer call.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if (
+            duration_ms >= settings.SLOW_QUERY_MS
+            and not _writing.get()
+            and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+        ):
+            write_record({
+                "recorded_at": timezone.now().isoformat(),
+                "duration_ms": round(duration_ms, 3),
+                "sql": sql,
+                "params_shape": params_shape(params, many),
+                "view": _current_view.get(),
+                "call_site": app_call_site(skip_files=(__file__,)),
+            }, self.connection)
+        return result
+
+
+def install_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver: watch every new database connection.
+
+    Django keeps ``execute_wrappers`` when it reconnects the same wrapper, so
+    the recorder is added only once.
+    """
+    if not any(isinstance(wrapper, SlowQueryRecorder) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryRecorder(connection))
+
+
+class SlowQueryMiddleware:
+    """Remember the view name so slow queries can be traced back to it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_view.set(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_view.set(request.resolver_match.view_name or request.path)
+
+
+def read_file_records(since):
+    """Records from the JSONL file and its rotated backups, newest file first."""
+    path = Path(settings.SLOW_QUERY_FILE)
+    files = [path] + [path.with_name(f"{path.name}.{n}") for n in range(1, settings.SLOW_QUERY_FILE_BACKUPS + 1)]
+    for file in files:
+        if not file.exists():
+            continue
+        with file.open(encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # บรรทัดสุดท้ายอาจเขียนไม่ครบตอนที่ process ถูก kill
+                    continue
+                if datetime.datetime.fromisoformat(record["recorded_at"]) >= since:
+                    yield record
+
+
+def read_db_records(since):
+    from core.models import SlowQuery
+
+    rows = SlowQuery.objects.filter(recorded_at__gte=since).values(
+        "recorded_at", "duration_ms", "sql", "params_shape", "view", "call_site"
+    )
+    yield from rows.iterator(chunk_size=2000)
+
+
+class Offender:
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.views = {}
+        # ตำแหน่งในโค้ดของครั้งที่ช้าที่สุด
+        self.call_site = ""
+
+    def add(self, record):
+        self.count += 1
+        self.total_ms += record["duration_ms"]
+        if record["duration_ms"] >= self.max_ms:
+            self.max_ms = record["duration_ms"]
+            self.call_site = record["call_site"]
+        view = record["view"] or "-"
+        self.views[view] = self.views.get(view, 0) + 1
+
+    @property
+    def top_view(self):
+        return max(self.views, key=self.views.get)
+
+
+def worst_offenders(records, limit=20):
+    """Group ``records`` by normalized SQL, the largest total time first."""
+    from core.nplusone import normalize_sql
+
+    offenders = {}
+    for record in records:
+        shape = normalize_sql(record["sql"])
+        offender = offenders.get(shape)
+        if offender is None:
+            offender = offenders[shape] = Offender(shape)
+        offender.add(record)
+    return sorted(offenders.values(), key=lambda offender: offender.total_ms, reverse=True)[:limit]
@@ -0,0 +1,121 @@
+import calendar
+from datetime import date as date_cls
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.cache import cached
+from core.models import Appointment, DailyAppointmentCount, RatingSummary, Review, Vehicle
+
+# ระบบมี RatingSummary แค่แถวเดียว
+RATING_SUMMARY_ID = 1
+
+
+def _add_to_day(date, status, delta):
+    rows = DailyAppointmentCount.objects.filter(date=date, status=status)
+    if delta < 0:
+        # ไม่ให้ติดลบ ถ้าข้อมูลเพี้ยนให้ใช้ rebuild_appointment_counts แก้
+        return rows.filter(count__gte=-delta).update(count=F("count") + delta)
+    return rows.update(count=F("count") + delta)
+
+
+def count_appointment(date, status, delta=1):
+    """Add ``delta`` to the rollup row of ``date``/``status``, creating it if needed."""
+    status = (status or "").upper()
+    with transaction.atomic():
+        if _add_to_day(date, status, delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                DailyAppointmentCount.objects.create(date=date, status=status, count=delta)
+        except IntegrityError:
+            # มีอีก request สร้างแถวนี้ไปก่อนแล้ว
+            _add_to_day(date, status, delta)
+
+
+def daily_counts_from_appointments():
+    """Rollup rows computed from the appointment table itself."""
+    totals = {}
+    rows = Appointment.objects.values_list("date", "status").annotate(total=Count("id")).order_by()
+    for date, status, total in rows:
+        key = (date, (status or "").upper())
+        totals[key] = totals.get(key, 0) + total
+    return [DailyAppointmentCount(date=date, status=status, count=count) for (date, status), count in totals.items()]
+
+
+def month_appointment_counts(year, month):
+    """Appointments per day of one month as ``{day: {status: count}}``."""
+    first = date_cls(year, month, 1)
+    last = date_cls(year, month, calendar.monthrange(year, month)[1])
+    days = {}
+    rows = DailyAppointmentCount.objects.filter(date__gte=first, date__lte=last, count__gt=0).values_list(
+        "date", "status", "count"
+    )
+    for date, status, count in rows:
+        days.setdefault(date.day, {})[status] = count
+    return days
+
+
+def rating_summary_from_reviews():
+    """A ``RatingSummary`` (unsaved) computed from the review table itself."""
+    summary = RatingSummary(pk=RATING_SUMMARY_ID)
+    rows = (
+        Review.objects.filter(score__in=RatingSummary.SCORES)
+        .values_list("score")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for score, total in rows:
+        setattr(summary, f"score_{score}", total)
+        summary.review_count += total
+        summary.score_sum += score * total
+    return summary
+
+
+def rating_summary():
+    """The current rating summary, created from the review table if missing."""
+    summary = RatingSummary.objects.filter(pk=RATING_SUMMARY_ID).first()
+    if summary is None:
+        summary = rating_summary_from_reviews()
+        try:
+            with transaction.atomic():
+                summary.save(force_insert=True)
+        except IntegrityError:
+            summary = RatingSummary.objects.get(pk=RATING_SUMMARY_ID)
+    return summary
+
+
+def count_review(score, delta=1):
+    """Add ``delta`` reviews with ``score`` to the rating summary in one UPDATE."""
+    if score not in RatingSummary.SCORES:
+        return
+    column = f"score_{score}"
+    rows = RatingSummary.objects.filter(pk=RATING_SUMMARY_ID)
+    if delta < 0:
+        # ไม่ให้ติดลบ ถ้าข้อมูลเพี้ยนให้ใช้ reconcile_rating_summary --fix แก้
+        rows = rows.filter(**{f"{column}__gte": -delta})
+    updated = rows.update(
+        **{column: F(column) + delta},
+        review_count=F("review_count") + delta,
+        score_sum=F("score_sum") + delta * score,
+        updated_at=timezone.now(),
+    )
+    if not updated and not RatingSummary.objects.filter(pk=RATING_SUMMARY_ID).exists():
+        # ยังไม่มีแถว summary: นับจากตาราง review ซึ่งรวมการเปลี่ยนแปลงนี้แล้ว
+        rating_summary()
+
+
+@cached(Appointment, Vehicle, User)
+def dashboard_totals():
+    return {
+        "appointments": Appointment.objects.count(),
+        "vehicles": Vehicle.objects.count(),
+        "users": User.objects.filter(groups__name="Client").exclude(is_superuser=True).count(),
+    }
+
+
+# ค่าที่หน้า dashboard อ่าน ล้างเมื่อ appointment/review เปลี่ยน (ดู core.signals)
+cached_month_appointment_counts = cached(Appointment)(month_appointment_counts)
+cached_rating_summary = cached(Review)(rating_summary)
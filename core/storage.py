@@ -0,0 +1,45 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli เป็น optional dependency; ไม่มีก็สร้างแค่ .gz
+    brotli = None
+
+# ไฟล์ข้อความที่บีบอัดแล้วเล็กลงคุ้มค่า (รูปภาพ/ฟอนต์ส่วนใหญ่บีบอัดมาแล้ว)
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".map", ".svg", ".json", ".txt", ".html")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed file names plus precompressed ``.gz`` (and ``.br``) copies of each.
+
+    Hashed names never change content, so they can be served with far-future
+    cache headers; the compressed copies let the web server skip on-the-fly
+    compression.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            for suffix, compress in self._compressors():
+                compressed = compress(content)
+                # บีบอัดแล้วไม่เล็กลงพอ ไม่ต้องเก็บ
+                if len(compressed) < len(content) * 0.95:
+                    if self.exists(name + suffix):
+                        self.delete(name + suffix)
+                    self._save(name + suffix, ContentFile(compressed))
+                    yield name + suffix, name + suffix, True
+
+    def _compressors(self):
+        compressors = [(".gz", lambda content: gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            compressors.append((".br", lambda content: brotli.compress(content, quality=11)))
+        return compressors
@@ -1,3 +1,1197 @@
-from django.test import TestCase
+import base64
+import gzip
+import importlib.util
+import os
+import random
+import runpy
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.management.base import SystemCheckError
+from django.conf import settings
+from django.http import HttpResponse, QueryDict
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, models, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Sum
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, modify_settings, override_settings
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from core.management.commands.check_query_plans import full_scans
+from core.cache import cached_query, generations
+from core.checks import check_built_stylesheet
+from core.imports import ServiceTypeImporter, VehicleImporter, run_import
+from core.metrics import registry
+from core.nplusone import NPlusOneError, NPlusOneMiddleware, normalize_sql, watch_queries
+from core.models import (
+    Appointment, DailyAppointmentCount, RatingSummary, Review, SearchEntry, ServiceType, SlotOccupancy, SlowQuery,
+    Vehicle, normalize_license_plate,
+)
+from core.pagination import keyset_paginate, seek_condition
+from core.projections import appointment_list_queryset, review_of, service_names
+from core.permissions import ROLE_STAFF, resolve
+from core.search import search
+from core.seed import rebuild_slot_occupancy, seed
+from core.benchmark import benchmark_user, logged_in_client, percentile, timed_request, view_cases
+from core.slots import SlotUnavailable, month_availability
+from core.slowlog import SlowQueryRecorder, _file, install_recorder, worst_offenders
+from core.stats import daily_counts_from_appointments, month_appointment_counts, rating_summary
+from ev_connect_service import settings as settings_module
+
+# ชื่อโมดูล migration ขึ้นต้นด้วยตัวเลข import ตรง ๆ ไม่ได้
+plate_migration = importlib.import_module('core.migrations.0008_vehicle_license_plate_normalized')
+search_migration = importlib.import_module('core.migrations.0009_searchentry')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client_group = Group.objects.create(name='Client')
+        service = ServiceType.objects.create(name='Maintenance')
+        today = timezone.localdate()
+        with override_settings(BOOKING_SLOT_CAPACITY=10):
+            for number in range(20):
+                user = User.objects.create_user(username=f'client{number}')
+                user.groups.add(client_group)
+                vehicle = Vehicle.objects.create(user=user, brand='Tesla', model='Model Y', license_plate=f'กข {number}')
+                appointment = Appointment.objects.create(
+                    user=user,
+                    vehicle=vehicle,
+                    date=today + timedelta(days=number % 7),
+                    time=time(8 + number % 4, 0),
+                )
+                appointment.service_types.add(service)
+                if number % 2:
+                    Review.objects.create(appointment=appointment, score=number % 5 + 1)
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('FAIL', out.getvalue())
+        # ตรวจทั้งหน้าแรก หน้าถัดไป และ COUNT ของยอดรวมตาม filter เดียวกับที่หน้า list ใช้
+        for name in ('staff vehicles by plate', 'staff vehicles by plate next page', 'staff client users by username total'):
+            self.assertIn(f' {name}', out.getvalue())
+
+    def test_full_scan_detection(self):
+        self.assertEqual(full_scans('3 0 0 SCAN core_review', 'sqlite'), ['core_review'])
+        self.assertEqual(full_scans('3 0 0 SCAN core_review USING INDEX core_review_score_id_idx', 'sqlite'), [])
+        self.assertEqual(full_scans('Seq Scan on core_appointment  (cost=0.00..1.01 rows=1 width=8)', 'postgresql'), ['core_appointment'])
+
+
+class LicensePlateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+
+    def test_normalize_license_plate(self):
+        self.assertEqual(normalize_license_plate('กข 1234'), 'กข1234')
+        self.assertEqual(normalize_license_plate(' กข\u200b๑๒๓๔\n'), 'กข1234')
+        self.assertEqual(normalize_license_plate('AB 12'), 'ab12')
+        self.assertEqual(normalize_license_plate(None), '')
+
+    def test_save_keeps_normalized_plate_in_sync(self):
+        vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข ๑๒๓๔')
+        self.assertEqual(vehicle.license_plate_normalized, 'กข1234')
+
+        vehicle.license_plate = 'ขค 99'
+        vehicle.save(update_fields=['license_plate'])
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.license_plate_normalized, 'ขค99')
+
+    def test_plates_differing_only_in_spacing_are_unique(self):
+        Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vehicle.objects.create(user=self.user, brand='BYD', model='Seal', license_plate='กข๑๒๓๔')
+
+
+class PlateBackfillMigrationTests(TransactionTestCase):
+    def setUp(self):
+        # สถานะก่อน migration 0008 เสร็จ: คอลัมน์ทะเบียนที่ normalize แล้วยังไม่ unique
+        self.unique_field = Vehicle._meta.get_field('license_plate_normalized')
+        self.plain_field = models.CharField(max_length=50, editable=False)
+        self.plain_field.set_attributes_from_name('license_plate_normalized')
+        with connection.schema_editor() as editor:
+            editor.alter_field(Vehicle, self.unique_field, self.plain_field)
+        self.addCleanup(self.restore_unique)
+        user = User.objects.create_user(username='somchai')
+        self.first = Vehicle.objects.create(user=user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.second = Vehicle.objects.create(user=user, brand='BYD', model='Seal', license_plate='ขค 5678')
+
+    def restore_unique(self):
+        Vehicle.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.alter_field(Vehicle, self.plain_field, self.unique_field)
+
+    def test_backfill_fills_normalized_plates(self):
+        Vehicle.objects.update(license_plate_normalized='')
+        plate_migration.backfill_normalized_plates(django_apps, None)
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('pk', 'license_plate_normalized')),
+            {self.first.pk: 'กข1234', self.second.pk: 'ขค5678'},
+        )
+
+    def test_backfill_aborts_on_duplicate_plates(self):
+        Vehicle.objects.filter(pk=self.second.pk).update(license_plate='กข๑๒๓๔')
+        with self.assertRaisesMessage(RuntimeError, f'#{self.first.pk} / #{self.second.pk}'):
+            plate_migration.backfill_normalized_plates(django_apps, None)
+
+
+class SlotOccupancyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.day = timezone.localdate() + timedelta(days=2)
+
+    def booked(self, hour, day=None):
+        slot = SlotOccupancy.objects.filter(date=day or self.day, time=time(hour, 0)).first()
+        return slot.booked if slot else 0
+
+    def book(self, hour):
+        return Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=self.day, time=time(hour, 0))
+
+    @override_settings(BOOKING_SLOT_CAPACITY=2)
+    def test_occupancy_follows_appointments(self):
+        first, second = self.book(8), self.book(8)
+        self.assertEqual(self.booked(8), 2)
+        with self.assertRaises(SlotUnavailable), transaction.atomic():
+            self.book(8)
+
+        first.status = Appointment.Status.REJECT
+        first.save()
+        self.assertEqual(self.booked(8), 1)
+
+        second.time = time(9, 0)
+        second.save()
+        self.assertEqual((self.booked(8), self.booked(9)), (0, 1))
+
+        second.delete()
+        self.assertEqual(self.booked(9), 0)
+
+    def test_capacity_follows_the_setting_for_existing_slots(self):
+        with override_settings(BOOKING_SLOT_CAPACITY=1):
+            self.book(8)
+            with self.assertRaises(SlotUnavailable), transaction.atomic():
+                self.book(8)
+
+        # เพิ่มช่องบริการหลังจากที่ slot มีแถวอยู่แล้ว
+        with override_settings(BOOKING_SLOT_CAPACITY=2):
+            self.assertEqual(month_availability(self.day.year, self.day.month)[0], {})
+            self.book(8)
+            slot = SlotOccupancy.objects.get(date=self.day, time=time(8, 0))
+            self.assertEqual((slot.booked, slot.capacity), (2, 2))
+            self.assertEqual(month_availability(self.day.year, self.day.month)[0], {self.day.day: 0b1})
+
+        # ลดช่องบริการ: slot ที่จองไว้เกินแล้วรับเพิ่มไม่ได้
+        with override_settings(BOOKING_SLOT_CAPACITY=1):
+            Appointment.objects.filter(date=self.day).first().delete()
+            with self.assertRaises(SlotUnavailable), transaction.atomic():
+                self.book(8)
+
+    @override_settings(BOOKING_HORIZON_DAYS=10)
+    def test_month_availability_reads_only_the_booking_window(self):
+        today = date(2026, 3, 10)
+        for day, hour, booked in ((9, 8, 1), (10, 8, 1), (10, 9, 0), (15, 17, 1), (21, 8, 1)):
+            SlotOccupancy.objects.create(date=date(2026, 3, day), time=time(hour, 0), booked=booked, capacity=1)
+
+        days, last_modified = month_availability(2026, 3, today=today)
+        # bit ตามลำดับของ SLOT_TIMES: 8:00 = bit 0, 17:00 = bit 7
+        self.assertEqual(days, {10: 0b1, 15: 0b10000000})
+        newest = SlotOccupancy.objects.filter(date__range=(today, date(2026, 3, 20))).latest('updated_at')
+        self.assertEqual(last_modified, newest.updated_at)
+        self.assertEqual(month_availability(2026, 4, today=today), ({}, None))
+
+    def test_past_appointments_stay_out_of_the_index(self):
+        past = timezone.localdate() - timedelta(days=3)
+        with override_settings(BOOKING_SLOT_CAPACITY=1):
+            old = [
+                Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=past, time=time(8, 0))
+                for _ in range(2)
+            ]
+            # เปลี่ยนสถานะของนัดเก่ากลับจาก REJECT ได้แม้ slot นั้นจะ "เต็ม" ไปแล้ว
+            old[0].status = Appointment.Status.REJECT
+            old[0].save()
+            old[0].status = Appointment.Status.DONE
+            old[0].save()
+            self.assertFalse(SlotOccupancy.objects.filter(date=past).exists())
+
+            # ย้ายนัดเก่ามาเป็นวันที่จองได้ จึงจอง slot
+            old[1].date = self.day
+            old[1].save()
+            self.assertEqual(self.booked(8), 1)
+            old[1].delete()
+            self.assertEqual(self.booked(8), 0)
+
+    def test_rebuild_covers_only_bookable_dates(self):
+        past = timezone.localdate() - timedelta(days=3)
+        Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=past, time=time(8, 0))
+        self.book(9)
+        SlotOccupancy.objects.create(date=past, time=time(9, 0), booked=1)
+        SlotOccupancy.objects.filter(date=self.day).update(booked=0)
+        rebuild_slot_occupancy()
+        self.assertEqual(list(SlotOccupancy.objects.values_list('date', 'time', 'booked')), [(self.day, time(9, 0), 1)])
+
+    def test_prune_removes_past_slots(self):
+        self.book(8)
+        SlotOccupancy.objects.create(date=timezone.localdate() - timedelta(days=1), time=time(8, 0), booked=1)
+        call_command('prune_slot_occupancy', stdout=StringIO())
+        self.assertEqual(list(SlotOccupancy.objects.values_list('date', flat=True)), [self.day])
+
+
+class AppointmentProjectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.services = [ServiceType.objects.create(name=name) for name in ('Maintenance', 'Battery check')]
+
+    def add_appointments(self, count):
+        today = timezone.localdate()
+        for number in range(count):
+            appointment = Appointment.objects.create(
+                user=self.user, vehicle=self.vehicle, date=today - timedelta(days=number + 1), time=time(8, 0),
+                status=Appointment.Status.DONE, description='long text',
+            )
+            appointment.service_types.set(self.services)
+            Review.objects.create(appointment=appointment, score=number % 5 + 1)
+
+    def rows(self):
+        return [
+            (service_names(appointment), review_of(appointment).score, appointment.vehicle.license_plate)
+            for appointment in appointment_list_queryset().order_by('id')
+        ]
+
+    def test_rows_use_two_queries_at_any_size(self):
+        self.add_appointments(2)
+        with self.assertNumQueries(2):
+            rows = self.rows()
+        self.assertEqual(rows[0], (['Maintenance', 'Battery check'], 1, 'กข 1234'))
+
+        self.add_appointments(20)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.rows()), 22)
+
+    def test_description_is_deferred_and_missing_review_is_none(self):
+        with override_settings(BOOKING_SLOT_CAPACITY=100):
+            Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=timezone.localdate(), time=time(8, 0))
+        appointment = appointment_list_queryset().get()
+        self.assertIn('description', appointment.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertIsNone(review_of(appointment))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai', email='somchai@example.com', first_name='Somchai')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข ๑๒๓๔')
+        self.appointment = Appointment.objects.create(
+            user=self.user,
+            vehicle=self.vehicle,
+            date=timezone.localdate() + timedelta(days=1),
+            time=time(9, 0),
+        )
+
+    def found(self, query, kind=None):
+        entries, _ = search(query, kind=kind)
+        return {(entry.kind, entry.object_id) for entry in entries}
+
+    def test_plate_matches_regardless_of_spacing_and_digits(self):
+        expected = {(SearchEntry.Kind.VEHICLE, self.vehicle.pk), (SearchEntry.Kind.APPOINTMENT, self.appointment.pk)}
+        self.assertEqual(self.found('กข1234'), expected)
+        self.assertEqual(self.found('กข ๑๒๓๔'), expected)
+
+    def test_filter_by_kind(self):
+        self.assertEqual(self.found('somchai', kind=SearchEntry.Kind.USER), {(SearchEntry.Kind.USER, self.user.pk)})
+        self.assertEqual(self.found('somchai', kind=SearchEntry.Kind.VEHICLE), set())
+
+    def test_index_follows_changes(self):
+        self.vehicle.license_plate = 'ขค 999'
+        self.vehicle.save()
+        self.assertIn((SearchEntry.Kind.APPOINTMENT, self.appointment.pk), self.found('999'))
+        self.assertEqual(self.found('1234'), set())
+
+        self.vehicle.delete()
+        self.assertEqual(self.found('999'), set())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 ใช้ได้เฉพาะ SQLite')
+class SqliteFullTextSearchTests(TestCase):
+    def setUp(self):
+        # test database สร้างจาก model โดยไม่รัน migration จึงต้องสร้างตาราง FTS และ trigger เอง
+        with connection.cursor() as cursor:
+            for statement in search_migration.SQLITE_FORWARD:
+                cursor.execute(statement)
+        self.user = User.objects.create_user(username='somchai', first_name='Somchai', last_name='Jaidee')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.other = Vehicle.objects.create(user=self.user, brand='BYD', model='Dolphin', license_plate='ขค 5678')
+
+    def test_ranked_matches_from_fts(self):
+        entries, has_next = search('byd atto')
+        self.assertFalse(has_next)
+        self.assertEqual([(entry.kind, entry.object_id) for entry in entries], [(SearchEntry.Kind.VEHICLE, self.vehicle.pk)])
+        self.assertIsInstance(entries[0].rank, float)
+
+        entries, _ = search('byd')
+        self.assertEqual({entry.object_id for entry in entries}, {self.vehicle.pk, self.other.pk})
+        self.assertEqual([entry.rank for entry in entries], sorted((entry.rank for entry in entries), reverse=True))
+
+    def test_short_terms_filter_fts_matches(self):
+        entries, _ = search('byd ขค')
+        self.assertEqual([entry.object_id for entry in entries], [self.other.pk])
+
+    def test_migration_backfills_existing_rows(self):
+        SearchEntry.objects.all().delete()
+        self.assertEqual(search('somchai'), ([], False))
+
+        search_migration.backfill_search_entries(django_apps, None)
+        self.assertEqual(SearchEntry.objects.count(), 3)
+        entries, _ = search('somchai jaidee')
+        self.assertEqual([(entry.kind, entry.object_id) for entry in entries], [(SearchEntry.Kind.USER, self.user.pk)])
+        self.assertIsNotNone(entries[0].rank)
+
+
+class DailyAppointmentCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+        self.vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def book(self, hour):
+        return Appointment.objects.create(user=self.user, vehicle=self.vehicle, date=self.day, time=time(hour, 0))
+
+    def counts(self):
+        return month_appointment_counts(self.day.year, self.day.month).get(self.day.day)
+
+    def assertMatchesAppointments(self):
+        expected = {(row.date, row.status, row.count) for row in daily_counts_from_appointments()}
+        actual = set(DailyAppointmentCount.objects.filter(count__gt=0).values_list('date', 'status', 'count'))
+        self.assertEqual(actual, expected)
+
+    def test_counts_follow_status_changes_and_deletes(self):
+        first, second = self.book(8), self.book(9)
+        self.assertEqual(self.counts(), {'PENDING': 2})
+
+        second.status = Appointment.Status.DONE
+        second.save()
+        self.assertEqual(self.counts(), {'PENDING': 1, 'DONE': 1})
+
+        first.delete()
+        self.assertEqual(self.counts(), {'DONE': 1})
+        self.assertMatchesAppointments()
+
+    def test_cascade_from_user_delete(self):
+        self.book(8)
+        self.user.delete()
+        self.assertIsNone(self.counts())
+
+    def test_rebuild_command(self):
+        self.book(8)
+        DailyAppointmentCount.objects.all().delete()
+        call_command('rebuild_appointment_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), {'PENDING': 1})
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai')
+        vehicle = Vehicle.objects.create(user=self.user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        today = timezone.localdate()
+        with override_settings(BOOKING_SLOT_CAPACITY=10):
+            self.appointments = [
+                Appointment.objects.create(user=self.user, vehicle=vehicle, date=today, time=time(8, 0))
+                for _ in range(3)
+            ]
+
+    def assertSummary(self, counts):
+        summary = rating_summary()
+        self.assertEqual([summary.count_of(score) for score in summary.SCORES], counts)
+        self.assertEqual(summary.review_count, sum(counts))
+        self.assertEqual(summary.score_sum, sum(score * count for score, count in zip(summary.SCORES, counts)))
+
+    def test_summary_follows_reviews(self):
+        first = Review.objects.create(appointment=self.appointments[0], score=5)
+        Review.objects.create(appointment=self.appointments[1], score=3)
+        self.assertSummary([0, 0, 1, 0, 1])
+        self.assertEqual(rating_summary().average, 4)
+
+        first.score = 4
+        first.save()
+        self.assertSummary([0, 0, 1, 1, 0])
+
+        self.appointments[1].delete()
+        self.assertSummary([0, 0, 0, 1, 0])
+
+        self.user.delete()
+        self.assertSummary([0, 0, 0, 0, 0])
+
+    def test_reconcile_command(self):
+        Review.objects.create(appointment=self.appointments[0], score=2)
+        RatingSummary.objects.update(score_2=0, review_count=0, score_sum=0)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_rating_summary', stdout=StringIO())
+        call_command('reconcile_rating_summary', '--fix', stdout=StringIO())
+        self.assertSummary([0, 1, 0, 0, 0])
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ('-date', '-time', 'id')
+
+    def setUp(self):
+        user = User.objects.create_user(username='somchai')
+        vehicle = Vehicle.objects.create(user=user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        today = timezone.localdate()
+        # หลายนัดอยู่ใน slot เดียวกัน: ลำดับต้องตัดสินด้วย id เมื่อวันและเวลาเท่ากัน
+        with override_settings(BOOKING_SLOT_CAPACITY=10):
+            for day, hour, repeat in ((0, 8, 3), (0, 9, 2), (1, 8, 1), (2, 10, 4)):
+                for _ in range(repeat):
+                    Appointment.objects.create(user=user, vehicle=vehicle, date=today + timedelta(days=day), time=time(hour, 0))
+        self.queryset = Appointment.objects.all()
+        self.expected = list(self.queryset.order_by(*self.ordering).values_list('id', flat=True))
+
+    def paginate(self, cursor=None):
+        return keyset_paginate(self.queryset, self.ordering, cursor, page_size=3)
+
+    def ids(self, page):
+        return [appointment.id for appointment in page]
+
+    def test_next_pages_seek_across_ties(self):
+        pages = [self.paginate()]
+        while pages[-1].has_next:
+            pages.append(self.paginate(pages[-1].next_cursor))
+
+        self.assertEqual([id_ for page in pages for id_ in self.ids(page)], self.expected)
+        self.assertEqual([page.start_index for page in pages], [1, 4, 7, 10])
+        self.assertFalse(pages[0].has_previous)
+        self.assertEqual([index for index, _ in pages[1].enumerate()], [4, 5, 6])
+
+    def test_previous_pages_mirror_next_pages(self):
+        pages = [self.paginate()]
+        while pages[-1].has_next:
+            pages.append(self.paginate(pages[-1].next_cursor))
+
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.paginate(page.previous_cursor)
+            self.assertEqual(self.ids(page), self.ids(expected))
+            self.assertEqual(page.start_index, expected.start_index)
+            self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_seek_condition(self):
+        fields = [('date', True), ('time', True), ('id', False)]
+        middle = self.queryset.order_by(*self.ordering)[4]
+        values = [middle.date, middle.time, middle.id]
+        after = self.queryset.filter(seek_condition(fields, values, True)).order_by(*self.ordering)
+        before = self.queryset.filter(seek_condition(fields, values, False)).order_by(*self.ordering)
+        self.assertEqual(list(after.values_list('id', flat=True)), self.expected[5:])
+        self.assertEqual(list(before.values_list('id', flat=True)), self.expected[:4])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        first = self.ids(self.paginate())
+        valid = self.paginate().next_cursor
+        wrong_length = base64.urlsafe_b64encode(b'{"d":"next","k":["2020-01-01"],"n":3}').decode()
+        bad_value = base64.urlsafe_b64encode(b'{"d":"next","k":["not-a-date","08:00",1],"n":3}').decode()
+        bad_direction = base64.urlsafe_b64encode(b'{"d":"up","k":["2020-01-01","08:00",1],"n":3}').decode()
+        for cursor in ('not base64!', valid[:-4], wrong_length, bad_value, bad_direction):
+            with self.subTest(cursor=cursor):
+                page = self.paginate(cursor)
+                self.assertEqual(self.ids(page), first)
+                self.assertEqual(page.start_index, 1)
+
+    def test_link_params_keep_filters(self):
+        params = QueryDict('status=PENDING&date=2026-01-01&cursor=stale', mutable=False)
+        first = self.paginate().link_params(params)
+        self.assertIsNone(first.previous_query)
+        self.assertEqual(
+            QueryDict(first.next_query).dict(),
+            {'status': 'PENDING', 'date': '2026-01-01', 'cursor': first.next_cursor},
+        )
+
+        second = self.paginate(first.next_cursor).link_params(params)
+        self.assertEqual(QueryDict(second.previous_query)['cursor'], second.previous_cursor)
+        self.assertEqual(QueryDict(second.next_query)['status'], 'PENDING')
+        self.assertEqual(params['cursor'], 'stale')
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return ServiceType.objects.count()
+
+    def test_value_is_reused_until_model_changes(self):
+        self.assertEqual(cached_query('service-count', [ServiceType], self.compute), 0)
+        self.assertEqual(cached_query('service-count', [ServiceType], self.compute), 0)
+        self.assertEqual(self.calls, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceType.objects.create(name='Tire')
+        self.assertEqual(cached_query('service-count', [ServiceType], self.compute), 1)
+        self.assertEqual(self.calls, 2)
+
+    def test_m2m_change_invalidates_appointments(self):
+        user = User.objects.create_user(username='somchai')
+        vehicle = Vehicle.objects.create(user=user, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        appointment = Appointment.objects.create(user=user, vehicle=vehicle, date=timezone.localdate(), time=time(8, 0))
+        service = ServiceType.objects.create(name='Tire')
+        before = generations([Appointment])
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.service_types.add(service)
+            in_transaction = generations([Appointment])
+        # ล้างทันที และล้างซ้ำอีกครั้งหลัง commit
+        self.assertNotEqual(in_transaction, before)
+        self.assertNotEqual(generations([Appointment]), in_transaction)
+
+    def test_only_one_worker_recomputes_a_stale_entry(self):
+        generation = ".".join(str(value) for value in generations([ServiceType]))
+        cache.set(f'core:q:busy:{generation}:lock', 1)
+        cache.set(f'core:q:busy:{generation}', ('stale', 0), timeout=60)
+        # มี worker อื่นถือ lock อยู่ จึงได้ค่าเดิมกลับมาโดยไม่คำนวณใหม่
+        self.assertEqual(cached_query('busy', [ServiceType], self.compute), 'stale')
+        self.assertEqual(self.calls, 0)
+
+        cache.delete(f'core:q:busy:{generation}:lock')
+        self.assertEqual(cached_query('busy', [ServiceType], self.compute), 0)
+        self.assertEqual(self.calls, 1)
+
+    def test_lock_of_an_old_generation_does_not_block_the_new_one(self):
+        generation = ".".join(str(value) for value in generations([ServiceType]))
+        cache.set(f'core:q:busy:{generation}:lock', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceType.objects.create(name='Tire')
+        # worker ที่ยังคำนวณค่าของรุ่นเก่าอยู่ไม่ทำให้รุ่นใหม่ต้องรอ LOCK_WAIT
+        with mock.patch('core.cache.time.sleep') as sleep:
+            self.assertEqual(cached_query('busy', [ServiceType], self.compute), 1)
+        sleep.assert_not_called()
+        self.assertEqual(self.calls, 1)
+
+
+@skipUnless(importlib.util.find_spec('fakeredis'), 'ต้อง pip install fakeredis')
+class RedisCacheTests(CacheTests):
+    # รัน CacheTests ซ้ำบน RedisCache จริงของ Django โดยใช้ fakeredis แทน server (incr/add/timeout ต่างจาก locmem)
+    @classmethod
+    def setUpClass(cls):
+        import fakeredis
+
+        cls.enterClassContext(override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379/1',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+            },
+        }))
+        super().setUpClass()
+
+    def test_generation_survives_eviction(self):
+        first = generations([ServiceType])
+        cache.delete('core:gen:core.servicetype')
+        self.assertNotEqual(generations([ServiceType]), first)
+
+
+class PermissionResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_group = Group.objects.create(name='Staff')
+        self.dashboard = Permission.objects.get(content_type__app_label='staff', codename='access_dashboard')
+        self.user = User.objects.create_user(username='somchai')
+
+    def fresh_user(self):
+        # user object ใหม่ เหมือน request ถัดไป
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permissions_are_cached_across_requests(self):
+        self.staff_group.permissions.add(self.dashboard)
+        self.user.groups.add(self.staff_group)
+        self.assertTrue(self.fresh_user().has_perm('staff.access_dashboard'))
+        self.assertEqual(resolve(self.fresh_user()).role, ROLE_STAFF)
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perms(['staff.access_dashboard']))
+            self.assertFalse(user.has_perm('auth.view_user'))
+
+    def test_group_and_membership_changes_invalidate(self):
+        self.user.groups.add(self.staff_group)
+        self.assertFalse(self.fresh_user().has_perm('staff.access_dashboard'))
+
+        self.staff_group.permissions.add(self.dashboard)
+        self.assertTrue(self.fresh_user().has_perm('staff.access_dashboard'))
+
+        self.staff_group.user_set.remove(self.user)
+        user = self.fresh_user()
+        self.assertFalse(user.has_perm('staff.access_dashboard'))
+        self.assertIsNone(resolve(user).role)
+
+        self.user.user_permissions.add(self.dashboard)
+        self.assertTrue(self.fresh_user().has_perm('staff.access_dashboard'))
+
+
+class LegacySessionBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='somchai', password='password')
+        # session ที่ login ด้วย ModelBackend ก่อน deploy
+        session = self.client.session
+        session[SESSION_KEY] = str(self.user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        session.save()
+
+    def test_old_session_stays_logged_in(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'core.permissions.CachedPermissionBackend')
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    @modify_settings(MIDDLEWARE={'remove': 'core.permissions.LegacySessionBackendMiddleware'})
+    def test_old_session_is_dropped_without_middleware(self):
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class ClearExpiredSessionsTests(TestCase):
+    def test_deletes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(session_key=f'expired{number}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='active', session_data='', expire_date=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command('clear_expired_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['active'])
+
+
+class CsvImportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='fleet')
+        Vehicle.objects.create(user=self.owner, brand='Byd', model='Seal', license_plate='กข 1111')
+        ServiceType.objects.create(name='Wash')
+
+    def import_file(self, kind, content, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_csv', kind, file.name, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_vehicles_follow_vehicle_form_rules(self):
+        out, err = self.import_file('vehicles', (
+            'license_plate,brand,model\n'
+            'กค 2222,tesla,model 3\n'
+            'กค๒๒๒๒,BYD,Atto 3\n'
+            'กข1111,BYD,Dolphin\n'
+            'AB 1234,BYD,Dolphin\n'
+            'กง 3333,บีวายดี,Dolphin\n'
+        ), '--owner', 'fleet', '--batch-size', '2')
+        self.assertIn('Imported 1 of 5 rows, 4 rejected.', out)
+        # ซ้ำในไฟล์เดียวกัน (คนละ batch) และซ้ำกับในฐานข้อมูล ตรวจด้วยทะเบียนที่ normalize แล้ว
+        self.assertIn('line 3: license_plate: This license plate already exists.', err)
+        self.assertIn('line 4: license_plate: This license plate already exists.', err)
+        self.assertIn('line 5: license_plate: License plate must contain only Thai characters and numbers.', err)
+        self.assertIn('line 6: brand: Brand must contain only English letters, numbers.', err)
+
+        vehicle = Vehicle.objects.get(license_plate='กค 2222')
+        self.assertEqual((vehicle.user, vehicle.brand, vehicle.model), (self.owner, 'Tesla', 'Model 3'))
+        self.assertEqual(vehicle.license_plate_normalized, 'กค2222')
+        self.assertEqual([entry.object_id for entry in search('กค2222')[0]], [vehicle.id])
+
+    def test_dry_run_saves_nothing(self):
+        out, _ = self.import_file('vehicles', 'license_plate,brand,model,username\nกค 2222,Tesla,Model 3,fleet\n', '--dry-run')
+        self.assertIn('Would import 1 of 1 rows', out)
+        self.assertFalse(Vehicle.objects.filter(license_plate='กค 2222').exists())
+
+    def test_missing_column_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'Add a username column'):
+            self.import_file('vehicles', 'license_plate,brand,model\nกค 2222,Tesla,Model 3\n')
+
+    def test_past_appointments_update_rollups(self):
+        last_week = timezone.localdate() - timedelta(days=7)
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        out, err = self.import_file('appointments', (
+            'license_plate,date,time,status,services\n'
+            f'กข1111,{last_week},09:00,done,Wash\n'
+            f'กข 1111,{last_week},10:00,,wash; Wash\n'
+            f'กข 1111,{tomorrow},10:00,done,\n'
+            f'กข 9999,{last_week},10:00,done,Polish\n'
+        ))
+        self.assertIn('Imported 2 of 4 rows, 2 rejected.', out)
+        self.assertIn('line 4: date: Only past appointments can be imported.', err)
+        self.assertIn('line 5: license_plate: No vehicle with this license plate.', err)
+        self.assertIn("line 5: services: Unknown service type 'Polish'.", err)
+
+        appointments = Appointment.objects.filter(vehicle__license_plate='กข 1111').order_by('time')
+        self.assertEqual([ap.status for ap in appointments], ['DONE', 'DONE'])
+        self.assertEqual([ap.user for ap in appointments], [self.owner, self.owner])
+        self.assertEqual([ap.service_types.count() for ap in appointments], [1, 1])
+        self.assertEqual(
+            DailyAppointmentCount.objects.get(date=last_week, status=Appointment.Status.DONE).count, 2
+        )
+
+    def test_rolled_back_batch_does_not_count_as_duplicates(self):
+        for importer, content in (
+            (VehicleImporter(owner=self.owner), 'license_plate,brand,model\nกค 2222,Tesla,Model 3\nกค2222,Tesla,Model Y\n'),
+            (ServiceTypeImporter(), 'name\nPolish\npolish\n'),
+        ):
+            save = type(importer).save
+            calls = []
+
+            def conflict_once(instance, items):
+                # batch แรกชนกับข้อมูลที่ถูกเพิ่มพร้อมกัน จึง rollback ทั้ง batch
+                calls.append(items)
+                if len(calls) == 1:
+                    raise IntegrityError('conflict')
+                save(instance, items)
+
+            with self.subTest(importer=type(importer).__name__), \
+                    mock.patch.object(type(importer), 'save', autospec=True, side_effect=conflict_once):
+                report = run_import(importer, StringIO(content), batch_size=1)
+                self.assertEqual((report.rows, report.created), (2, 1))
+                self.assertEqual([line for line, _ in report.errors], [2])
+
+    def test_queries_per_batch_not_per_row(self):
+        rows = StringIO('license_plate,brand,model\n' + ''.join(f'กค {n},Tesla,Model 3\n' for n in range(25)))
+        with self.assertNumQueries(3 * 5):
+            # ต่อ batch: ตรวจทะเบียนซ้ำ, savepoint, bulk_create, index ค้นหา, release savepoint
+            report = run_import(VehicleImporter(owner=self.owner), rows, batch_size=10)
+        self.assertEqual((report.rows, report.created, report.errors), (25, 25, []))
+
+
+@override_settings(
+    METRICS_ENABLED=True,
+    MIDDLEWARE=['core.metrics.MetricsMiddleware', *settings.MIDDLEWARE],
+    TEMPLATES=[{**settings.TEMPLATES[0], 'BACKEND': 'core.metrics.MetricsDjangoTemplates'}],
+)
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_views_are_recorded_by_url_name(self):
+        self.client.get(reverse('login'))
+        self.client.get(reverse('login'))
+        self.client.get('/no-such-page/')
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('ev_http_requests_total{view="login",method="GET",status="200"} 2', text)
+        self.assertIn('ev_http_requests_total{view="unmatched",method="GET",status="404"} 1', text)
+        self.assertIn('ev_http_request_duration_seconds_count{view="login"} 2', text)
+        self.assertIn('ev_db_queries_per_request_bucket{view="login",le="+Inf"} 2', text)
+        render_seconds = next(
+            line for line in text.splitlines() if line.startswith('ev_template_render_seconds_total{view="login"}')
+        )
+        self.assertGreater(float(render_seconds.split()[-1]), 0)
+
+    def test_only_local_or_staff_can_read(self):
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+
+        staff = User.objects.create_user(username='staff', password='password')
+        staff.user_permissions.add(Permission.objects.get(codename='access_dashboard'))
+        self.client.login(username='staff', password='password')
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_endpoint_hidden_when_disabled(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(4):
+            user = User.objects.create_user(username=f'client{number}')
+            Vehicle.objects.create(user=user, brand='BYD', model='Atto 3', license_plate=f'กข {number}')
+
+    def usernames_one_by_one(self, request=None):
+        # N+1 ตั้งใจ: user ของรถแต่ละคันถูก query แยกกัน
+        names = []
+        for vehicle in Vehicle.objects.order_by('id'):
+            names.append(vehicle.user.username)
+        return HttpResponse(', '.join(names))
+
+    def test_shapes_ignore_literals_and_in_list_length(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21"),
+            normalize_sql("SELECT *  FROM t WHERE a = 'yy' AND b IN (%s) LIMIT 1"),
+        )
+
+    def test_repeated_shape_reported_with_call_site(self):
+        with watch_queries(threshold=2) as watcher:
+            self.usernames_one_by_one()
+        [problem] = watcher.problems
+        self.assertEqual(problem.count, 4)
+        self.assertIn('FROM "auth_user"', problem.sql)
+        self.assertIn('core/tests.py', problem.call_site)
+        self.assertIn('usernames_one_by_one', problem.call_site)
+
+        with watch_queries(threshold=4) as watcher:
+            self.usernames_one_by_one()
+        self.assertEqual(watcher.problems, [])
+
+    def test_middleware_modes(self):
+        request = RequestFactory().get('/staff/vehicles/')
+        middleware = NPlusOneMiddleware(self.usernames_one_by_one)
+        with override_settings(NPLUSONE_MODE='header', NPLUSONE_THRESHOLD=2):
+            with self.assertLogs('core.nplusone', 'WARNING'):
+                response = middleware(request)
+            self.assertRegex(response['X-N-Plus-One'], r'^4x at core/tests\.py:\d+ in usernames_one_by_one$')
+        with override_settings(NPLUSONE_MODE='raise', NPLUSONE_THRESHOLD=2):
+            with self.assertRaisesMessage(NPlusOneError, 'N+1 queries in /staff/vehicles/'):
+                middleware(request)
+        with override_settings(NPLUSONE_MODE='off', NPLUSONE_THRESHOLD=2):
+            self.assertNotIn('X-N-Plus-One', middleware(request))
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='client')
+
+    def run_query(self):
+        with connection.execute_wrapper(SlowQueryRecorder(connection)):
+            return User.objects.filter(username='client', id__gt=0).count()
+
+    def test_file_sink_and_summary(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'slow.jsonl')
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_SINK='file', SLOW_QUERY_FILE=path):
+            self.addCleanup(_file().close)
+            self.run_query()
+            self.run_query()
+            out = StringIO()
+            call_command('slow_queries', '--hours', '1', stdout=out)
+        # ค่า parameter จริงไม่ถูกเก็บ มีแค่ชนิด
+        with open(path, encoding='utf-8') as file:
+            self.assertNotIn('client', file.readline().split('"params_shape"')[1])
+        output = out.getvalue()
+        self.assertIn('1. 2x total', output)
+        self.assertIn('core/tests.py', output)
+        self.assertIn('run_query', output)
+
+    def test_db_sink_writes_after_commit(self):
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_SINK='db'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_query()
+                self.assertFalse(SlowQuery.objects.exists())
+        record = SlowQuery.objects.get()
+        self.assertIn('FROM "auth_user"', record.sql)
+        self.assertEqual(record.params_shape, ['int', 'str'])
+        self.assertIn('run_query', record.call_site)
+
+        SlowQuery.objects.update(recorded_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('slow_queries', '--source', 'db', '--prune', stdout=out)
+        self.assertIn('No slow queries in the last 24 hours.', out.getvalue())
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_threshold_and_sampling(self):
+        with override_settings(SLOW_QUERY_MS=10_000, SLOW_QUERY_SINK='db'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_query()
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_SAMPLE_RATE=0, SLOW_QUERY_SINK='db'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_query()
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_recorder_installed_once_per_connection(self):
+        connection_created.connect(install_recorder, dispatch_uid='test_slowlog_recorder')
+        self.addCleanup(connection_created.disconnect, dispatch_uid='test_slowlog_recorder')
+        # wrapper แยกจากของ TestCase; ต่อใหม่หลายรอบแบบ CONN_MAX_AGE=0 ที่ต่อใหม่ทุก request
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        for _ in range(5):
+            other.connect()
+        other.close()
+        recorders = [wrapper for wrapper in other.execute_wrappers if isinstance(wrapper, SlowQueryRecorder)]
+        self.assertEqual(len(recorders), 1)
+
+    def test_worst_offenders_grouped_by_shape(self):
+        records = [
+            {'sql': 'SELECT 1 FROM t WHERE id = 5', 'duration_ms': 30, 'view': 'a', 'call_site': 'x.py:1'},
+            {'sql': 'SELECT 1 FROM t WHERE id = 7', 'duration_ms': 50, 'view': 'a', 'call_site': 'x.py:2'},
+            {'sql': 'SELECT 2 FROM u', 'duration_ms': 60, 'view': '', 'call_site': 'y.py:1'},
+        ]
+        first, second = worst_offenders(records)
+        self.assertEqual((first.count, first.total_ms, first.max_ms), (2, 80, 50))
+        self.assertEqual((first.top_view, first.call_site), ('a', 'x.py:2'))
+        self.assertEqual(second.top_view, '-')
+
+
+class SeedDataTests(TestCase):
+    counts = {'clients': 15, 'staff': 2, 'service_types': 5, 'appointments': 300, 'years': 1}
+
+    def test_seed_keeps_derived_tables_consistent(self):
+        result = seed(self.counts, random.Random(7))
+        self.assertEqual(len(result.client_ids), 15)
+        self.assertEqual(Appointment.objects.count(), 300)
+        self.assertEqual(DailyAppointmentCount.objects.aggregate(total=Sum('count'))['total'], 300)
+        self.assertEqual(RatingSummary.objects.get().review_count, Review.objects.count())
+        self.assertEqual(SearchEntry.objects.filter(kind=SearchEntry.Kind.APPOINTMENT).count(), 300)
+        self.assertFalse(SlotOccupancy.objects.filter(booked__gt=F('capacity')).exists())
+        # appointment ในช่วงที่เปิดจองต้องไม่เกิน capacity เดิม ลูกค้าจึงยังจองได้ตามปกติ
+        self.assertFalse(SlotOccupancy.objects.filter(
+            date__gt=timezone.localdate(), capacity__gt=settings.BOOKING_SLOT_CAPACITY
+        ).exists())
+        out = StringIO()
+        call_command('reconcile_rating_summary', stdout=out)
+        self.assertIn('matches', out.getvalue())
+
+    def test_seeded_users_can_open_their_pages(self):
+        result = seed(self.counts, random.Random(7))
+        staff = User.objects.get(pk=result.staff_ids[0])
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse('appointment_list')).status_code, 200)
+        client_user = User.objects.get(pk=result.client_ids[0])
+        self.client.force_login(client_user)
+        self.assertEqual(self.client.get(reverse('vehicle')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('appointment_list')).status_code, 403)
+
+    def test_seeding_twice_adds_new_users(self):
+        first = seed(self.counts, random.Random(7))
+        second = seed(self.counts, random.Random(7))
+        self.assertNotEqual(first.tag, second.tag)
+        self.assertEqual(Appointment.objects.count(), 600)
+
+    def test_percentile_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 99), 5)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+# จำนวน SQL สูงสุดของแต่ละ view ตอน cache ว่าง (ชื่อตาม URL name; ต่อท้าย ?... คือ view เดิมที่มี query string)
+# ถ้าเพิ่ม view ใหม่หรือแก้ให้ใช้ query เพิ่ม ให้แก้ตัวเลขที่นี่ที่เดียว
+QUERY_BUDGETS = {
+    # authen และหน้าแรก: ไม่มี session จึงไม่แตะ database
+    'home': 0,
+    'login': 0,
+    'signup': 0,
+    'logout': 0,
+    'unauthorized': 0,
+    # client
+    'book': 7,
+    'book_availability': 5,
+    'appointment': 6,
+    'review': 7,
+    'vehicle': 5,
+    'add_vehicle': 4,
+    'edit_vehicle': 5,
+    'profile': 5,
+    'edit_profile': 5,
+    'change_password': 4,
+    'appointment_delete': 15,
+    'delete_vehicle': 22,
+    # staff
+    'dashboard': 9,
+    'dashboard_calendar': 5,
+    'appointment_list': 7,
+    'appointment_list?status': 7,
+    'appointment_export': 6,
+    'appointment_detail': 7,
+    'appointment_edit': 5,
+    'vehicle_list': 6,
+    'vehicle_export': 5,
+    'delete_vehicle_list': 22,
+    'review_list': 6,
+    'review_export': 5,
+    'review_detail': 8,
+    'user_list': 6,
+    'user_export': 5,
+    'detail_user_list': 6,
+    'delete_user_list': 32,
+    'send_user_email': 6,
+    'bulk_user_email': 5,
+    'campaign_detail': 8,
+    'outbox_list': 6,
+    'outbox_retry': 5,
+    'staff_search': 6,
+    'staff_import': 4,
+}
+
+
+@override_settings(NPLUSONE_MODE='off')
+class QueryCountTests(TestCase):
+    """Every client, staff and authen view runs the same number of queries at two data sizes."""
+
+    sizes = (
+        {'clients': 4, 'staff': 1, 'service_types': 3, 'appointments': 40, 'years': 1},
+        {'clients': 30, 'staff': 2, 'service_types': 8, 'appointments': 600, 'years': 2},
+    )
+
+    def make_target(self, number):
+        # user ที่ถูกลบใน action ลบข้อมูล: ทุกขนาดมีข้อมูลที่เกี่ยวข้องเท่ากัน จำนวน query ของการลบจึงเทียบกันได้
+        user = User.objects.create_user(username=f'target{number}')
+        user.groups.add(Group.objects.get(name='Client'))
+        vehicle = Vehicle.objects.create(user=user, brand='BYD', model='Seal', license_plate=f'ฮฮ {9000 + number}')
+        done = Appointment.objects.create(
+            user=user, vehicle=vehicle, date=timezone.localdate() - timedelta(days=number + 1), time=time(8, 0),
+            status=Appointment.Status.DONE,
+        )
+        Review.objects.create(appointment=done, score=5)
+        Appointment.objects.create(
+            user=user, vehicle=vehicle, date=done.date, time=time(9, 0), status=Appointment.Status.REJECT,
+        )
+        return user
+
+    def measure(self, counts):
+        queries = {}
+        with transaction.atomic():
+            result = seed(counts, random.Random(3))
+            targets = [self.make_target(number) for number in range(4)]
+            client_user = max(
+                User.objects.filter(pk__in=result.client_ids).order_by('id'), key=lambda user: user.appointments.count()
+            )
+            staff_user = User.objects.get(pk=result.staff_ids[0])
+            clients = {
+                'anonymous': Client(),
+                'client': logged_in_client(client_user),
+                'staff': logged_in_client(staff_user),
+            }
+            for case in view_cases(client_user, staff_user, targets, repeat=0):
+                # cache ว่างทุกครั้ง: นับ query ที่ใช้สร้างหน้าจริง ไม่ใช่แค่อ่านจาก cache
+                cache.clear()
+                response, _, queries[case.name] = timed_request(
+                    clients[case.role], case.method, case.paths[0], case.data
+                )
+                expected = (403,) if case.name == 'unauthorized' else (200, 302)
+                self.assertIn(response.status_code, expected, case.name)
+            transaction.set_rollback(True)
+        cache.clear()
+        return queries
+
+    def test_every_view_has_a_budget(self):
+        names = set()
+        for urlconf in ('client.urls', 'staff.urls', 'authen.urls'):
+            names.update(name for name in get_resolver(urlconf).reverse_dict if isinstance(name, str))
+        self.assertEqual(names, {name.partition('?')[0] for name in QUERY_BUDGETS})
+
+    def test_query_count_does_not_depend_on_row_count(self):
+        small, large = self.measure(self.sizes[0]), self.measure(self.sizes[1])
+        self.assertEqual(set(large), set(QUERY_BUDGETS))
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertEqual(large[name], small[name], 'query count grows with the data (N+1?)')
+                self.assertLessEqual(large[name], budget)
+
+
+class SettingsTests(TestCase):
+    def load_settings(self, **environ):
+        # รัน settings.py ใหม่ด้วย environment ที่กำหนด (decouple อ่าน os.environ ก่อนไฟล์ .env)
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(settings_module.__file__)
+
+    def test_storage_modes_map_to_engines(self):
+        loaded = self.load_settings(SESSION_MODE='db', MESSAGE_MODE='session')
+        self.assertEqual(loaded['SESSION_ENGINE'], 'django.contrib.sessions.backends.db')
+        self.assertEqual(loaded['MESSAGE_STORAGE'], 'django.contrib.messages.storage.session.SessionStorage')
+
+    def test_unknown_mode_names_the_allowed_values(self):
+        for name in ('SESSION_MODE', 'MESSAGE_MODE', 'CACHE_BACKEND'):
+            message = f"{name}='memcached' is not valid"
+            with self.subTest(name=name), self.assertRaisesMessage(ImproperlyConfigured, message):
+                self.load_settings(**{name: 'memcached'})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'db, cached_db, cache, signed_cookies'):
+            self.load_settings(SESSION_MODE='redis')
+
+    def test_connection_settings(self):
+        self.assertIsNone(self.load_settings(DB_CONN_MAX_AGE='None')['DATABASES']['default']['CONN_MAX_AGE'])
+        self.assertEqual(self.load_settings(DB_CONN_MAX_AGE='0')['DATABASES']['default']['CONN_MAX_AGE'], 0)
+
+        database = self.load_settings(
+            DB_ENGINE='django.db.backends.postgresql', DB_POOL='True', DB_POOL_MAX_SIZE='4', DB_CONN_MAX_AGE='600',
+        )['DATABASES']['default']
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 4, 'timeout': 10})
+        # pool ใช้คู่กับ persistent connection ไม่ได้
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+        database = self.load_settings(DB_ENGINE='django.db.backends.sqlite3', DB_POOL='True')['DATABASES']['default']
+        self.assertNotIn('OPTIONS', database)
+
+
+class BenchmarkConnectionsTests(TransactionTestCase):
+    def test_command_compares_connection_modes(self):
+        out = StringIO()
+        call_command('benchmark_connections', '--repeat', '2', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split('  ')[0] for line in lines[1:3]], ['new connection per request', 'persistent + health checks'])
+        self.assertFalse(User.objects.filter(username='benchmark-staff').exists())
+
+    def test_benchmark_user_survives_an_interrupted_run(self):
+        left_over = benchmark_user()
+        self.assertFalse(left_over.has_usable_password())
+        self.assertTrue(left_over.is_superuser)
+        self.assertEqual(benchmark_user(), left_over)
+
+
+class StaticAssetsTests(TestCase):
+    def test_collectstatic_writes_hashed_and_compressed_copies(self):
+        source, target = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(target.cleanup)
+        os.makedirs(os.path.join(source.name, 'core', 'css'))
+        with open(os.path.join(source.name, 'core', 'css', 'app.css'), 'w') as file:
+            file.write('.btn { color: black; }\n' * 200)
+
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage'}}
+        with override_settings(
+            STORAGES=storages,
+            STATIC_ROOT=target.name,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = static('core/css/app.css')
+            name = staticfiles_storage.stored_name('core/css/app.css')
+
+        self.assertRegex(url, r'core/css/app\.[0-9a-f]{12}\.css$')
+        hashed = os.path.join(target.name, name)
+        with open(hashed, 'rb') as original, gzip.open(hashed + '.gz') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+
+    def test_deploy_build_stops_when_the_stylesheet_is_not_built(self):
+        source, target = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(target.cleanup)
+
+        def static_settings(manifest):
+            return override_settings(
+                STATIC_MANIFEST=manifest,
+                STATIC_ROOT=target.name,
+                STATICFILES_DIRS=[source.name],
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            )
+
+        # ตอน dev ยังเปิดหน้าได้ แค่เตือน
+        with static_settings(manifest=False):
+            self.assertEqual([message.id for message in check_built_stylesheet(None)], ['core.W001'])
+        with static_settings(manifest=True):
+            with self.assertRaisesMessage(SystemCheckError, 'core.E001'):
+                call_command('collectstatic', interactive=False, verbosity=0, skip_checks=False)
+            self.assertEqual(os.listdir(target.name), [])
+
+            os.makedirs(os.path.join(source.name, 'core', 'css'))
+            with open(os.path.join(source.name, 'core', 'css', 'app.css'), 'w') as file:
+                file.write('.btn { color: black; }\n')
+            self.assertEqual(check_built_stylesheet(None), [])
+
+    def test_pages_render_without_collectstatic_by_default(self):
+        # STATIC_MANIFEST ปิดเป็นค่าเริ่มต้น: checkout ใหม่ที่ยังไม่ได้ build/collectstatic ก็เปิดหน้าได้
+        response = self.client.get(reverse('login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'{settings.STATIC_URL}core/css/app.css')
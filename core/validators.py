@@ -0,0 +1,21 @@
+import re
+
+from django.core.exceptions import ValidationError
+
+# ใช้ช่วง Unicode \u0E00-\u0E7F เพื่อครอบคลุมสระและเครื่องหมายต่าง ๆ ของภาษาไทย
+# อนุญาตตัวอักษรไทย (รวมสระ/วรรณยุกต์), ตัวเลข และช่องว่างภายในข้อความ
+_THAI_LICENSE_PLATE = re.compile(r"^[\u0E00-\u0E7F0-9 ]+$")
+# อนุญาติเฉพาะ อักษรอังกฤษ ตัวเลข และช่องว่าง
+_ENGLISH_NAME = re.compile(r"^[a-zA-Z0-9 ]+$")
+
+
+def validate_license_plate(value):
+    if not _THAI_LICENSE_PLATE.match(value or ""):
+        raise ValidationError("License plate must contain only Thai characters and numbers.")
+
+
+def clean_vehicle_name(value, label):
+    """Validate a vehicle brand/model and return it the way it is stored."""
+    if not _ENGLISH_NAME.match(value or ""):
+        raise ValidationError(f"{label} must contain only English letters, numbers.")
+    return value.capitalize()
@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.views import View
 
-# Create your views here.
+from core.metrics import registry
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint; only exists when ``METRICS_ENABLED`` is on."""
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            raise Http404
+        # request ที่ผ่าน reverse proxy มี X-Forwarded-For และ REMOTE_ADDR เป็นของ proxy เอง ห้ามถือว่าเป็น localhost
+        local = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS and not request.META.get(
+            'HTTP_X_FORWARDED_FOR'
+        )
+        if not local and not request.user.has_perm('staff.access_dashboard'):
+            raise PermissionDenied
+        return HttpResponse(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
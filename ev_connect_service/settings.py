@@ -10,14 +10,29 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 # สำหรับใช้งาน .env
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def config_choice(name, choices, default):
+    # ค่าที่ต้องเป็นหนึ่งในตัวเลือก: ตั้งผิดให้บอกตัวเลือกที่ใช้ได้ ไม่ใช่ KeyError ตอนเริ่ม server
+    value = config(name, default=default)
+    if value not in choices:
+        raise ImproperlyConfigured(f"{name}={value!r} is not valid; use one of: {', '.join(choices)}.")
+    return value
+
+
+def optional_int(value):
+    # "None" = ไม่จำกัด (เช่น DB_CONN_MAX_AGE)
+    return None if str(value).strip().lower() == 'none' else int(value)
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -25,7 +40,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = config('DEBUG')
+DEBUG = config('DEBUG', cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS').split(',')
 
@@ -48,6 +63,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # session ที่ login ไว้ก่อนเปลี่ยน AUTHENTICATION_BACKENDS ยังใช้ต่อได้ ไม่ต้อง login ใหม่หลัง deploy
+    'core.permissions.LegacySessionBackendMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -57,21 +74,61 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'ev_connect_service.urls'
 
+# สิทธิ์ของ user ถูก cache ไว้ (ดู core.permissions) แทนที่จะ query ตาราง permission ทุก request
+AUTHENTICATION_BACKENDS = ['core.permissions.CachedPermissionBackend']
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # compile template แต่ละไฟล์ครั้งเดียวต่อ process (ตอน DEBUG ยังโหลดใหม่เมื่อไฟล์เปลี่ยน)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Metrics (core.metrics): วัด latency, จำนวน/เวลา query, เวลา render template และขนาด response ของทุก view
+# แสดงที่ /metrics ในรูปแบบของ Prometheus; ปิดอยู่จะไม่มี middleware และไม่มีค่าใช้จ่ายใด ๆ
+# ค่าเก็บแยกในแต่ละ worker process: ถ้ามีหลาย worker ต้องให้ Prometheus scrape ทุก worker แยกกัน (ดู core.metrics.Registry)
+METRICS_ENABLED = config('METRICS_ENABLED', cast=bool, default=False)
+# IP ที่อ่าน /metrics ได้โดยไม่ต้อง login (เช่น Prometheus บนเครื่องเดียวกัน) ส่วน staff ที่เข้า dashboard ได้อ่านได้เสมอ
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', cast=Csv(), default='127.0.0.1,::1')
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.metrics.MetricsMiddleware')
+    TEMPLATES[0]['BACKEND'] = 'core.metrics.MetricsDjangoTemplates'
+
+# ตรวจ N+1 query (core.nplusone): query รูปแบบเดียวกันเกิน NPLUSONE_THRESHOLD ครั้งใน request เดียว
+# NPLUSONE_MODE: off, log (เขียน warning), header (log และใส่ header X-N-Plus-One) หรือ raise (ให้ test fail)
+# ค่าเริ่มต้น: raise ตอน manage.py test, log ตอน DEBUG และ off บน production
+RUNNING_TESTS = sys.argv[1:2] == ['test']
+NPLUSONE_MODE = config('NPLUSONE_MODE', default='raise' if RUNNING_TESTS else 'log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', cast=int, default=5)
+if NPLUSONE_MODE != 'off':
+    MIDDLEWARE.append('core.nplusone.NPlusOneMiddleware')
+
+# บันทึก query ที่ช้ากว่า SLOW_QUERY_MS มิลลิวินาที (core.slowlog) พร้อม SQL, ชนิดของ parameter, view และตำแหน่งในโค้ด
+# 0 = ปิด; SLOW_QUERY_SAMPLE_RATE คือสัดส่วนของ query ช้าที่ถูกบันทึก (0.0-1.0) ลดภาระเมื่อ query ช้าเยอะ
+# SLOW_QUERY_SINK: file (JSONL ที่หมุนไฟล์ตามขนาด) หรือ db (ตาราง core_slow_query); สรุปด้วย manage.py slow_queries
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', cast=float, default=0)
+SLOW_QUERY_SAMPLE_RATE = config('SLOW_QUERY_SAMPLE_RATE', cast=float, default=1.0)
+SLOW_QUERY_SINK = config('SLOW_QUERY_SINK', default='file')
+SLOW_QUERY_FILE = config('SLOW_QUERY_FILE', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+SLOW_QUERY_FILE_MAX_BYTES = config('SLOW_QUERY_FILE_MAX_BYTES', cast=int, default=10 * 1024 * 1024)
+SLOW_QUERY_FILE_BACKUPS = config('SLOW_QUERY_FILE_BACKUPS', cast=int, default=5)
+if SLOW_QUERY_MS > 0:
+    MIDDLEWARE.insert(0, 'core.slowlog.SlowQueryMiddleware')
+
 WSGI_APPLICATION = 'ev_connect_service.wsgi.application'
 
 
@@ -86,9 +143,27 @@ DATABASES = {
         "PASSWORD": config('DB_PASSWORD'),
         "HOST": config('DB_HOST'),
         "PORT": config('DB_PORT'),
+        # ใช้ connection เดิมซ้ำได้นานกี่วินาที (0 = เปิดใหม่ทุก request, None = ไม่จำกัด)
+        "CONN_MAX_AGE": config('DB_CONN_MAX_AGE', cast=optional_int, default=60),
+        # ตรวจว่า connection ที่ใช้ซ้ำยังใช้ได้ก่อนเริ่ม request
+        "CONN_HEALTH_CHECKS": config('DB_CONN_HEALTH_CHECKS', cast=bool, default=True),
     }
 }
 
+# Connection pool ของ psycopg 3 (เฉพาะ PostgreSQL, ต้องติดตั้ง psycopg[pool])
+DB_POOL = config('DB_POOL', cast=bool, default=False)
+if DB_POOL and DATABASES["default"]["ENGINE"] == 'django.db.backends.postgresql':
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": config('DB_POOL_MIN_SIZE', cast=int, default=2),
+            "max_size": config('DB_POOL_MAX_SIZE', cast=int, default=10),
+            # วินาทีที่รอ connection ว่างก่อน error
+            "timeout": config('DB_POOL_TIMEOUT', cast=int, default=10),
+        },
+    }
+    # pool จัดการการใช้ connection ซ้ำเอง Django ไม่ให้ใช้คู่กับ persistent connection
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -125,6 +200,27 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# ขั้นตอน build static สำหรับ production (ดู scripts ใน package.json) ต้องรันทุกครั้งที่ deploy:
+#   npm ci && STATIC_MANIFEST=True npm run build:static  -> build core/static/core/css/app.css แล้ว collectstatic ลง STATIC_ROOT
+# app.css ไม่ได้ commit ไว้: ถ้ายังไม่ได้ build, collectstatic จะหยุดด้วย error core.E001 (ตอน dev/test เป็นแค่ warning core.W001)
+# STATIC_MANIFEST: ใส่ hash ในชื่อไฟล์ + สร้าง .gz/.br ตอน collectstatic; เปิดเมื่อรัน collectstatic แล้วเท่านั้น
+# ไม่อย่างนั้นทุกหน้าจะ error เพราะหาไฟล์ใน manifest ไม่เจอ จึงปิดไว้เป็นค่าเริ่มต้น (รวมถึงตอนรัน test)
+STATIC_MANIFEST = config('STATIC_MANIFEST', cast=bool, default=False)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'core.storage.CompressedManifestStaticFilesStorage'
+            if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# STATIC_ROOT เสิร์ฟโดย nginx หรือ CDN: ตั้ง Cache-Control แบบ immutable อายุยาวให้ไฟล์ที่มี hash ในชื่อ
+# และเปิด gzip_static (กับ brotli_static ถ้ามี) เพื่อส่งไฟล์ .gz/.br ที่สร้างไว้แทนการบีบอัดทุก request
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -133,6 +229,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/login/'
 
+# Sessions & messages
+# SESSION_MODE: db (อ่าน django_session ทุก request), cached_db (อ่านจาก cache ก่อน, ค่าเริ่มต้น),
+# cache (ไม่แตะ DB เลย แต่ session หายถ้า cache ถูกล้าง ควรใช้กับ redis) หรือ signed_cookies (เก็บใน cookie ของ browser)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = config_choice('SESSION_MODE', SESSION_ENGINES, default='cached_db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+# MESSAGE_MODE: fallback (cookie ก่อน ถ้าใหญ่เกินค่อยใช้ session, ค่าเริ่มต้น), cookie หรือ session
+MESSAGE_STORAGES = {
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+}
+MESSAGE_MODE = config_choice('MESSAGE_MODE', MESSAGE_STORAGES, default='fallback')
+MESSAGE_STORAGE = MESSAGE_STORAGES[MESSAGE_MODE]
+
 # Email configuration
 EMAIL_BACKEND = config(
     'EMAIL_BACKEND',
@@ -146,3 +262,51 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 SERVER_EMAIL = config('SERVER_EMAIL', default=DEFAULT_FROM_EMAIL)
+
+# Booking configuration
+# จำนวนวันล่วงหน้าที่ลูกค้าจองได้ (นับจากวันนี้)
+BOOKING_HORIZON_DAYS = config('BOOKING_HORIZON_DAYS', cast=int, default=90)
+# จำนวนนัดที่รับได้ต่อ 1 ช่วงเวลา (เท่ากับจำนวน service bay)
+BOOKING_SLOT_CAPACITY = config('BOOKING_SLOT_CAPACITY', cast=int, default=1)
+
+# Staff list pages
+STAFF_PAGE_SIZE = config('STAFF_PAGE_SIZE', cast=int, default=50)
+# export ของ staff (core.exports): จำนวนแถวที่ดึงจาก database ต่อครั้ง และขนาด (ไบต์) ของแต่ละก้อนที่ส่งออกไป
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', cast=int, default=2000)
+EXPORT_BUFFER_SIZE = config('EXPORT_BUFFER_SIZE', cast=int, default=64 * 1024)
+# จำนวนแถวของ CSV ที่ตรวจและบันทึกต่อ 1 transaction ตอน import (core.imports)
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', cast=int, default=1000)
+
+# Cache
+# CACHE_BACKEND: locmem (ค่าเริ่มต้น, แยกกันต่อ process), file หรือ redis (ใช้ร่วมกันทุก worker)
+# CACHE_LOCATION: path ของ directory สำหรับ file หรือ URL เช่น redis://127.0.0.1:6379/1 สำหรับ redis
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = config_choice('CACHE_BACKEND', CACHE_BACKENDS, default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default='ev-connect' if CACHE_BACKEND == 'locmem' else ''),
+        'TIMEOUT': config('CACHE_TIMEOUT', cast=int, default=300),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='ev'),
+    }
+}
+# อายุ (วินาที) ของ fragment ที่ cache ด้วย {% cache %} เช่นตารางในหน้า list ของ staff
+# ข้อมูลเปลี่ยนเมื่อใด key ของ fragment ก็เปลี่ยนตาม (ดู core.cache.fragment_version)
+TEMPLATE_FRAGMENT_TIMEOUT = config('TEMPLATE_FRAGMENT_TIMEOUT', cast=int, default=600)
+
+# Email outbox (ดู core.outbox และคำสั่ง send_outbox)
+# จำนวนอีเมลที่ส่งต่อ 1 SMTP connection
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', cast=int, default=50)
+# ส่งไม่สำเร็จครบจำนวนครั้งนี้แล้วจะย้ายไปสถานะ DEAD
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', cast=int, default=5)
+# ระยะรอก่อนส่งใหม่ครั้งแรก (วินาที) เพิ่มเป็นสองเท่าทุกครั้งที่ล้มเหลว
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', cast=int, default=60)
+EMAIL_OUTBOX_MAX_RETRY_DELAY = config('EMAIL_OUTBOX_MAX_RETRY_DELAY', cast=int, default=3600)
+# อีเมลที่ค้างสถานะ SENDING นานกว่านี้ (worker ตาย) จะถูกหยิบไปส่งใหม่
+EMAIL_OUTBOX_CLAIM_TIMEOUT = config('EMAIL_OUTBOX_CLAIM_TIMEOUT', cast=int, default=600)
+# จำนวนอีเมลสูงสุดต่อวินาทีที่ worker ส่ง (0 = ไม่จำกัด) กัน SMTP provider ตัดการเชื่อมต่อ
+EMAIL_OUTBOX_RATE_LIMIT = config('EMAIL_OUTBOX_RATE_LIMIT', cast=float, default=0)
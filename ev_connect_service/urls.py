@@ -17,11 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from authen.views import UnauthorizedView
+from core.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('client/', include('client.urls')),
     path('staff/', include('staff.urls')),
+    # Prometheus (เปิดด้วย METRICS_ENABLED)
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include('authen.urls')),
 ]
 
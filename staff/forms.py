@@ -1,5 +1,7 @@
 from django import forms
+from django.contrib.auth.models import User
 
+from core.imports import IMPORTERS
 from core.models import Appointment
 
 
@@ -35,3 +37,28 @@ class EmailForm(forms.Form):
         'placeholder': 'Your message here...',
         'rows': 6
     }))
+
+class ImportForm(forms.Form):
+    base_attrs = {
+        'class': 'w-full px-6 py-3 bg-slate-700 text-slate-300 placeholder-slate-500 rounded-xl focus:outline-none focus:ring-2 focus:ring-yellow-400 transition-all',
+    }
+
+    kind = forms.ChoiceField(
+        choices=[(kind, kind.replace('-', ' ').capitalize()) for kind in IMPORTERS],
+        widget=forms.Select(attrs=base_attrs),
+    )
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={**base_attrs, 'accept': '.csv,text/csv'}))
+    owner = forms.CharField(required=False, widget=forms.TextInput(attrs={
+        **base_attrs,
+        'placeholder': 'Username that owns vehicles without a username column (optional)'
+    }))
+    dry_run = forms.BooleanField(required=False, label='Only check the file, do not save')
+
+    def clean_owner(self):
+        username = self.cleaned_data.get('owner')
+        if not username:
+            return None
+        owner = User.objects.filter(username=username).first()
+        if owner is None:
+            raise forms.ValidationError(f"No user named '{username}'.")
+        return owner
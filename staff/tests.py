@@ -1,3 +1,297 @@
-from django.test import TestCase
+import csv
+import json
+import time as time_module
+from datetime import time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Appointment, EmailCampaign, OutboundEmail, Review, ServiceType, Vehicle
+from core.outbox import RateLimiter, claim_batch, send_pending
+from core.pagination import keyset_paginate
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that rejects every message sent to ``fail@example.com``."""
+
+    def send_messages(self, messages):
+        if any('fail@example.com' in message.to for message in messages):
+            raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    EMAIL_OUTBOX_RETRY_DELAY=60,
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='password')
+        self.staff.user_permissions.add(*Permission.objects.filter(codename__in=['access_dashboard', 'view_user']))
+        self.client.login(username='staff', password='password')
+        self.customer = User.objects.create_user(username='somchai', email='somchai@example.com')
+
+    def test_view_queues_instead_of_sending(self):
+        response = self.client.post(
+            reverse('send_user_email', kwargs={'user_id': self.customer.id}),
+            {'subject': 'Your car is ready', 'message': 'Please pick it up.'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.to_email, email.status), ('somchai@example.com', OutboundEmail.Status.PENDING))
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Your car is ready')
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+
+        response = self.client.get(reverse('outbox_list'), {'status': 'sent'})
+        self.assertContains(response, 'Your car is ready')
+
+    @override_settings(EMAIL_BACKEND='staff.tests.FlakyBackend')
+    def test_failures_back_off_then_go_dead(self):
+        ok = OutboundEmail.objects.create(to_email='ok@example.com', from_email='noreply@example.com', subject='a', body='a')
+        bad = OutboundEmail.objects.create(to_email='fail@example.com', from_email='noreply@example.com', subject='b', body='b')
+
+        self.assertEqual(send_pending(), (1, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (OutboundEmail.Status.PENDING, 1))
+        self.assertGreater(bad.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertIn('mailbox unavailable', bad.last_error)
+        # ยังไม่ถึงเวลา retry
+        self.assertEqual(send_pending(), (0, 0))
+
+        OutboundEmail.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (OutboundEmail.Status.DEAD, 2))
+        ok.refresh_from_db()
+        self.assertEqual(ok.status, OutboundEmail.Status.SENT)
+
+        self.client.post(reverse('outbox_retry', kwargs={'email_id': bad.pk}))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (OutboundEmail.Status.PENDING, 0))
+
+    def test_one_connection_per_batch(self):
+        for number in range(5):
+            OutboundEmail.objects.create(
+                to_email=f'user{number}@example.com', from_email='noreply@example.com', subject='s', body='b'
+            )
+        with mock.patch.object(EmailBackend, 'open', autospec=True, return_value=True) as opened:
+            self.assertEqual(send_pending(batch_size=2), (5, 0))
+        self.assertEqual(opened.call_count, 3)
+
+    def test_rows_claimed_by_another_worker_are_not_sent(self):
+        emails = [
+            OutboundEmail.objects.create(
+                to_email=f'user{number}@example.com', from_email='noreply@example.com', subject='s', body='b'
+            )
+            for number in range(3)
+        ]
+        now = timezone.now()
+        raced = []
+
+        def other_worker(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            # อีก worker claim แถวแรกไปหลังเรา SELECT แต่ก่อนเรา UPDATE (backend ที่ไม่มี SKIP LOCKED)
+            if sql.startswith('SELECT') and not raced:
+                raced.append(sql)
+                OutboundEmail.objects.filter(pk=emails[0].pk).update(
+                    status=OutboundEmail.Status.SENDING, claimed_at=now - timedelta(seconds=1)
+                )
+            return result
+
+        with connection.execute_wrapper(other_worker):
+            claimed = claim_batch(now=now)
+        self.assertEqual([email.pk for email in claimed], [emails[1].pk, emails[2].pk])
+        emails[0].refresh_from_db()
+        self.assertEqual(emails[0].claimed_at, now - timedelta(seconds=1))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', BOOKING_SLOT_CAPACITY=10)
+class BulkEmailTests(TestCase):
+    def setUp(self):
+        staff = User.objects.create_user(username='staff', password='password')
+        staff.user_permissions.add(*Permission.objects.filter(codename__in=['access_dashboard', 'view_user']))
+        self.client.login(username='staff', password='password')
+
+        clients = Group.objects.create(name='Client')
+        day = timezone.localdate()
+        for number in range(6):
+            user = User.objects.create_user(username=f'client{number}', email=f'client{number}@example.com')
+            user.groups.add(clients)
+            vehicle = Vehicle.objects.create(user=user, brand='BYD', model='Atto 3', license_plate=f'กข {number}')
+            status = Appointment.Status.DONE if number % 2 else Appointment.Status.PENDING
+            # client0 และ client1 มีนัด 2 ครั้ง แต่ต้องได้อีเมลแค่ฉบับเดียว
+            for _ in range(2 if number < 2 else 1):
+                Appointment.objects.create(user=user, vehicle=vehicle, date=day, time=time(9, 0), status=status)
+        User.objects.create_user(username='client-no-email').groups.add(clients)
+
+    def test_campaign_reaches_each_user_in_segment_once(self):
+        response = self.client.get(reverse('bulk_user_email'), {'appointment_status': 'done'})
+        self.assertEqual(response.context['recipient_count'], 3)
+
+        response = self.client.post(
+            reverse('bulk_user_email'),
+            {'appointment_status': 'done', 'subject': 'Thanks', 'message': 'See you again.'},
+        )
+        campaign = EmailCampaign.objects.get()
+        self.assertRedirects(response, reverse('campaign_detail', kwargs={'campaign_id': campaign.id}))
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = StringIO()
+        call_command('send_outbox', stdout=out)
+        self.assertIn('Queued 3 campaign emails', out.getvalue())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [
+            'client1@example.com', 'client3@example.com', 'client5@example.com',
+        ])
+
+        response = self.client.get(reverse('campaign_detail', kwargs={'campaign_id': campaign.id}))
+        self.assertEqual(response.context['progress'][OutboundEmail.Status.SENT], 3)
+        self.assertEqual(response.context['percentage'], 100)
+
+    def test_rate_limiter_spaces_sends(self):
+        limiter = RateLimiter(per_second=50)
+        started = time_module.monotonic()
+        for _ in range(3):
+            limiter.wait()
+        self.assertGreaterEqual(time_module.monotonic() - started, 0.039)
+
+
+class ListFragmentCacheTests(TestCase):
+    def setUp(self):
+        staff = User.objects.create_user(username='staff', password='password')
+        staff.user_permissions.add(*Permission.objects.filter(codename__in=['access_dashboard', 'access_vehicle_page']))
+        self.client.login(username='staff', password='password')
+        owner = User.objects.create_user(username='somchai')
+        self.vehicle = Vehicle.objects.create(user=owner, brand='BYD', model='Atto 3', license_plate='กข 1234')
+
+    def vehicle_list_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('vehicle_list'), params)
+        return response, [query['sql'] for query in queries if 'core_vehicle' in query['sql']]
+
+    def test_repeat_view_renders_table_from_cache(self):
+        response, queries = self.vehicle_list_queries()
+        self.assertContains(response, 'Atto 3')
+        self.assertTrue(queries)
+
+        response, queries = self.vehicle_list_queries()
+        self.assertContains(response, 'Atto 3')
+        self.assertEqual(queries, [])
+        # csrf token อยู่นอก fragment จึงเป็นของ session ปัจจุบันเสมอ
+        self.assertContains(response, 'id="delete-vehicle-form"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_change_replaces_cached_table(self):
+        self.vehicle_list_queries()
+        self.vehicle.model = 'Seal'
+        self.vehicle.save()
+
+        response, queries = self.vehicle_list_queries()
+        self.assertContains(response, 'Seal')
+        self.assertNotContains(response, 'Atto 3')
+        self.assertTrue(queries)
+
+    @override_settings(STAFF_PAGE_SIZE=1)
+    def test_next_page_does_not_count_again(self):
+        Vehicle.objects.create(user=self.vehicle.user, brand='BYD', model='Seal', license_plate='ขค 5678')
+        response, queries = self.vehicle_list_queries()
+        self.assertContains(response, 'Total 2 vehicles', html=False)
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 1)
+
+        cursor = keyset_paginate(Vehicle.objects.all(), ('id',)).next_cursor
+        response, queries = self.vehicle_list_queries(cursor=cursor)
+        self.assertContains(response, 'Seal')
+        self.assertContains(response, 'Total 2 vehicles', html=False)
+        # จำนวนทั้งหมด cache ตาม filter ไม่ใช่ตาม cursor จึงไม่ต้อง COUNT ใหม่ทุกหน้า
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        staff = User.objects.create_user(username='staff', password='password')
+        staff.user_permissions.add(*Permission.objects.filter(
+            codename__in=['access_dashboard', 'access_appointment_page', 'access_review_page', 'view_reviewstaff']
+        ))
+        self.client.login(username='staff', password='password')
+
+        owner = User.objects.create_user(username='somchai')
+        vehicle = Vehicle.objects.create(user=owner, brand='BYD', model='Atto 3', license_plate='กข 1234')
+        wash, check = ServiceType.objects.create(name='Wash'), ServiceType.objects.create(name='Battery check')
+        day = timezone.localdate()
+        done = Appointment.objects.create(user=owner, vehicle=vehicle, date=day, time=time(9, 0), status=Appointment.Status.DONE)
+        done.service_types.add(wash, check)
+        Review.objects.create(appointment=done, score=5, comment='ดีมาก')
+        Appointment.objects.create(user=owner, vehicle=vehicle, date=day, time=time(10, 0))
+        self.done = done
+
+    def download(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_honours_list_filters(self):
+        content = self.download('appointment_export', status='done')
+        rows = list(csv.DictReader(content.lstrip('\ufeff').splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], str(self.done.id))
+        self.assertEqual(rows[0]['license_plate'], 'กข 1234')
+        self.assertEqual(rows[0]['services'], 'Wash; Battery check')
+        self.assertEqual(rows[0]['review_score'], '5')
+
+    def test_jsonl_one_object_per_line(self):
+        content = self.download('appointment_export', format='jsonl')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['status'] for row in rows], ['PENDING', 'DONE'])
+        self.assertEqual(rows[1]['services'], ['Wash', 'Battery check'])
+        self.assertIsNone(rows[0]['review_score'])
+
+        rows = [json.loads(line) for line in self.download('review_export', format='jsonl', score='5').splitlines()]
+        self.assertEqual(rows, [{
+            'id': self.done.review.id, 'score': 5, 'comment': 'ดีมาก', 'appointment_id': self.done.id,
+            'appointment_date': self.done.date.isoformat(), 'license_plate': 'กข 1234',
+        }])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('appointment_export'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportViewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='password')
+        self.staff.user_permissions.add(*Permission.objects.filter(codename__in=['access_dashboard']))
+        self.client.login(username='staff', password='password')
+        User.objects.create_user(username='fleet')
+
+    def upload(self, content, **data):
+        upload = SimpleUploadedFile('vehicles.csv', content.encode('utf-8-sig'), content_type='text/csv')
+        return self.client.post(reverse('staff_import'), {'kind': 'vehicles', 'file': upload, **data})
+
+    def test_import_needs_add_permission_for_the_kind(self):
+        response = self.upload('license_plate,brand,model\nกค 2222,Tesla,Model 3\n', owner='fleet')
+        self.assertEqual(response.status_code, 403)
+
+    def test_report_lists_rejected_rows(self):
+        self.staff.user_permissions.add(Permission.objects.get(codename='add_vehiclestaff'))
+        response = self.upload('license_plate,brand,model\nกค 2222,Tesla,Model 3\nกค 2222,Tesla,Model Y\n', owner='fleet')
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertEqual(response.context['errors'], [(3, 'license_plate: This license plate already exists.')])
+        self.assertEqual(Vehicle.objects.get().user.username, 'fleet')
 
-# Create your tests here.
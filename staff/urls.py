@@ -4,26 +4,48 @@ from . import views
 urlpatterns = [
     # ex: /staff/
     path('', views.DashboardView.as_view(), name='dashboard'),
+    # ex: /staff/calendar/?month=2025-10
+    path('calendar/', views.DashboardCalendarView.as_view(), name='dashboard_calendar'),
     # ex: /staff/appointments/
     path('appointments/', views.AppointmentListView.as_view(), name='appointment_list'),
+    # ex: /staff/appointments/export/?format=csv&status=done
+    path('appointments/export/', views.AppointmentExportView.as_view(), name='appointment_export'),
     # ex: /staff/appointments/1/
     path('appointments/<int:appointment_id>/', views.AppointmentDetailView.as_view(), name='appointment_detail'),
     # ex: /staff/appointments/1/edit/
     path('appointments/<int:appointment_id>/edit/', views.AppointmentEditView.as_view(), name='appointment_edit'),
     # ex: /staff/vehicles/
     path('vehicles/', views.VehicleListView.as_view(), name='vehicle_list'),
+    # ex: /staff/vehicles/export/?format=jsonl
+    path('vehicles/export/', views.VehicleExportView.as_view(), name='vehicle_export'),
     # ex: /staff/vehicles/1/delete/
     path('vehicles/<int:vehicle_id>/delete/', views.VehicleDeleteView.as_view(), name='delete_vehicle_list'),
     # ex: /staff/reviews/
     path('reviews/', views.ReviewListView.as_view(), name='review_list'),
+    # ex: /staff/reviews/export/?score=5
+    path('reviews/export/', views.ReviewExportView.as_view(), name='review_export'),
     # ex: /staff/reviews/1/
     path('reviews/<int:review_id>/', views.ReviewDetailView.as_view(), name='review_detail'),
     # ex: /staff/users/
     path('users/', views.UserListView.as_view(), name='user_list'),
+    # ex: /staff/users/export/?appointment_status=done
+    path('users/export/', views.UserExportView.as_view(), name='user_export'),
     # ex: /staff/users/1/detail/
     path('users/<int:user_id>/detail/', views.UserDetailView.as_view(), name='detail_user_list'),
     # ex: /staff/users/1/delete/
     path('users/<int:user_id>/delete/', views.UserDeleteView.as_view(), name='delete_user_list'),
+    # ex: /staff/search/?q=กข1234&type=vehicle
+    path('search/', views.SearchView.as_view(), name='staff_search'),
+    # ex: /staff/import/ (อัปโหลด CSV ของ vehicles, service types หรือ appointments ย้อนหลัง)
+    path('import/', views.ImportView.as_view(), name='staff_import'),
     # ex: /staff/users/1/send-email/
     path('users/<int:user_id>/send-email/', views.SendEmailView.as_view(), name='send_user_email'),
+    # ex: /staff/users/send-email/?appointment_status=done
+    path('users/send-email/', views.BulkEmailView.as_view(), name='bulk_user_email'),
+    # ex: /staff/campaigns/1/
+    path('campaigns/<int:campaign_id>/', views.CampaignDetailView.as_view(), name='campaign_detail'),
+    # ex: /staff/emails/?status=dead
+    path('emails/', views.OutboxListView.as_view(), name='outbox_list'),
+    # ex: /staff/emails/1/retry/
+    path('emails/<int:email_id>/retry/', views.OutboxRetryView.as_view(), name='outbox_retry'),
 ]
@@ -1,47 +1,114 @@
+import io
 import json
-import profile
+from abc import ABCMeta, abstractmethod
 
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Count
-from django.shortcuts import redirect, render
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
 from django.views import View
 
-from core.models import Appointment, Vehicle, Review
-
-from staff.forms import AppointmentStatusForm, EmailForm
+from core.cache import fragment_version
+from core.imports import InvalidImport, make_importer, run_import
+from core.exports import (
+    APPOINTMENT_COLUMNS, EXPORT_FORMATS, REVIEW_COLUMNS, USER_COLUMNS, VEHICLE_COLUMNS,
+    appointment_rows, export_response, review_rows, user_rows, vehicle_rows,
+)
+from core.models import Appointment, EmailCampaign, OutboundEmail, Profile, SearchEntry, ServiceType, Vehicle, Review, normalize_license_plate
+from core.outbox import campaign_progress, queue_campaign, queue_email
+from core.pagination import keyset_paginate
+from core.projections import appointment_list_queryset, service_names
+from core.search import search
+from core.segments import client_segment, segment_filters
+from core.slots import SlotUnavailable
+from core.stats import cached_month_appointment_counts, cached_rating_summary, dashboard_totals
+
+from staff.forms import AppointmentStatusForm, EmailForm, ImportForm
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 
-from django.core.mail import send_mail
-from django.conf import settings
+
+def filter_appointments(appointments, params):
+    # ตัวกรองเดียวกันทั้งหน้า list และ export
+    if params.get('date'):
+        appointments = appointments.filter(date=params['date'])
+    if params.get('status'):
+        # status เก็บเป็นตัวพิมพ์ใหญ่เสมอ ใช้ exact เพื่อให้ใช้ index ได้
+        appointments = appointments.filter(status=params['status'].upper())
+    return appointments
+
+
+def filter_vehicles(vehicles, params):
+    if params.get('license_plate'):
+        vehicles = vehicles.filter(
+            license_plate_normalized__contains=normalize_license_plate(params['license_plate'])
+        )
+    return vehicles
+
+
+def filter_reviews(reviews, params):
+    if params.get('score', '').isdigit():
+        reviews = reviews.filter(score=int(params['score']))
+    return reviews
+
+
+# queryset ของหน้า list ใช้ทั้งใน view และใน check_query_plans เพื่อให้ตรวจ query เดียวกับที่ view ส่งจริง
+APPOINTMENT_LIST_ORDERING = ('-date', '-time', 'id')
+
+
+def appointment_list(params):
+    return filter_appointments(appointment_list_queryset(), params).order_by(*APPOINTMENT_LIST_ORDERING)
+
+
+def vehicle_list(params):
+    # username ของเจ้าของมาใน SELECT เดียวกัน ไม่ query ทีละแถว
+    return filter_vehicles(Vehicle.objects.select_related('user'), params).order_by('id')
+
+
+def review_list(params):
+    return filter_reviews(Review.objects.select_related('appointment__vehicle'), params).order_by('id')
+
+
+def user_list(filters):
+    # only users in Django Group "Client" (กรองเพิ่มตาม username / appointment ได้)
+    return client_segment(filters).select_related('profile').order_by('id')
+
+
+def export_query(params):
+    # ตัวกรองปัจจุบันของหน้า list (ไม่รวม cursor เพราะ export ส่งออกทุกหน้า)
+    params = params.copy()
+    params.pop('cursor', None)
+    return params.urlencode()
+
 
 # Create your views here.
 class DashboardView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['staff.access_dashboard']
 
     def get(self, request):
-        total_appointments = Appointment.objects.count()
-        total_vehicles = Vehicle.objects.count()
-        total_users = User.objects.filter(groups__name='Client').exclude(is_superuser=True).count()
-        # Appointments over time for chart
-        appointment_dates = list(
-            Appointment.objects.values_list('date', flat=True)
-        )
-        appointment_dates_json = json.dumps(
-            [date.isoformat() for date in appointment_dates]
-        )
+        totals = dashboard_totals()
+        total_appointments = totals['appointments']
+        total_vehicles = totals['vehicles']
+        total_users = totals['users']
+        # Appointments per day of the current month for the calendar (เดือนอื่นโหลดผ่าน dashboard_calendar)
+        today = timezone.localdate()
+        calendar_json = json.dumps({
+            'month': f"{today.year:04d}-{today.month:02d}",
+            'days': cached_month_appointment_counts(today.year, today.month),
+        })
         # Rating statistics
-        total_reviews = Review.objects.count()
-
-        score_counts = dict(
-            Review.objects.values('score')
-            .annotate(total=Count('score'))
-            .values_list('score', 'total')
-        )
+        summary = cached_rating_summary()
+        total_reviews = summary.review_count
 
         rating_stats = []
-        for score in range(1, 6):
-            count = score_counts.get(score, 0)
+        for score in summary.SCORES:
+            count = summary.count_of(score)
             percentage = (count / total_reviews * 100) if total_reviews else 0
             rating_stats.append({
                 'score': score,
@@ -53,44 +120,69 @@ class DashboardView(LoginRequiredMixin, PermissionRequiredMixin, View):
             'total_appointments': total_appointments,
             'total_vehicles': total_vehicles,
             'total_users': total_users,
-            'appointment_dates_json': appointment_dates_json,
+            'calendar_json': calendar_json,
             'rating_stats': rating_stats,
             'total_reviews': total_reviews,
+            'average_score': round(summary.average, 2),
+        })
+
+class DashboardCalendarView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard']
+
+    def get(self, request):
+        # ex: ?month=2025-10
+        try:
+            year, month = (int(part) for part in request.GET.get('month', '').split('-'))
+            days = cached_month_appointment_counts(year, month)
+        except ValueError:
+            return JsonResponse({'error': 'month must be in YYYY-MM format'}, status=400)
+
+        return JsonResponse({
+            'month': f"{year:04d}-{month:02d}",
+            # day of month -> {status: count}
+            'days': days,
         })
 
 class AppointmentListView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['staff.access_appointment_page']
 
     def get(self, request):
-        appointments =  Appointment.objects.all().order_by('-date', '-time')
+        appointments = appointment_list(request.GET)
         filter_date = request.GET.get('date')
         filter_status = request.GET.get('status')
 
-        if filter_date:
-            appointments = appointments.filter(date=filter_date)
-        if filter_status:
-            appointments = appointments.filter(status__iexact=filter_status)
-
-        appointment_rows = []
-        for idx, appointment in enumerate(appointments, start=1):
-            service_list = ', '.join(appointment.service_types.values_list('name', flat=True))
-            status_raw = appointment.status.upper()
-            appointment_rows.append({
-                'index': idx,
-                'id': appointment.id,
-                'license_plate': appointment.vehicle.license_plate if appointment.vehicle else '-',
-                'services': service_list,
-                'date': appointment.date.strftime('%d/%m/%Y'),
-                'time': appointment.time.strftime('%H:%M'),
-                'status': status_raw,
-            })
-
+        # ตารางถูก cache เป็น fragment ใน template จึงดึงข้อมูลแบบ lazy: query เฉพาะตอนที่ cache miss
+        page = SimpleLazyObject(lambda: keyset_paginate(
+            appointments, APPOINTMENT_LIST_ORDERING, request.GET.get('cursor')
+        ).link_params(request.GET))
+
+        def appointment_rows():
+            rows = []
+            for idx, appointment in page.enumerate():
+                service_list = ', '.join(service_names(appointment))
+                status_raw = appointment.status.upper()
+                rows.append({
+                    'index': idx,
+                    'id': appointment.id,
+                    'license_plate': appointment.vehicle.license_plate if appointment.vehicle else '-',
+                    'services': service_list,
+                    'date': appointment.date.strftime('%d/%m/%Y'),
+                    'time': appointment.time.strftime('%H:%M'),
+                    'status': status_raw,
+                })
+            return rows
 
         return render(request, 'appointment_list.html', {
-            'total_appointments': appointments.count(),
-            'appointments': appointment_rows,
+            # COUNT ทั้งชุดอยู่ใน fragment ที่ key ตาม filter แต่ไม่รวม cursor: นับครั้งเดียวต่อ filter ต่อ version ของข้อมูล
+            # การเลื่อนหน้าจึงไม่ COUNT ซ้ำ แลกกับ COUNT เต็มตารางครั้งแรกของแต่ละ filter (ทุก list view ใช้แบบเดียวกัน)
+            'total_appointments': SimpleLazyObject(appointments.count),
+            'appointments': SimpleLazyObject(appointment_rows),
+            'page': page,
+            'fragment_version': fragment_version(Appointment, Vehicle, ServiceType),
+            'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
             'filter_date': filter_date,
             'filter_status': filter_status,
+            'export_query': export_query(request.GET),
         })
 
 class AppointmentDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -135,9 +227,15 @@ class AppointmentEditView(LoginRequiredMixin, PermissionRequiredMixin, View):
         form = AppointmentStatusForm(request.POST, instance=appointment)
         status_choices = Appointment.Status.choices
         if form.is_valid():
-            form.save()
-            messages.success(request, f"Appointment (license plate: {appointment.vehicle.license_plate}) status updated successfully.")
-            return redirect('appointment_list')
+            try:
+                with transaction.atomic():
+                    form.save()
+            except SlotUnavailable:
+                # เปลี่ยนจาก REJECT กลับมาในขณะที่ slot เต็มแล้ว
+                form.add_error('status', "This time slot is already fully booked.")
+            else:
+                messages.success(request, f"Appointment (license plate: {appointment.vehicle.license_plate}) status updated successfully.")
+                return redirect('appointment_list')
 
         selected_status = form['status'].value() or appointment.status
         return render(request, 'appointment_edit.html', {
@@ -150,28 +248,34 @@ class AppointmentEditView(LoginRequiredMixin, PermissionRequiredMixin, View):
 class VehicleListView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['staff.access_vehicle_page']
     def get(self, request):
-        vehicles = Vehicle.objects.all().order_by('id')
-
+        vehicles = vehicle_list(request.GET)
         filter_license_plate = request.GET.get('license_plate')
-        if filter_license_plate:
-            vehicles = vehicles.filter(license_plate__icontains=filter_license_plate)
 
-        vehicle_rows = [
-            {
-                'index': idx,
-                'id': vehicle.id,
-                'username': vehicle.user.username if vehicle.user else '-',
-                'license_plate': vehicle.license_plate,
-                'brand': vehicle.brand,
-                'model': vehicle.model,
-            }
-            for idx, vehicle in enumerate(vehicles, start=1)
-        ]
+        page = SimpleLazyObject(
+            lambda: keyset_paginate(vehicles, ('id',), request.GET.get('cursor')).link_params(request.GET)
+        )
+
+        def vehicle_rows():
+            return [
+                {
+                    'index': idx,
+                    'id': vehicle.id,
+                    'username': vehicle.user.username if vehicle.user else '-',
+                    'license_plate': vehicle.license_plate,
+                    'brand': vehicle.brand,
+                    'model': vehicle.model,
+                }
+                for idx, vehicle in page.enumerate()
+            ]
 
         return render(request, 'vehicle_list.html', {
-            'total_vehicles': vehicles.count(),
-            'vehicles': vehicle_rows,
+            'total_vehicles': SimpleLazyObject(vehicles.count),
+            'vehicles': SimpleLazyObject(vehicle_rows),
+            'page': page,
+            'fragment_version': fragment_version(Vehicle, User),
+            'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
             'filter_license_plate': filter_license_plate,
+            'export_query': export_query(request.GET),
         })
 
 class VehicleDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -188,29 +292,36 @@ class ReviewListView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['staff.access_review_page', 'staff.view_reviewstaff']
 
     def get(self, request):
-        reviews = Review.objects.all().order_by('id')
-
+        reviews = review_list(request.GET)
         filter_score = request.GET.get('score')
-        if filter_score:
-            reviews = reviews.filter(score=int(filter_score))
-        print(filter_score)
-
-        review_rows = []
-        for idx, review in enumerate(reviews, start=1):
-            appointment = review.appointment
-            vehicle = appointment.vehicle if appointment else None
-            review_rows.append({
-                'index': idx,
-                'id': review.id,
-                'score': review.score,
-                'comment': review.comment or '-',
-                'appointment_number': appointment.id if appointment else '-',
-                'license_plate': vehicle.license_plate if vehicle else '-',
-            })
+
+        page = SimpleLazyObject(
+            lambda: keyset_paginate(reviews, ('id',), request.GET.get('cursor')).link_params(request.GET)
+        )
+
+        def review_rows():
+            rows = []
+            for idx, review in page.enumerate():
+                appointment = review.appointment
+                vehicle = appointment.vehicle if appointment else None
+                rows.append({
+                    'index': idx,
+                    'id': review.id,
+                    'score': review.score,
+                    'comment': review.comment or '-',
+                    'appointment_number': appointment.id if appointment else '-',
+                    'license_plate': vehicle.license_plate if vehicle else '-',
+                })
+            return rows
+
         return render(request, 'review_list.html', {
-            'total_reviews': reviews.count(),
-            'reviews': review_rows,
+            'total_reviews': SimpleLazyObject(reviews.count),
+            'reviews': SimpleLazyObject(review_rows),
+            'page': page,
+            'fragment_version': fragment_version(Review, Appointment, Vehicle),
+            'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
             'filter_score': filter_score,
+            'export_query': export_query(request.GET),
         })
 
 class ReviewDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -241,30 +352,107 @@ class UserListView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['auth.view_user']
 
     def get(self, request):
-        # only users in Django Group "Client"
-        users = User.objects.filter(groups__name='Client').exclude(is_superuser=True).order_by('id')
+        filters = segment_filters(request.GET)
+        users = user_list(filters)
+        filter_username = filters.get('username')
 
-        filter_username = request.GET.get('username')
-        if filter_username:
-            users = users.filter(username__icontains=filter_username)
+        page = SimpleLazyObject(
+            lambda: keyset_paginate(users, ('id',), request.GET.get('cursor')).link_params(request.GET)
+        )
 
-        user_rows = [
-            {
-                'index': idx,
-                'id': user.id,
-                'username': user.username,
-                'phone_number': user.profile.phone_number if hasattr(user, 'profile') else '-',
-                'email': user.email or '-',
-            }
-            for idx, user in enumerate(users, start=1)
-        ]
+        def user_rows():
+            return [
+                {
+                    'index': idx,
+                    'id': user.id,
+                    'username': user.username,
+                    'phone_number': user.profile.phone_number if hasattr(user, 'profile') else '-',
+                    'email': user.email or '-',
+                }
+                for idx, user in page.enumerate()
+            ]
 
         return render(request, 'user_list.html', {
-            'total_users': users.count(),
-            'users': user_rows,
+            'total_users': SimpleLazyObject(users.count),
+            'users': SimpleLazyObject(user_rows),
+            'page': page,
+            # segment กรองตามนัดหมาย จึงขึ้นกับ Appointment ด้วย
+            'fragment_version': fragment_version(User, Profile, Appointment),
+            'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
             'filter_username': filter_username,
+            'filters': filters,
+            'status_choices': Appointment.Status.choices,
+            'segment_query': urlencode(filters),
+            'export_query': export_query(request.GET),
         })
 
+class ExportView(LoginRequiredMixin, PermissionRequiredMixin, View, metaclass=ABCMeta):
+    """Stream every row of a staff list, with the list's filters, as CSV or JSON Lines.
+
+    ex: ?format=jsonl&status=done (``format`` defaults to csv)
+    """
+    name = None
+    columns = None
+
+    @abstractmethod
+    def get_queryset(self, params):
+        """The list's queryset with the filters in ``params`` applied."""
+
+    @abstractmethod
+    def get_rows(self, queryset):
+        """Dicts keyed by ``columns``, one per object."""
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        rows = self.get_rows(self.get_queryset(request.GET))
+        return export_response(self.name, export_format, self.columns, rows)
+
+class AppointmentExportView(ExportView):
+    permission_required = ['staff.access_appointment_page']
+    name = 'appointments'
+    columns = APPOINTMENT_COLUMNS
+
+    def get_queryset(self, params):
+        return filter_appointments(Appointment.objects.all(), params).order_by(*APPOINTMENT_LIST_ORDERING)
+
+    def get_rows(self, queryset):
+        return appointment_rows(queryset)
+
+class VehicleExportView(ExportView):
+    permission_required = ['staff.access_vehicle_page']
+    name = 'vehicles'
+    columns = VEHICLE_COLUMNS
+
+    def get_queryset(self, params):
+        return filter_vehicles(Vehicle.objects.all(), params).order_by('id')
+
+    def get_rows(self, queryset):
+        return vehicle_rows(queryset)
+
+class ReviewExportView(ExportView):
+    permission_required = ['staff.access_review_page', 'staff.view_reviewstaff']
+    name = 'reviews'
+    columns = REVIEW_COLUMNS
+
+    def get_queryset(self, params):
+        return filter_reviews(Review.objects.all(), params).order_by('id')
+
+    def get_rows(self, queryset):
+        return review_rows(queryset)
+
+class UserExportView(ExportView):
+    permission_required = ['auth.view_user']
+    name = 'users'
+    columns = USER_COLUMNS
+
+    def get_queryset(self, params):
+        return client_segment(segment_filters(params)).order_by('id')
+
+    def get_rows(self, queryset):
+        return user_rows(queryset)
+
 class UserDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = ['auth.view_user']
 
@@ -274,7 +462,6 @@ class UserDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
         # get phone number from related Profile if available
         profile = getattr(user, 'profile', None)
         phone_number = getattr(profile, 'phone_number', '-') if profile is not None else '-'
-        print(phone_number)
 
         return render(request, 'user_detail.html', {
             'user': user,
@@ -308,6 +495,7 @@ class SendEmailView(LoginRequiredMixin, PermissionRequiredMixin, View):
             'user': user,
             'email': email,
             'form': form,
+            'recent_emails': OutboundEmail.objects.filter(user=user).order_by('-id')[:10],
         })
 
     def post(self, request, user_id):
@@ -325,17 +513,187 @@ class SendEmailView(LoginRequiredMixin, PermissionRequiredMixin, View):
             messages.error(request, "Subject and message cannot be empty.")
             return redirect('send_user_email', user_id=user.id)
 
+        # ไม่ส่งใน request: เก็บลง outbox แล้วให้คำสั่ง send_outbox เป็นคนส่ง
+        queue_email(email, subject, message, user=user)
+        messages.success(request, f"Email to {user.email} has been queued for sending.")
+
+        return redirect('send_user_email', user_id=user.id)
+
+class BulkEmailView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard', 'auth.view_user']
+
+    def _render(self, request, filters, form):
+        recipients = client_segment(filters).exclude(email='')
+        return render(request, 'bulk_email.html', {
+            'form': form,
+            'filters': filters,
+            'recipient_count': recipients.count(),
+            'segment_query': urlencode(filters),
+        })
+
+    def get(self, request):
+        return self._render(request, segment_filters(request.GET), EmailForm())
+
+    def post(self, request):
+        filters = segment_filters(request.POST)
+        form = EmailForm(request.POST)
+        if not form.is_valid():
+            return self._render(request, filters, form)
+
+        # ส่งจริงใน worker (send_outbox) ทั้งการดึงรายชื่อผู้รับและการส่ง
+        campaign = queue_campaign(
+            form.cleaned_data['subject'], form.cleaned_data['message'], filters, created_by=request.user
+        )
+        messages.success(request, f"Campaign #{campaign.id} has been queued for sending.")
+        return redirect('campaign_detail', campaign_id=campaign.id)
+
+class CampaignDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard', 'auth.view_user']
+
+    def get(self, request, campaign_id):
+        campaign = get_object_or_404(EmailCampaign, pk=campaign_id)
+        progress = campaign_progress(campaign)
+        finished = progress[OutboundEmail.Status.SENT] + progress[OutboundEmail.Status.DEAD]
+        total = campaign.recipient_count
+        return render(request, 'campaign_detail.html', {
+            'campaign': campaign,
+            'progress': progress,
+            'percentage': round(finished / total * 100, 2) if total else 0,
+            'is_expanded': campaign.status != EmailCampaign.Status.QUEUED,
+            'failures': campaign.emails.filter(attempts__gt=0).order_by('-id')[:20],
+        })
+
+class OutboxListView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard', 'auth.view_user']
+
+    def get(self, request):
+        emails = OutboundEmail.objects.all()
+
+        filter_status = request.GET.get('status', '').upper()
+        if filter_status in OutboundEmail.Status.values:
+            emails = emails.filter(status=filter_status)
+        else:
+            filter_status = ''
+
+        filter_campaign = request.GET.get('campaign', '')
+        if filter_campaign.isdigit():
+            emails = emails.filter(campaign_id=int(filter_campaign))
+        else:
+            filter_campaign = ''
+
+        page = keyset_paginate(emails, ('-id',), request.GET.get('cursor'))
+        page.link_params(request.GET)
+
+        return render(request, 'outbox_list.html', {
+            'total_emails': emails.count(),
+            'emails': page.enumerate(),
+            'page': page,
+            'filter_status': filter_status,
+            'filter_campaign': filter_campaign,
+            'status_choices': OutboundEmail.Status.choices,
+        })
+
+class OutboxRetryView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard', 'auth.view_user']
+
+    def post(self, request, email_id):
+        # ส่งอีเมลที่ล้มเหลว (DEAD) ใหม่อีกรอบ โดยเริ่มนับจำนวนครั้งใหม่
+        retried = OutboundEmail.objects.filter(pk=email_id, status=OutboundEmail.Status.DEAD).update(
+            status=OutboundEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        if retried:
+            messages.success(request, f"Email #{email_id} has been queued again.")
+        else:
+            messages.error(request, f"Email #{email_id} cannot be retried.")
+        return redirect('outbox_list')
+
+class SearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard', 'auth.view_user']
+    page_size = 20
+
+    def _url_for(self, entry):
+        if entry.kind == SearchEntry.Kind.USER:
+            return reverse('detail_user_list', kwargs={'user_id': entry.object_id})
+        if entry.kind == SearchEntry.Kind.APPOINTMENT:
+            return reverse('appointment_detail', kwargs={'appointment_id': entry.object_id})
+        return f"{reverse('vehicle_list')}?{urlencode({'license_plate': entry.title})}"
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        filter_type = request.GET.get('type', '').upper()
+        if filter_type not in SearchEntry.Kind.values:
+            filter_type = ''
         try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
-            print('send email success')
-            messages.success(request, f"Email sent to {user.email} successfully.")
-        except Exception as e:
-            messages.error(request, f"Failed to send email: {str(e)}")
-
-        return redirect('send_user_email', user_id=user.id)
\ No newline at end of file
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        entries, has_next = search(query, kind=filter_type or None, page=page, page_size=self.page_size)
+        results = [
+            {
+                'type': entry.kind,
+                'id': entry.object_id,
+                'title': entry.title,
+                'subtitle': entry.subtitle,
+                'url': self._url_for(entry),
+                'score': entry.rank,
+            }
+            for entry in entries
+        ]
+
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'query': query,
+                'type': filter_type or None,
+                'page': page,
+                'has_next': has_next,
+                'results': results,
+            })
+
+        params = request.GET.copy()
+        params.pop('page', None)
+        return render(request, 'search.html', {
+            'query': query,
+            'filter_type': filter_type,
+            'type_choices': SearchEntry.Kind.choices,
+            'results': results,
+            'page_number': page,
+            'has_next': has_next,
+            'base_query': params.urlencode(),
+        })
+
+class ImportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ['staff.access_dashboard']
+    # สิทธิ์ที่ต้องมีเพิ่มตามชนิดข้อมูลที่ import
+    kind_permissions = {
+        'vehicles': 'staff.add_vehiclestaff',
+        'service-types': 'core.add_servicetype',
+        'appointments': 'staff.add_appointmentstaff',
+    }
+    # แสดงข้อผิดพลาดในหน้าเว็บไม่เกินจำนวนนี้ (ไฟล์ใหญ่อาจผิดทุกแถว)
+    max_errors_shown = 200
+
+    def get(self, request):
+        return render(request, 'import.html', {'form': ImportForm()})
+
+    def post(self, request):
+        form = ImportForm(request.POST, request.FILES)
+        report = None
+        if form.is_valid():
+            kind = form.cleaned_data['kind']
+            if not request.user.has_perm(self.kind_permissions[kind]):
+                raise PermissionDenied
+            importer = make_importer(kind, owner=form.cleaned_data['owner'])
+            # utf-8-sig: ไฟล์ที่ export จาก Excel มักมี BOM นำหน้า
+            file = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = run_import(importer, file, dry_run=form.cleaned_data['dry_run'])
+            except (InvalidImport, UnicodeDecodeError) as exc:
+                form.add_error('file', str(exc))
+        return render(request, 'import.html', {
+            'form': form,
+            'report': report,
+            'errors': report.errors[:self.max_errors_shown] if report else [],
+            'dry_run': form.cleaned_data.get('dry_run') if report else False,
+        })
+